@@ -8,7 +8,7 @@ from alembic import context
 
 # Import all models to ensure they're registered with Base
 from app.core.db import Base
-from app.modules.customers.models import Customer
+from app.modules.customers.models import Customer, CustomerIdentity
 from app.modules.leads.models import Lead, IdempotencyKey
 from app.modules.comms.models import ContactEvent
 from app.modules.opportunities.models import Opportunity
@@ -0,0 +1,26 @@
+"""Record the created lead on idempotency_keys
+
+Revision ID: 002_idempotency_key_lead_id
+Revises: 001_initial
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_idempotency_key_lead_id'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No foreign key: the key is claimed before the lead row is inserted
+    # (both in the same transaction)
+    op.add_column('idempotency_keys', sa.Column('lead_id', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'lead_id')
@@ -0,0 +1,22 @@
+"""Index idempotency_keys.created_at for retention purges
+
+Revision ID: 003_idempotency_key_retention
+Revises: 002_idempotency_key_lead_id
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_idempotency_key_retention'
+down_revision = '002_idempotency_key_lead_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_idempotency_keys_created_at'), 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_idempotency_keys_created_at'), table_name='idempotency_keys')
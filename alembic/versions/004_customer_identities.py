@@ -0,0 +1,52 @@
+"""Customer identities: unique normalized phone/email per customer
+
+Revision ID: 004_customer_identities
+Revises: 003_idempotency_key_retention
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004_customer_identities'
+down_revision = '003_idempotency_key_retention'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'customer_identities',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('type', sa.Enum('phone', 'email', name='identitytype'), nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.Column('customer_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], deferrable=True, initially='DEFERRED'),
+        sa.UniqueConstraint('type', 'value', name='uq_customer_identities_type_value'),
+    )
+    op.create_index(op.f('ix_customer_identities_customer_id'), 'customer_identities', ['customer_id'], unique=False)
+
+    # Backfill from existing customers; where duplicates exist the oldest customer owns the identity
+    op.execute("""
+        INSERT INTO customer_identities (id, type, value, customer_id, created_at)
+        SELECT DISTINCT ON (primary_phone) gen_random_uuid(), 'phone', primary_phone, id, now()
+        FROM customers
+        WHERE primary_phone IS NOT NULL AND primary_phone <> ''
+        ORDER BY primary_phone, created_at
+    """)
+    op.execute("""
+        INSERT INTO customer_identities (id, type, value, customer_id, created_at)
+        SELECT DISTINCT ON (lower(trim(primary_email))) gen_random_uuid(), 'email', lower(trim(primary_email)), id, now()
+        FROM customers
+        WHERE primary_email IS NOT NULL AND trim(primary_email) <> ''
+        ORDER BY lower(trim(primary_email)), created_at
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_customer_identities_customer_id'), table_name='customer_identities')
+    op.drop_table('customer_identities')
+    op.execute("DROP TYPE identitytype")
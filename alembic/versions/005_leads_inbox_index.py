@@ -0,0 +1,33 @@
+"""Partial index for the lead inbox keyset pagination
+
+Revision ID: 005_leads_inbox_index
+Revises: 004_customer_identities
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_leads_inbox_index'
+down_revision = '004_customer_identities'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently so large leads tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_leads_inbox',
+            'leads',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_where=sa.text("status IN ('new', 'needs_info')"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_leads_inbox', table_name='leads', postgresql_concurrently=True)
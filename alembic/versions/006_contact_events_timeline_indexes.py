@@ -0,0 +1,45 @@
+"""Composite timeline indexes on contact_events
+
+Revision ID: 006_contact_events_timeline
+Revises: 005_leads_inbox_index
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_contact_events_timeline'
+down_revision = '005_leads_inbox_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built concurrently so contact_events stays writable; the composite indexes
+    # lead with the same columns, so the single-column ones become redundant
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_contact_events_customer_timeline',
+            'contact_events',
+            ['customer_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_contact_events_lead_timeline',
+            'contact_events',
+            ['lead_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_contact_events_customer_id', table_name='contact_events', postgresql_concurrently=True)
+        op.drop_index('ix_contact_events_lead_id', table_name='contact_events', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contact_events_lead_id', 'contact_events', ['lead_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_contact_events_customer_id', 'contact_events', ['customer_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_contact_events_lead_timeline', table_name='contact_events', postgresql_concurrently=True)
+        op.drop_index('ix_contact_events_customer_timeline', table_name='contact_events', postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""Promote postcode, product_interest and timeframe to lead columns
+
+Revision ID: 007_lead_promoted_fields
+Revises: 006_contact_events_timeline
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_lead_promoted_fields'
+down_revision = '006_contact_events_timeline'
+branch_labels = None
+depends_on = None
+
+PROMOTED_FIELDS = ('postcode', 'product_interest', 'timeframe')
+
+
+def upgrade() -> None:
+    for field in PROMOTED_FIELDS:
+        op.add_column('leads', sa.Column(field, sa.String(), nullable=True))
+    
+    # Backfill from raw_payload, blank values stay NULL like extract_promoted_fields
+    op.execute(
+        "UPDATE leads SET "
+        + ", ".join(f"{field} = NULLIF(btrim(raw_payload->>'{field}'), '')" for field in PROMOTED_FIELDS)
+        + " WHERE raw_payload IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    # Keep values captured outside the payload (e.g. postcode from inbound SMS)
+    op.execute(
+        "UPDATE leads SET raw_payload = COALESCE(raw_payload, '{}'::jsonb) || jsonb_strip_nulls(jsonb_build_object("
+        + ", ".join(f"'{field}', {field}" for field in PROMOTED_FIELDS)
+        + ")) WHERE "
+        + " OR ".join(f"{field} IS NOT NULL" for field in PROMOTED_FIELDS)
+    )
+    for field in reversed(PROMOTED_FIELDS):
+        op.drop_column('leads', field)
@@ -0,0 +1,48 @@
+"""Trigram indexes for lead and customer search
+
+Revision ID: 008_search_trigram_indexes
+Revises: 007_lead_promoted_fields
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008_search_trigram_indexes'
+down_revision = '007_lead_promoted_fields'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_leads_name_trgm', 'leads', 'name'),
+    ('ix_leads_email_trgm', 'leads', 'email'),
+    ('ix_leads_phone_trgm', 'leads', 'phone'),
+    ('ix_leads_postcode_trgm', 'leads', 'postcode'),
+    ('ix_customers_name_trgm', 'customers', 'name'),
+    ('ix_customers_primary_email_trgm', 'customers', 'primary_email'),
+    ('ix_customers_primary_phone_trgm', 'customers', 'primary_phone'),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    # Built concurrently so leads and customers stay writable during the migration
+    with op.get_context().autocommit_block():
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    # The extension is left installed, other objects may depend on it
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(TRIGRAM_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,102 @@
+"""Monthly range partitioning of contact_events on created_at
+
+Revision ID: 009_partition_contact_events
+Revises: 008_search_trigram_indexes
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+from datetime import date, datetime
+
+# revision identifiers, used by Alembic.
+revision = '009_partition_contact_events'
+down_revision = '008_search_trigram_indexes'
+branch_labels = None
+depends_on = None
+
+# Months created ahead of the current one, matching CONTACT_EVENT_PARTITIONS_AHEAD_MONTHS
+PARTITIONS_AHEAD_MONTHS = 3
+
+COLUMNS = "id, customer_id, lead_id, channel, direction, subject, body, meta, created_at"
+
+CONSTRAINTS = ['contact_events_customer_id_fkey', 'contact_events_lead_id_fkey']
+
+INDEXES = [
+    ('ix_contact_events_created_at', 'created_at'),
+    ('ix_contact_events_customer_timeline', 'customer_id, created_at DESC, id DESC'),
+    ('ix_contact_events_lead_timeline', 'lead_id, created_at DESC, id DESC'),
+]
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    # Keep the old table aside, freeing its constraint and index names
+    op.execute("ALTER TABLE contact_events RENAME TO contact_events_unpartitioned")
+    for name in CONSTRAINTS + ['contact_events_pkey']:
+        op.execute(f"ALTER TABLE contact_events_unpartitioned RENAME CONSTRAINT {name} TO {name.replace('contact_events', 'contact_events_unpartitioned')}")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('contact_events', 'contact_events_unpartitioned')}")
+    
+    op.execute("""
+        CREATE TABLE contact_events (
+            id UUID NOT NULL,
+            customer_id UUID REFERENCES customers (id),
+            lead_id UUID REFERENCES leads (id),
+            channel contactchannel NOT NULL,
+            direction contactdirection NOT NULL,
+            subject VARCHAR,
+            body TEXT NOT NULL,
+            meta JSONB,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON contact_events ({columns})")
+    
+    # One partition per month from the oldest event to PARTITIONS_AHEAD_MONTHS ahead,
+    # plus a default partition so inserts never fail for a missing month
+    oldest = op.get_bind().exec_driver_sql("SELECT min(created_at) FROM contact_events_unpartitioned").scalar()
+    current = datetime.utcnow().date().replace(day=1)
+    month = min(oldest.date().replace(day=1), current) if oldest else current
+    while month <= _add_months(current, PARTITIONS_AHEAD_MONTHS):
+        op.execute(
+            f"CREATE TABLE contact_events_{month:%Y_%m} PARTITION OF contact_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE contact_events_default PARTITION OF contact_events DEFAULT")
+    
+    op.execute(f"INSERT INTO contact_events ({COLUMNS}) SELECT {COLUMNS} FROM contact_events_unpartitioned")
+    op.execute("DROP TABLE contact_events_unpartitioned")
+
+
+def downgrade() -> None:
+    # Archived partitions are not restored, run the restore command first if needed
+    op.execute("ALTER TABLE contact_events RENAME TO contact_events_partitioned")
+    for name in CONSTRAINTS + ['contact_events_pkey']:
+        op.execute(f"ALTER TABLE contact_events_partitioned RENAME CONSTRAINT {name} TO {name.replace('contact_events', 'contact_events_partitioned')}")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('contact_events', 'contact_events_partitioned')}")
+    
+    op.execute("""
+        CREATE TABLE contact_events (
+            id UUID PRIMARY KEY,
+            customer_id UUID REFERENCES customers (id),
+            lead_id UUID REFERENCES leads (id),
+            channel contactchannel NOT NULL,
+            direction contactdirection NOT NULL,
+            subject VARCHAR,
+            body TEXT NOT NULL,
+            meta JSONB,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON contact_events ({columns})")
+    op.execute(f"INSERT INTO contact_events ({COLUMNS}) SELECT {COLUMNS} FROM contact_events_partitioned")
+    op.execute("DROP TABLE contact_events_partitioned")
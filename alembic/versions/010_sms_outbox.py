@@ -0,0 +1,49 @@
+"""Transactional outbox for outbound SMS
+
+Revision ID: 010_sms_outbox
+Revises: 009_partition_contact_events
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '010_sms_outbox'
+down_revision = '009_partition_contact_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sms_outbox',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('contact_event_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('contact_event_created_at', sa.DateTime(), nullable=False),
+        sa.Column('lead_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('customer_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('to_number', sa.String(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'failed', name='outboxstatus'), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['lead_id'], ['leads.id']),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id']),
+    )
+    op.create_index(
+        'ix_sms_outbox_pending',
+        'sms_outbox',
+        ['available_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sms_outbox_pending', table_name='sms_outbox')
+    op.drop_table('sms_outbox')
+    op.execute("DROP TYPE outboxstatus")
@@ -0,0 +1,30 @@
+"""Index inbound Twilio MessageSid on contact_events
+
+Revision ID: 011_contact_events_message_sid
+Revises: 010_sms_outbox
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_contact_events_message_sid'
+down_revision = '010_sms_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Partitioned tables cannot index concurrently; this cascades to every partition
+    op.create_index(
+        'ix_contact_events_twilio_message_sid',
+        'contact_events',
+        [sa.text("(meta ->> 'twilio_message_sid')")],
+        unique=False,
+        postgresql_where=sa.text("meta ? 'twilio_message_sid'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_events_twilio_message_sid', table_name='contact_events')
@@ -0,0 +1,141 @@
+"""Re-normalize stored phones to the table-driven E.164 form
+
+Revision ID: 012_renormalize_phones
+Revises: 011_contact_events_message_sid
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Dict, Optional, Tuple
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_renormalize_phones'
+down_revision = '011_contact_events_message_sid'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app/core/phone.py as of this revision, so later changes to
+# the app's rules cannot change what this migration does.
+# Calling code -> (trunk prefix, national number lengths after the trunk prefix)
+COUNTRY_RULES: Dict[str, Tuple[Optional[str], Tuple[int, ...]]] = {
+    "1": (None, (10,)),
+    "33": ("0", (9,)),
+    "34": (None, (9,)),
+    "353": ("0", (7, 8, 9)),
+    "44": ("0", (10, 11)),
+    "49": ("0", tuple(range(6, 12))),
+    "61": ("0", (9,)),
+}
+# PHONE_DEFAULT_COUNTRY_CODE default when this revision was written
+DEFAULT_COUNTRY_CODE = "44"
+
+_NON_DIGITS = re.compile(r"[^\d+]")
+_CALLING_CODE_LENGTHS = sorted({len(code) for code in COUNTRY_RULES}, reverse=True)
+
+
+def _international(digits: str) -> str:
+    for length in _CALLING_CODE_LENGTHS:
+        code = digits[:length]
+        rule = COUNTRY_RULES.get(code)
+        if rule is None:
+            continue
+        trunk, lengths = rule
+        national = digits[length:]
+        if trunk and national.startswith(trunk) and len(national) - len(trunk) in lengths:
+            return f"+{code}{national[len(trunk):]}"
+        break
+    return f"+{digits}"
+
+
+def _national(digits: str, code: str) -> Optional[str]:
+    trunk, lengths = COUNTRY_RULES.get(code, ("0", ()))
+    if trunk and digits.startswith(trunk):
+        digits = digits[len(trunk):]
+    if digits.startswith(code):
+        return f"+{digits}"
+    if len(digits) in lengths:
+        return f"+{code}{digits}"
+    if lengths and len(digits) > max(lengths):
+        return f"+{digits}"
+    return digits or None
+
+
+def _normalize(phone: str) -> Optional[str]:
+    cleaned = _NON_DIGITS.sub("", phone)
+    if cleaned.startswith("+"):
+        digits = cleaned[1:].replace("+", "")
+        return _international(digits) if digits else None
+    if cleaned.startswith("00") and len(cleaned) > 2:
+        return _international(cleaned[2:])
+    return _national(cleaned, DEFAULT_COUNTRY_CODE)
+
+
+# Values the old normalization stored differently: a trunk 0 after the
+# country code ("+44 (0)7700..." -> "+4407700..."), a 00 prefix read as a
+# national number ("0044 7700..." -> "+0447700...") and stray + signs
+_CODES = "|".join(sorted(COUNTRY_RULES, key=len, reverse=True))
+CANDIDATES = rf"^\+(0?({_CODES})0|0({_CODES}))|^.+\+"
+
+
+def _valid(phone: str) -> bool:
+    """E.164 with a known calling code and a valid national length"""
+    for code, (_, lengths) in COUNTRY_RULES.items():
+        if phone.startswith(f"+{code}") and len(phone) - len(code) - 1 in lengths:
+            return True
+    return False
+
+
+def _renormalize(value: str) -> str:
+    if value.startswith("+0"):
+        # Only when the 00 reading gives a plausible number, "+0161..." may be a
+        # UK landline typed with a +
+        phone = _normalize("00" + value[2:])
+        return phone if _valid(phone) else value
+    return _normalize(value)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    values = conn.execute(sa.text("""
+        SELECT primary_phone FROM customers WHERE primary_phone ~ :pattern
+        UNION SELECT value FROM customer_identities WHERE type = 'phone' AND value ~ :pattern
+        UNION SELECT phone FROM leads WHERE phone ~ :pattern
+    """), {"pattern": CANDIDATES}).scalars().all()
+    mapping = [{"old": value, "new": _renormalize(value)} for value in values]
+    mapping = [row for row in mapping if row["new"] and row["new"] != row["old"]]
+    if not mapping:
+        return
+
+    op.execute("CREATE TEMPORARY TABLE phone_renormalized (old varchar PRIMARY KEY, new varchar NOT NULL) ON COMMIT DROP")
+    conn.execute(sa.text("INSERT INTO phone_renormalized (old, new) VALUES (:old, :new)"), mapping)
+    op.execute("UPDATE leads SET phone = m.new FROM phone_renormalized m WHERE leads.phone = m.old")
+    op.execute("UPDATE customers SET primary_phone = m.new FROM phone_renormalized m WHERE customers.primary_phone = m.old")
+
+    # Identities that now collide: an identity already in the new form keeps the
+    # number, otherwise the oldest one does, as in 004_customer_identities
+    op.execute("""
+        DELETE FROM customer_identities WHERE id IN (
+            SELECT id FROM (
+                SELECT i.id, row_number() OVER (
+                    PARTITION BY coalesce(m.new, i.value)
+                    ORDER BY m.old IS NOT NULL, i.created_at, i.id
+                ) AS rank
+                FROM customer_identities i
+                LEFT JOIN phone_renormalized m ON m.old = i.value
+                WHERE i.type = 'phone' AND coalesce(m.new, i.value) IN (SELECT new FROM phone_renormalized)
+            ) ranked
+            WHERE rank > 1
+        )
+    """)
+    op.execute("""
+        UPDATE customer_identities SET value = m.new FROM phone_renormalized m
+        WHERE customer_identities.type = 'phone' AND customer_identities.value = m.old
+    """)
+
+
+def downgrade() -> None:
+    # The old forms cannot be recovered, and the new ones stay valid E.164
+    pass
@@ -0,0 +1,23 @@
+"""Tag outbox rows with their bulk SMS send
+
+Revision ID: 013_sms_outbox_bulk_id
+Revises: 012_renormalize_phones
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_sms_outbox_bulk_id'
+down_revision = '012_renormalize_phones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sms_outbox', sa.Column('bulk_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sms_outbox', 'bulk_id')
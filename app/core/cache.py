@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Iterable, Optional
+import sys
+
+import orjson
+from redis import Redis, RedisError
+from redis.asyncio import Redis as AsyncRedis
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU map with per-key invalidation.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Returns {1, value} on a hit, {0, generation} on a miss, and counts it
+_GET_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('HINCRBY', KEYS[3], 'hits', 1)
+    return {1, value}
+end
+redis.call('HINCRBY', KEYS[3], 'misses', 1)
+return {0, redis.call('GET', KEYS[2]) or '0'}
+"""
+
+# Stores the value unless the key was invalidated since the read, then trims
+# the namespace index to max_entries by dropping the oldest writes
+_SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+local ttl = tonumber(ARGV[3])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+local now = tonumber(redis.call('TIME')[1])
+redis.call('ZADD', KEYS[3], now, ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - ttl)
+local excess = redis.call('ZCARD', KEYS[3]) - tonumber(ARGV[4])
+if excess > 0 then
+    for _, member in ipairs(redis.call('ZRANGE', KEYS[3], 0, excess - 1)) do
+        redis.call('DEL', ARGV[6] .. member)
+    end
+    redis.call('ZREMRANGEBYRANK', KEYS[3], 0, excess - 1)
+end
+return 1
+"""
+
+
+class RedisCache:
+    """
+    Namespaced read-through cache of JSON values in Redis.
+    - Entries expire after ttl_seconds, and at most max_entries are kept
+      per namespace (oldest writes are dropped first)
+    - Each key has a generation counter bumped by invalidate(), and set()
+      only stores a value if the generation is unchanged since get(), so a
+      read racing a write never caches the pre-write value
+    - Hits and misses are counted in Redis, shared by all processes
+    Reads and writes go through the asyncio client so they don't block the
+    event loop. invalidate() also has a sync variant for workers and scripts.
+    Redis errors are treated as cache misses.
+    """
+
+    def __init__(self, redis_conn: Redis, async_redis_conn: AsyncRedis, namespace: str, ttl_seconds: int, max_entries: int):
+        self.redis = redis_conn
+        self.async_redis = async_redis_conn
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._prefix = f"cache:{namespace}:"
+        self._index_key = f"cache:{namespace}:_index"
+        self._stats_key = f"cache:{namespace}:_stats"
+        self._get = async_redis_conn.register_script(_GET_SCRIPT)
+        self._set = async_redis_conn.register_script(_SET_SCRIPT)
+
+    def _generation_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:_gen:{key}"
+
+    async def get(self, key: str) -> tuple[Optional[Any], Optional[str]]:
+        """
+        Return (value, None) on a hit, or (None, generation) on a miss.
+        Pass the generation to set() once the value has been computed.
+        """
+        try:
+            found, payload = await self._get(keys=[self._prefix + key, self._generation_key(key), self._stats_key])
+        except RedisError as e:
+            print(f"Cache {self.namespace} unavailable: {e}", file=sys.stderr)
+            return None, None
+        if found:
+            return orjson.loads(payload), None
+        return None, payload.decode()
+
+    async def set(self, key: str, value: Any, generation: Optional[str]) -> None:
+        """Store a value read at the given generation, no-op if it is None"""
+        if generation is None:
+            return
+        try:
+            await self._set(
+                keys=[self._prefix + key, self._generation_key(key), self._index_key],
+                args=[orjson.dumps(value), generation, self.ttl_seconds, self.max_entries, key, self._prefix],
+            )
+        except RedisError as e:
+            print(f"Cache {self.namespace} unavailable: {e}", file=sys.stderr)
+
+    def _queue_invalidate(self, pipe, keys: list[str]) -> None:
+        for key in keys:
+            pipe.incr(self._generation_key(key))
+            pipe.expire(self._generation_key(key), self.ttl_seconds)
+            pipe.delete(self._prefix + key)
+
+    async def ainvalidate(self, keys: Iterable[str]) -> None:
+        """Drop cached values and bump their generation"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            self._queue_invalidate(pipe, keys)
+            await pipe.execute()
+        except RedisError as e:
+            print(f"Cache {self.namespace} unavailable: {e}", file=sys.stderr)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Sync ainvalidate, for code running outside the event loop"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_invalidate(pipe, keys)
+            pipe.execute()
+        except RedisError as e:
+            print(f"Cache {self.namespace} unavailable: {e}", file=sys.stderr)
+
+    async def stats(self) -> dict:
+        """Hit/miss counters and current size of the namespace"""
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            pipe.hgetall(self._stats_key)
+            pipe.zcard(self._index_key)
+            counters, size = await pipe.execute()
+        except RedisError as e:
+            return {"namespace": self.namespace, "error": str(e)}
+        hits = int(counters.get(b"hits", 0))
+        misses = int(counters.get(b"misses", 0))
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "size": size,
+            "max_entries": self.max_entries,
+        }
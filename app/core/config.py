@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,69 @@ class Settings(BaseSettings):
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
     TWILIO_WEBHOOK_VALIDATE: bool = True
+    TWILIO_API_BASE_URL: str = "https://api.twilio.com"  # Point at the fake_twilio load-test stub
+    TWILIO_HTTP_TIMEOUT_SECONDS: float = 10.0
+    TWILIO_HTTP_MAX_CONNECTIONS: int = 20
+    TWILIO_MAX_RETRIES: int = 2
+    TWILIO_RETRY_BACKOFF_SECONDS: float = 0.5
+    # Webhook only verifies and appends to a Redis Stream (app/modules/comms/inbound.py)
+    TWILIO_WEBHOOK_FAST_ACK: bool = False
+    SMS_INBOUND_STREAM_MAXLEN: int = 100000
+    SMS_INBOUND_CLAIM_IDLE_SECONDS: int = 60
+    SMS_INBOUND_MAX_DELIVERIES: int = 5
+    
+    # Outbound SMS: sends per second per sender number (match its Twilio throughput),
+    # shared by all outbox dispatchers; bulk sends are queued in chunks
+    SMS_SEND_RATE_PER_SECOND: float = 1.0
+    SMS_SEND_BURST: int = 1
+    SMS_BULK_CHUNK_SIZE: int = 100
+    SMS_BULK_JOB_TIMEOUT_SECONDS: int = 6 * 3600
+    
+    # Qualification chase: SMS at these offsets (hours) from the start while the lead
+    # stays NEEDS_INFO, sent by python -m app.modules.automation.chase
+    CHASE_CADENCE_HOURS: List[float] = [0, 4, 24]
+    CHASE_SWEEP_BATCH_SIZE: int = 500
+    CHASE_SWEEP_INTERVAL_SECONDS: float = 15.0
+    CHASE_CLAIM_LEASE_SECONDS: int = 300
+    
+    # Outbound SMS outbox dispatcher (python -m app.modules.comms.outbox)
+    SMS_OUTBOX_BATCH_SIZE: int = 50
+    SMS_OUTBOX_CONCURRENCY: int = 10
+    SMS_OUTBOX_MAX_ATTEMPTS: int = 5
+    SMS_OUTBOX_RETRY_SECONDS: float = 30.0  # Doubles per attempt
+    SMS_OUTBOX_POLL_SECONDS: float = 5.0
+    # Claimed rows are re-sent after this if not settled; keep it above
+    # SMS_OUTBOX_BATCH_SIZE / SMS_SEND_RATE_PER_SECOND plus Twilio timeouts
+    SMS_OUTBOX_LEASE_SECONDS: float = 300.0
+    
+    # Webhooks
+    WEBHOOK_BATCH_MAX_SIZE: int = 5000
+    
+    # Idempotency
+    IDEMPOTENCY_KEY_RETENTION_DAYS: int = 90
+    IDEMPOTENCY_CACHE_ENABLED: bool = True
+    IDEMPOTENCY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    
+    # Leads
+    LEAD_RESCORE_CHUNK_SIZE: int = 5000
+    QUALIFICATION_RULES: Optional[Dict[str, Any]] = None  # JSON, see leads.scoring.DEFAULT_QUALIFICATION_RULES
+    
+    # Phone normalization
+    PHONE_DEFAULT_COUNTRY_CODE: str = "44"  # For numbers without + or 00
+    PHONE_NORMALIZE_CACHE_SIZE: int = 100000
+    
+    # Customers
+    CUSTOMER_IDENTITY_CACHE_SIZE: int = 50000
+    
+    # Lead detail cache (Redis)
+    LEAD_DETAIL_CACHE_ENABLED: bool = True
+    LEAD_DETAIL_CACHE_TTL_SECONDS: int = 600
+    LEAD_DETAIL_CACHE_MAX_ENTRIES: int = 50000
+    
+    # Contact event partitions
+    CONTACT_EVENT_PARTITIONS_AHEAD_MONTHS: int = 3
+    CONTACT_EVENT_ARCHIVE_AFTER_MONTHS: int = 12
+    CONTACT_EVENT_ARCHIVE_DIR: str = "archive/contact_events"
     
     # App
     ENVIRONMENT: str = "development"
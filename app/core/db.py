@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -10,6 +11,35 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def enum_values(enum_cls) -> list[str]:
+    """
+    values_callable for SQLEnum columns: persist enum values ("new"),
+    matching the labels created by the migrations, instead of names ("NEW").
+    """
+    return [member.value for member in enum_cls]
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Convert a sync Postgres URL into its asyncpg equivalent.
+    Railway and Heroku style URLs (postgres://) are accepted too.
+    """
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+async_engine = create_async_engine(get_async_database_url(settings.DATABASE_URL))
+# expire_on_commit=False so ORM objects returned from services stay readable
+# after commit without triggering lazy loads outside the greenlet
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -17,3 +47,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency for getting an async database session.
+    Sync service functions can be run against it with
+    `await db.run_sync(service_fn, ...)`, which passes the underlying
+    Session as the first argument while queries are awaited on asyncpg.
+    """
+    from app.modules.leads.cache import defer_lead_detail_invalidation, flush_lead_detail_invalidations
+    
+    async with AsyncSessionLocal() as db:
+        # Cache invalidations are applied here with the async Redis client,
+        # before the response is sent
+        defer_lead_detail_invalidation(db.sync_session)
+        try:
+            yield db
+        finally:
+            await flush_lead_detail_invalidations(db)
@@ -1,29 +1,162 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from uuid import uuid4
-from datetime import datetime
-from typing import Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
+from typing import Optional, Iterable
+import sys
 
+from redis import Redis, RedisError
+
+from app.core.config import settings
 from app.modules.leads.models import IdempotencyKey
 
 
-def check_idempotency_key(db: Session, key: str) -> tuple[bool, Optional[IdempotencyKey]]:
+class IdempotencyCache:
+    """
+    Redis front cache for idempotency keys. Postgres stays the source of truth.
+    A TTL'd Redis entry per key holds the lead_id created under it, so
+    redelivered webhooks are answered without touching Postgres. Keys not in
+    the cache go straight to the atomic claim, which costs the same round
+    trip as a lookup would.
+    Redis errors are treated as cache misses.
+    """
+    ENTRY_PREFIX = "idempotency:key:"
+
+    def __init__(self, redis_conn: Redis, ttl_seconds: int):
+        self.redis = redis_conn
+        self.ttl_seconds = ttl_seconds
+
+    def get_lead_ids(self, keys: Iterable[str]) -> dict[str, Optional[UUID]]:
+        """Return cached {key: lead_id} for keys seen within the TTL"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self.redis.mget([self.ENTRY_PREFIX + key for key in keys])
+        except RedisError as e:
+            print(f"Idempotency cache unavailable: {e}", file=sys.stderr)
+            return {}
+        # Empty string marks a key stored without a lead_id
+        return {
+            key: UUID(value.decode()) if value else None
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def remember(self, lead_ids: dict[str, Optional[UUID]]) -> None:
+        """Cache the lead_id of each key"""
+        if not lead_ids:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, lead_id in lead_ids.items():
+                pipe.set(self.ENTRY_PREFIX + key, str(lead_id) if lead_id else "", ex=self.ttl_seconds)
+            pipe.execute()
+        except RedisError as e:
+            print(f"Idempotency cache unavailable: {e}", file=sys.stderr)
+
+
+# Singleton instance
+_idempotency_cache: Optional[IdempotencyCache] = None
+
+
+def get_idempotency_cache() -> Optional[IdempotencyCache]:
+    """Get or create the idempotency cache, None if disabled"""
+    global _idempotency_cache
+    if not settings.IDEMPOTENCY_CACHE_ENABLED:
+        return None
+    if _idempotency_cache is None:
+        _idempotency_cache = IdempotencyCache(
+            redis_conn=Redis.from_url(settings.REDIS_URL),
+            # Never cache a key for longer than Postgres retains it
+            ttl_seconds=min(
+                settings.IDEMPOTENCY_CACHE_TTL_SECONDS,
+                settings.IDEMPOTENCY_KEY_RETENTION_DAYS * 86400,
+            ),
+        )
+    return _idempotency_cache
+
+
+def claim_idempotency_key(db: Session, key: str, lead_id: UUID) -> tuple[bool, Optional[UUID]]:
     """
-    Check if an idempotency key exists.
-    Returns (exists, key_record)
+    Atomically claim an idempotency key for a lead that is about to be created.
+    Uses INSERT ... ON CONFLICT DO NOTHING RETURNING so concurrent retries of
+    the same webhook cannot both pass. Does not commit - the key must be
+    committed in the same transaction as the lead.
+    Returns (claimed, lead_id): lead_id is the original lead's id when the
+    key already existed (None for keys stored before lead_id was recorded).
     """
-    stmt = select(IdempotencyKey).where(IdempotencyKey.key == key)
-    result = db.execute(stmt).scalar_one_or_none()
-    return result is not None, result
+    stmt = (
+        pg_insert(IdempotencyKey)
+        .values(id=uuid4(), key=key, lead_id=lead_id, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        .returning(IdempotencyKey.id)
+    )
+    if db.execute(stmt).scalar_one_or_none() is not None:
+        return True, lead_id
+    
+    stmt = select(IdempotencyKey.lead_id).where(IdempotencyKey.key == key)
+    return False, db.execute(stmt).scalar_one_or_none()
 
 
-def create_idempotency_key(db: Session, key: str) -> IdempotencyKey:
-    """Create a new idempotency key"""
-    idempotency_key = IdempotencyKey(id=uuid4(), key=key, created_at=datetime.utcnow())
-    db.add(idempotency_key)
-    db.commit()
-    db.refresh(idempotency_key)
-    return idempotency_key
+def claim_idempotency_keys(db: Session, keys: dict[str, UUID]) -> dict[str, Optional[UUID]]:
+    """
+    Batch version of claim_idempotency_key.
+    Takes {key: new_lead_id} and claims all keys with one multi-row insert.
+    Returns {key: original_lead_id} for the keys that already existed.
+    Does not commit.
+    """
+    if not keys:
+        return {}
+    
+    now = datetime.utcnow()
+    # Insert in key order so concurrent overlapping batches lock rows in the same order
+    rows = [
+        {"id": uuid4(), "key": key, "lead_id": keys[key], "created_at": now}
+        for key in sorted(keys)
+    ]
+    stmt = (
+        pg_insert(IdempotencyKey)
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        .returning(IdempotencyKey.key)
+    )
+    claimed = set(db.execute(stmt, rows).scalars().all())
+    
+    conflicting = [key for key in keys if key not in claimed]
+    if not conflicting:
+        return {}
+    stmt = select(IdempotencyKey.key, IdempotencyKey.lead_id).where(IdempotencyKey.key.in_(conflicting))
+    return {key: lead_id for key, lead_id in db.execute(stmt).all()}
+
+
+def purge_expired_idempotency_keys(
+    db: Session,
+    retention_days: Optional[int] = None,
+    batch_size: int = 5000,
+) -> int:
+    """
+    Delete idempotency keys older than the retention window in batches,
+    committing after each batch to keep transactions and locks short.
+    Returns the number of keys deleted.
+    """
+    if retention_days is None:
+        retention_days = settings.IDEMPOTENCY_KEY_RETENTION_DAYS
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    
+    total = 0
+    while True:
+        batch = (
+            select(IdempotencyKey.id)
+            .where(IdempotencyKey.created_at < cutoff)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(batch)))
+        db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
 
 
 def generate_idempotency_key(source: str, external_id: Optional[str] = None, payload_hash: Optional[str] = None) -> str:
@@ -0,0 +1,102 @@
+"""
+Table-driven phone normalization to E.164.
+
+Numbers with an international prefix (+ or 00) keep their country code, and
+a trunk prefix written after it ("+44 (0)7700 ...") is dropped for countries
+in COUNTRY_RULES. Other numbers are read as national numbers of
+PHONE_DEFAULT_COUNTRY_CODE. Results for recent inputs are kept in a bounded
+LRU, as the same number is normalized several times per intake.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+from app.core.config import settings
+
+# Calling code -> (trunk prefix, national number lengths after the trunk prefix)
+COUNTRY_RULES: Dict[str, Tuple[Optional[str], Tuple[int, ...]]] = {
+    "1": (None, (10,)),           # US, Canada (NANP)
+    "33": ("0", (9,)),            # France
+    "34": (None, (9,)),           # Spain
+    "353": ("0", (7, 8, 9)),      # Ireland
+    "44": ("0", (10, 11)),        # United Kingdom
+    "49": ("0", tuple(range(6, 12))),  # Germany
+    "61": ("0", (9,)),            # Australia
+}
+
+_NON_DIGITS = re.compile(r"[^\d+]")
+_CALLING_CODE_LENGTHS = sorted({len(code) for code in COUNTRY_RULES}, reverse=True)
+
+
+def _international(digits: str) -> str:
+    """E.164 for digits following + or 00"""
+    for length in _CALLING_CODE_LENGTHS:
+        code = digits[:length]
+        rule = COUNTRY_RULES.get(code)
+        if rule is None:
+            continue
+        trunk, lengths = rule
+        national = digits[length:]
+        if trunk and national.startswith(trunk) and len(national) - len(trunk) in lengths:
+            return f"+{code}{national[len(trunk):]}"
+        break
+    return f"+{digits}"
+
+
+def _national(digits: str, code: str) -> Optional[str]:
+    """E.164 for a number without international prefix, read as a national number of code"""
+    trunk, lengths = COUNTRY_RULES.get(code, ("0", ()))
+    # Drop the trunk prefix
+    if trunk and digits.startswith(trunk):
+        digits = digits[len(trunk):]
+    
+    # Already carries the country code without +
+    if digits.startswith(code):
+        return f"+{digits}"
+    
+    if len(digits) in lengths:
+        return f"+{code}{digits}"
+    
+    # Longer than any national number, assume it includes a country code
+    if lengths and len(digits) > max(lengths):
+        return f"+{digits}"
+    
+    # Return as-is if we can't normalize
+    return digits or None
+
+
+@lru_cache(maxsize=settings.PHONE_NORMALIZE_CACHE_SIZE)
+def _normalize(phone: str) -> Optional[str]:
+    # Skip the regex for numbers that are already clean, e.g. Twilio's E.164
+    if phone.isdecimal() or (phone[0] == "+" and phone[1:].isdecimal()):
+        cleaned = phone
+    else:
+        cleaned = _NON_DIGITS.sub("", phone)
+    if cleaned.startswith("+"):
+        digits = cleaned[1:].replace("+", "")
+        return _international(digits) if digits else None
+    if cleaned.startswith("00") and len(cleaned) > 2:
+        return _international(cleaned[2:])
+    return _national(cleaned, settings.PHONE_DEFAULT_COUNTRY_CODE)
+
+
+def normalize_phone_to_e164(phone: Optional[str]) -> Optional[str]:
+    """
+    Normalize phone number to E.164 format.
+    Returns None for empty input, and the bare digits if the number
+    cannot be normalized.
+    """
+    if not phone:
+        return None
+    return _normalize(phone)
+
+
+def normalize_many(phones: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """
+    Normalize a batch of phone numbers, in input order.
+    Each distinct number is normalized once.
+    """
+    phones = list(phones)
+    normalized = {phone: _normalize(phone) for phone in set(phones) if phone}
+    return list(map(normalized.get, phones))
+
@@ -0,0 +1,48 @@
+import asyncio
+
+from redis.asyncio import Redis as AsyncRedis
+
+# Refills the bucket for the time elapsed since the last call, then takes the
+# requested tokens. Returns 0 when granted, else milliseconds until they would be.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared through Redis, so every worker process sending from
+    the same key stays within one limit of rate tokens per second, with
+    bursts of up to capacity.
+    """
+    
+    def __init__(self, redis_conn: AsyncRedis, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._take = redis_conn.register_script(_TAKE_SCRIPT)
+    
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until tokens are available and take them"""
+        while True:
+            wait_ms = await self._take(keys=[self.key], args=[self.rate, self.capacity, tokens])
+            if not wait_ms:
+                return
+            await asyncio.sleep(wait_ms / 1000)
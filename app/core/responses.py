@@ -0,0 +1,20 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    # asyncpg returns its own UUID subclass, which orjson only serializes as str
+    return str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    Return it directly from a route to skip response_model validation
+    when the content is already plain dicts/lists.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -2,14 +2,15 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.modules.leads.router import router as leads_router
 from app.modules.comms.router import router as comms_router
 from app.modules.automation.router import router as automation_router
+from app.modules.search.router import router as search_router
 
 app = FastAPI(
     title="CSGB CRM",
@@ -26,6 +27,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+async def close_provider_clients():
+    """Close pooled provider and Redis connections"""
+    from app.modules.comms.providers.twilio_sms import close_twilio_provider
+    from app.modules.comms.inbound import close_inbound_stream
+    from app.modules.leads.cache import close_lead_detail_cache
+    await close_twilio_provider()
+    await close_inbound_stream()
+    await close_lead_detail_cache()
+
+
 # Health check endpoints (must be before catch-all route)
 @app.get("/health")
 async def health():
@@ -34,22 +47,33 @@ async def health():
 
 
 @app.get("/health/db")
-async def health_db(db: Session = Depends(get_db)):
+async def health_db(db: AsyncSession = Depends(get_async_db)):
     """Database health check"""
     try:
         # Try a simple query
         from sqlalchemy import text
-        result = db.execute(text("SELECT 1"))
+        result = await db.execute(text("SELECT 1"))
         result.fetchone()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": "error", "error": str(e)}
 
 
+@app.get("/health/cache")
+async def health_cache():
+    """Lead detail cache hit/miss counters"""
+    from app.modules.leads.cache import get_lead_detail_cache
+    cache = get_lead_detail_cache()
+    if not cache:
+        return {"status": "disabled"}
+    return await cache.stats()
+
+
 # Register routers with /api prefix
 app.include_router(leads_router, prefix="/api/leads", tags=["leads"])
 app.include_router(comms_router, prefix="/api/comms", tags=["comms"])
 app.include_router(automation_router, prefix="/api/automation", tags=["automation"])
+app.include_router(search_router, prefix="/api/search", tags=["search"])
 
 # Serve static files (frontend) - must be before catch-all route
 static_dir = os.path.join(os.path.dirname(__file__), "static")
@@ -0,0 +1,170 @@
+"""
+Qualification chase scheduler.
+
+Chased leads live in the chase:due sorted set, scored by when their next
+step is due, with the step number in the chase:step hash. Each sweep claims
+a batch of due leads, checks them all in one query, and queues a missing-info
+SMS through the outbox for those still NEEDS_INFO. It then schedules their
+next step from CHASE_CADENCE_HOURS, or drops them from the schedule.
+
+    python -m app.modules.automation.chase [--once]
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+from uuid import UUID
+import argparse
+import signal
+import time
+
+from redis import Redis
+
+from app.core.config import settings
+from app.modules.comms.service import queue_sms
+from app.modules.leads.cache import invalidate_lead_details
+from app.modules.leads.models import Lead, LeadStatus
+from app.modules.leads.scoring import MISSING_FIELD_PROMPTS
+
+DUE_KEY = "chase:due"
+STEP_KEY = "chase:step"
+# Pushed when a chase step is due immediately, to wake the sweeper
+WAKE_KEY = "chase:wake"
+
+# Claims up to ARGV[2] leads due by ARGV[1] by moving their score to the
+# lease expiry ARGV[3], so leads claimed by a crashed sweeper come due again.
+# Returns lead_id, step pairs, flattened.
+_CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local claimed = {}
+for _, lead_id in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], lead_id)
+    table.insert(claimed, lead_id)
+    table.insert(claimed, redis.call('HGET', KEYS[2], lead_id) or '0')
+end
+return claimed
+"""
+
+
+def missing_info_message(missing_fields: Iterable[str]) -> Optional[str]:
+    """Chase SMS asking for the missing fields, None if there is nothing to ask"""
+    prompts = [f"- {MISSING_FIELD_PROMPTS[field]}" for field in missing_fields or [] if field in MISSING_FIELD_PROMPTS]
+    if not prompts:
+        return None
+    return "\n".join([
+        "Hi, we need some additional information:",
+        *prompts,
+        "\nPlease reply with this information. Thank you!",
+    ])
+
+
+def schedule_chases(r: Redis, lead_ids: Iterable[UUID]) -> None:
+    """
+    (Re)start the chase cadence for leads, replacing any chase in progress.
+    """
+    lead_ids = [str(lead_id) for lead_id in lead_ids]
+    if not lead_ids:
+        return
+    delay = settings.CHASE_CADENCE_HOURS[0] * 3600
+    pipe = r.pipeline()
+    pipe.zadd(DUE_KEY, {lead_id: time.time() + delay for lead_id in lead_ids})
+    pipe.hset(STEP_KEY, mapping={lead_id: 0 for lead_id in lead_ids})
+    if delay <= 0:
+        pipe.lpush(WAKE_KEY, 1)
+    pipe.execute()
+
+
+def sweep_chases(db: Session, r: Redis, batch_size: int) -> dict:
+    """
+    Send one batch of due chase steps.
+    Returns counts of claimed leads, messages queued and leads whose chase
+    ended (no longer eligible or out of steps).
+    """
+    now = time.time()
+    claimed = r.eval(
+        _CLAIM_SCRIPT, 2, DUE_KEY, STEP_KEY,
+        now, batch_size, now + settings.CHASE_CLAIM_LEASE_SECONDS,
+    )
+    steps = {
+        UUID(lead_id.decode() if isinstance(lead_id, bytes) else lead_id): int(step)
+        for lead_id, step in zip(claimed[::2], claimed[1::2])
+    }
+    stats = {"claimed": len(steps), "queued": 0, "ended": 0}
+    if not steps:
+        return stats
+    
+    leads = db.execute(
+        select(Lead.id, Lead.customer_id, Lead.phone, Lead.missing_fields)
+        .where(Lead.id.in_(steps), Lead.status == LeadStatus.NEEDS_INFO, Lead.phone.isnot(None))
+    ).all()
+    chased = []
+    for lead in leads:
+        message = missing_info_message(lead.missing_fields)
+        if message:
+            queue_sms(db, lead.phone, message, lead_id=lead.id, customer_id=lead.customer_id)
+            chased.append(lead)
+    db.commit()
+    invalidate_lead_details(db, lead_ids=[lead.id for lead in chased], customer_ids=[lead.customer_id for lead in chased])
+    
+    cadence = settings.CHASE_CADENCE_HOURS
+    next_due = {}
+    for lead in chased:
+        step = steps[lead.id] + 1
+        if step < len(cadence):
+            next_due[str(lead.id)] = (step, now + (cadence[step] - cadence[step - 1]) * 3600)
+    ended = [str(lead_id) for lead_id in steps if str(lead_id) not in next_due]
+    pipe = r.pipeline()
+    if next_due:
+        pipe.zadd(DUE_KEY, {lead_id: due for lead_id, (_, due) in next_due.items()})
+        pipe.hset(STEP_KEY, mapping={lead_id: step for lead_id, (step, _) in next_due.items()})
+    if ended:
+        pipe.zrem(DUE_KEY, *ended)
+        pipe.hdel(STEP_KEY, *ended)
+    pipe.execute()
+    
+    stats["queued"] = len(chased)
+    stats["ended"] = len(ended)
+    return stats
+
+
+def run_chase_sweeper(db: Session, r: Redis, batch_size: int, once: bool = False) -> None:
+    """
+    Sweep due chases until SIGTERM/SIGINT, finishing the current batch first.
+    Between sweeps waits CHASE_SWEEP_INTERVAL_SECONDS, or less when a chase
+    is started. With once, return as soon as nothing is due.
+    """
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    while not stopping:
+        stats = sweep_chases(db, r, batch_size)
+        if stats["claimed"]:
+            print(f"Chased {stats['claimed']} leads: {stats['queued']} SMS queued, {stats['ended']} chases ended", flush=True)
+        if stats["claimed"] < batch_size:
+            if once:
+                break
+            if r.blpop(WAKE_KEY, timeout=settings.CHASE_SWEEP_INTERVAL_SECONDS):
+                r.delete(WAKE_KEY)
+
+
+if __name__ == "__main__":
+    from app.core.db import SessionLocal
+    # Register the related models so the mappers can configure
+    from app.modules.customers.models import Customer  # noqa: F401
+    from app.modules.opportunities.models import Opportunity  # noqa: F401
+    
+    parser = argparse.ArgumentParser(description="Send due qualification chase SMS")
+    parser.add_argument("--batch-size", type=int, default=settings.CHASE_SWEEP_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="Exit when nothing is due")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        run_chase_sweeper(db, Redis.from_url(settings.REDIS_URL), args.batch_size, once=args.once)
+    finally:
+        db.close()
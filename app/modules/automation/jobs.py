@@ -1,5 +1,5 @@
 from rq import get_current_job
-from typing import Optional
+from typing import List, Optional
 import os
 import sys
 
@@ -11,14 +11,19 @@ if project_root not in sys.path:
 
 from app.core.db import SessionLocal
 from app.modules.leads.service import get_lead_detail
-from app.modules.leads.models import LeadStatus
+from app.modules.leads.models import LeadStatus, LeadSource
+from app.modules.automation.chase import missing_info_message
 from app.modules.comms.service import send_sms_to_lead
 from app.modules.comms.providers.twilio_sms import get_twilio_provider
+from app.modules.comms.partitions import ensure_contact_event_partitions
+from app.modules.comms.bulk import run_bulk_sms
+from app.core.idempotency import purge_expired_idempotency_keys
 
 
 def send_missing_info_sms(lead_id: str):
     """
     RQ job to send SMS requesting missing information.
+    Chases are now sent by the chase sweeper; kept for jobs enqueued before it.
     """
     db = SessionLocal()
     try:
@@ -41,38 +46,71 @@ def send_missing_info_sms(lead_id: str):
             return
         
         # Construct SMS message
-        missing_fields = lead.missing_fields or []
-        if not missing_fields:
+        message = missing_info_message(lead.missing_fields)
+        if not message:
             print(f"Lead {lead_id} has no missing fields")
             return
         
-        # Build message
-        message_parts = ["Hi, we need some additional information:"]
-        field_messages = {
-            "name": "Your name",
-            "phone_or_email": "Your phone number or email",
-            "postcode": "Your postcode",
-            "product_interest": "What product/service you're interested in",
-            "timeframe": "When you're looking to proceed",
-        }
-        
-        for field in missing_fields:
-            if field in field_messages:
-                message_parts.append(f"- {field_messages[field]}")
-        
-        message_parts.append("\nPlease reply with this information. Thank you!")
-        message = "\n".join(message_parts)
-        
         # Send SMS
         result = send_sms_to_lead(db=db, lead_id=lead_uuid, message=message)
         
         if result.get("success"):
-            print(f"Sent missing info SMS to lead {lead_id}")
+            print(f"Queued missing info SMS to lead {lead_id}")
         else:
-            print(f"Failed to send SMS to lead {lead_id}: {result.get('error')}")
+            print(f"Failed to queue SMS to lead {lead_id}: {result.get('error')}")
     
     except Exception as e:
         print(f"Error in send_missing_info_sms for lead {lead_id}: {str(e)}")
         raise
     finally:
         db.close()
+
+
+def purge_idempotency_keys():
+    """
+    RQ job to delete idempotency keys past the retention window.
+    """
+    db = SessionLocal()
+    try:
+        deleted = purge_expired_idempotency_keys(db)
+        print(f"Purged {deleted} expired idempotency keys")
+    finally:
+        db.close()
+
+
+def create_contact_event_partitions():
+    """
+    RQ job to create contact_events partitions for upcoming months.
+    """
+    db = SessionLocal()
+    try:
+        created = ensure_contact_event_partitions(db)
+        print(f"Created contact_events partitions: {created or 'none'}")
+    finally:
+        db.close()
+
+
+def send_bulk_sms(
+    bulk_id: str,
+    message: str,
+    lead_ids: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+):
+    """
+    RQ job to queue a bulk SMS created through the API for the outbox dispatcher.
+    """
+    from uuid import UUID
+    db = SessionLocal()
+    try:
+        result = run_bulk_sms(
+            db,
+            bulk_id,
+            message,
+            lead_ids=[UUID(lead_id) for lead_id in lead_ids] if lead_ids else None,
+            status=LeadStatus(status) if status else None,
+            source=LeadSource(source) if source else None,
+        )
+        print(f"Bulk SMS {bulk_id} {result['status']}: {result['queued']} queued")
+    finally:
+        db.close()
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.core.db import get_db
-from app.modules.automation.service import start_qualification_chase
+from app.core.db import get_async_db
+from app.modules.automation.service import (
+    start_qualification_chase,
+    enqueue_idempotency_key_purge,
+    enqueue_contact_event_partitions,
+)
 from app.modules.leads.service import request_info_for_lead
 
 router = APIRouter()
@@ -12,7 +17,7 @@ router = APIRouter()
 @router.post("/leads/{lead_id}/chase")
 async def trigger_qualification_chase(
     lead_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Manually trigger qualification chase for a lead.
@@ -20,10 +25,10 @@ async def trigger_qualification_chase(
     """
     try:
         # Ensure lead is in NEEDS_INFO status
-        lead = request_info_for_lead(db=db, lead_id=lead_id)
+        lead = await db.run_sync(request_info_for_lead, lead_id=lead_id)
         
         # Start automation
-        start_qualification_chase(db=db, lead_id=lead_id)
+        await run_in_threadpool(start_qualification_chase, lead_id=lead_id)
         
         return {
             "success": True,
@@ -32,3 +37,23 @@ async def trigger_qualification_chase(
         }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/maintenance/idempotency-keys/purge")
+async def trigger_idempotency_key_purge():
+    """
+    Enqueue deletion of idempotency keys past IDEMPOTENCY_KEY_RETENTION_DAYS.
+    Intended to be called daily from a cron.
+    """
+    job = await run_in_threadpool(enqueue_idempotency_key_purge)
+    return {"success": True, "job_id": job.id}
+
+
+@router.post("/maintenance/contact-events/partitions")
+async def trigger_contact_event_partitions():
+    """
+    Enqueue creation of contact_events partitions for upcoming months.
+    Intended to be called daily from a cron, alongside the idempotency key purge.
+    """
+    job = await run_in_threadpool(enqueue_contact_event_partitions)
+    return {"success": True, "job_id": job.id}
@@ -1,8 +1,8 @@
-from sqlalchemy.orm import Session
 from uuid import UUID
-from datetime import timedelta
+from typing import List, Optional
 
 from app.core.config import settings
+from app.modules.automation.chase import schedule_chases
 from redis import Redis
 from rq import Queue
 
@@ -11,25 +11,55 @@ redis_conn = Redis.from_url(settings.REDIS_URL)
 queue = Queue("default", connection=redis_conn)
 
 
-def start_qualification_chase(db: Session, lead_id: UUID):
+def start_qualification_chase(lead_id: UUID):
     """
-    Start qualification chase automation for a lead.
-    - Enqueues immediate SMS
-    - Enqueues follow-up SMS in 4 hours
+    Start (or restart) the qualification chase for a lead: missing-info SMS
+    at each CHASE_CADENCE_HOURS offset while it stays NEEDS_INFO, sent by
+    the chase sweeper (app/modules/automation/chase.py).
+    Blocking Redis call: from async routes, run it in the threadpool after
+    the DB work.
     """
-    from app.modules.automation.jobs import send_missing_info_sms
+    schedule_chases(redis_conn, [lead_id])
+
+
+def enqueue_idempotency_key_purge():
+    """Enqueue the idempotency key retention job"""
+    from app.modules.automation.jobs import purge_idempotency_keys
+    
+    return queue.enqueue(
+        purge_idempotency_keys,
+        job_id="purge_idempotency_keys",
+    )
+
+
+def enqueue_contact_event_partitions():
+    """Enqueue creation of upcoming contact_events partitions"""
+    from app.modules.automation.jobs import create_contact_event_partitions
     
-    # Enqueue immediate job
-    queue.enqueue(
-        send_missing_info_sms,
-        str(lead_id),
-        job_id=f"qualification_chase_immediate_{lead_id}",
+    return queue.enqueue(
+        create_contact_event_partitions,
+        job_id="create_contact_event_partitions",
     )
+
+
+def enqueue_bulk_sms(
+    bulk_id: str,
+    message: str,
+    lead_ids: Optional[List[UUID]] = None,
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+):
+    """Enqueue a bulk SMS send created by create_bulk_sms"""
+    from app.modules.automation.jobs import send_bulk_sms
     
-    # Enqueue follow-up in 4 hours
-    queue.enqueue_in(
-        timedelta(hours=4),
-        send_missing_info_sms,
-        str(lead_id),
-        job_id=f"qualification_chase_followup_{lead_id}",
+    return queue.enqueue(
+        send_bulk_sms,
+        args=(bulk_id, message),
+        kwargs={
+            "lead_ids": [str(lead_id) for lead_id in lead_ids] if lead_ids else None,
+            "status": status,
+            "source": source,
+        },
+        job_id=f"send_bulk_sms_{bulk_id}",
+        job_timeout=settings.SMS_BULK_JOB_TIMEOUT_SECONDS,
     )
@@ -0,0 +1,232 @@
+"""
+Bulk SMS fan-out for campaigns and chases.
+
+create_bulk_sms() validates the message template and counts the targeted
+leads, and record_bulk_sms() stores progress in a Redis hash. run_bulk_sms()
+then runs in an RQ job: leads are read in keyset chunks and each chunk's
+messages are queued through the SMS outbox (comms/outbox.py) with their
+timeline events in one transaction. The outbox dispatcher sends them within
+the sender number's rate limit and counts them as sent or failed with
+count_bulk_results(). Cancellation is checked between chunks.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from datetime import datetime
+from string import Formatter
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+import enum
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.config import settings
+from app.modules.comms.service import queue_sms
+from app.modules.leads.cache import invalidate_lead_details
+from app.modules.leads.models import Lead, LeadStatus, LeadSource
+from app.modules.leads.scoring import MISSING_FIELD_PROMPTS
+
+# Placeholders allowed in bulk message templates, e.g. "Hi {first_name}, ..."
+TEMPLATE_FIELDS = ("name", "first_name", "postcode", "product_interest", "timeframe", "missing_fields")
+
+STATE_TTL_SECONDS = 7 * 24 * 3600
+
+
+class BulkSMSStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+
+_redis: Optional[Redis] = None
+
+
+def _state_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def _state_key(bulk_id: str) -> str:
+    return f"sms_bulk:{bulk_id}"
+
+
+def validate_template(template: str) -> None:
+    """Raise ValueError unless the template only uses TEMPLATE_FIELDS placeholders"""
+    if not template.strip():
+        raise ValueError("Message template is empty")
+    try:
+        fields = [field for _, field, _, _ in Formatter().parse(template) if field is not None]
+    except ValueError as e:
+        raise ValueError(f"Invalid message template: {e}")
+    unknown = [field for field in fields if field not in TEMPLATE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown template placeholders {unknown}, allowed: {list(TEMPLATE_FIELDS)}")
+
+
+def _render(template: str, lead) -> str:
+    name = (lead.name or "").strip()
+    prompts = [MISSING_FIELD_PROMPTS.get(field, field) for field in lead.missing_fields or []]
+    return template.format_map({
+        "name": name,
+        "first_name": name.split()[0] if name else "",
+        "postcode": lead.postcode or "",
+        "product_interest": lead.product_interest or "",
+        "timeframe": lead.timeframe or "",
+        "missing_fields": ", ".join(prompt[0].lower() + prompt[1:] for prompt in prompts),
+    })
+
+
+def _lead_filter(
+    lead_ids: Optional[List[UUID]],
+    status: Optional[LeadStatus],
+    source: Optional[LeadSource],
+) -> list:
+    if not lead_ids and status is None:
+        raise ValueError("Select leads with lead_ids or status")
+    where = [Lead.phone.isnot(None), Lead.phone != ""]
+    if lead_ids:
+        where.append(Lead.id.in_(lead_ids))
+    if status is not None:
+        where.append(Lead.status == status)
+    if source is not None:
+        where.append(Lead.source == source)
+    return where
+
+
+def create_bulk_sms(
+    db: Session,
+    message: str,
+    lead_ids: Optional[List[UUID]] = None,
+    status: Optional[LeadStatus] = None,
+    source: Optional[LeadSource] = None,
+) -> dict:
+    """
+    Validate a bulk send and build its queued state, for record_bulk_sms.
+    Leads without a phone number are not counted or sent to.
+    Raises ValueError for an invalid template or filter.
+    """
+    validate_template(message)
+    total = db.execute(
+        select(func.count()).select_from(Lead).where(*_lead_filter(lead_ids, status, source))
+    ).scalar()
+    
+    bulk_id = uuid4().hex
+    state = {
+        "id": bulk_id,
+        "status": BulkSMSStatus.QUEUED.value,
+        "total": total,
+        "queued": 0,
+        "sent": 0,
+        "failed": 0,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    return state
+
+
+def record_bulk_sms(state: dict) -> None:
+    """Store a bulk send's state from create_bulk_sms, before it is enqueued"""
+    pipe = _state_redis().pipeline()
+    pipe.hset(_state_key(state["id"]), mapping=state)
+    pipe.expire(_state_key(state["id"]), STATE_TTL_SECONDS)
+    pipe.execute()
+
+
+def get_bulk_sms(bulk_id: str) -> Optional[dict]:
+    """Progress of a bulk send, None if unknown or expired"""
+    state = _state_redis().hgetall(_state_key(bulk_id))
+    if not state:
+        return None
+    for counter in ("total", "queued", "sent", "failed"):
+        state[counter] = int(state.get(counter, 0))
+    state["cancel_requested"] = bool(state.get("cancel_requested"))
+    return state
+
+
+def cancel_bulk_sms(bulk_id: str) -> Optional[dict]:
+    """
+    Ask a queued or running bulk send to stop.
+    It stops before its next chunk, and messages already queued are still
+    sent.
+    """
+    state = get_bulk_sms(bulk_id)
+    if state and state["status"] in (BulkSMSStatus.QUEUED.value, BulkSMSStatus.RUNNING.value):
+        _state_redis().hset(_state_key(bulk_id), "cancel_requested", 1)
+        state["cancel_requested"] = True
+    return state
+
+
+def run_bulk_sms(
+    db: Session,
+    bulk_id: str,
+    message: str,
+    lead_ids: Optional[List[UUID]] = None,
+    status: Optional[LeadStatus] = None,
+    source: Optional[LeadSource] = None,
+) -> dict:
+    """Queue a bulk SMS created by create_bulk_sms. Blocks until queued, for the worker."""
+    where = _lead_filter(lead_ids, status, source)
+    r = _state_redis()
+    key = _state_key(bulk_id)
+    r.hset(key, mapping={"status": BulkSMSStatus.RUNNING.value, "started_at": datetime.utcnow().isoformat()})
+    
+    columns = [
+        Lead.id, Lead.customer_id, Lead.phone, Lead.name,
+        Lead.postcode, Lead.product_interest, Lead.timeframe, Lead.missing_fields,
+    ]
+    final_status = BulkSMSStatus.COMPLETED
+    after = None
+    try:
+        while True:
+            if r.hget(key, "cancel_requested"):
+                final_status = BulkSMSStatus.CANCELLED
+                break
+            stmt = select(*columns).where(*where)
+            if after is not None:
+                stmt = stmt.where(Lead.id > after)
+            leads = db.execute(stmt.order_by(Lead.id).limit(settings.SMS_BULK_CHUNK_SIZE)).all()
+            if not leads:
+                break
+            after = leads[-1].id
+            
+            for lead in leads:
+                queue_sms(
+                    db,
+                    lead.phone,
+                    _render(message, lead),
+                    lead_id=lead.id,
+                    customer_id=lead.customer_id,
+                    bulk_id=bulk_id,
+                )
+            # Commit every chunk so no transaction spans the whole send
+            db.commit()
+            invalidate_lead_details(db, lead_ids=[lead.id for lead in leads])
+            r.hincrby(key, "queued", len(leads))
+    except Exception as e:
+        final_status = BulkSMSStatus.FAILED
+        r.hset(key, "last_error", str(e))
+        raise
+    finally:
+        r.hset(key, mapping={"status": final_status.value, "finished_at": datetime.utcnow().isoformat()})
+    
+    return get_bulk_sms(bulk_id)
+
+
+async def count_bulk_results(redis_conn: AsyncRedis, results: Dict[str, dict]) -> None:
+    """
+    Add dispatched messages to their bulk sends' progress.
+    results maps bulk_id to {"sent": n, "failed": n, "last_error": str or None}.
+    """
+    if not results:
+        return
+    pipe = redis_conn.pipeline()
+    for bulk_id, counts in results.items():
+        key = _state_key(bulk_id)
+        pipe.hincrby(key, "sent", counts["sent"])
+        pipe.hincrby(key, "failed", counts["failed"])
+        if counts["last_error"]:
+            pipe.hset(key, "last_error", counts["last_error"])
+    await pipe.execute()
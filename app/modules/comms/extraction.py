@@ -0,0 +1,117 @@
+"""
+Qualification fields from free-text SMS replies.
+
+All detectors are alternatives of one precompiled regex, so a reply is
+scanned once whatever it contains. The first match of each field wins.
+"""
+from typing import Dict, Iterable, Optional
+import re
+
+from app.core.utils import UK_POSTCODE_PATTERN, format_uk_postcode
+
+# Lead fields extract_reply_fields can fill
+EXTRACTABLE_FIELDS = ("name", "email", "postcode", "product_interest", "timeframe")
+
+# Keyword -> product_interest value
+PRODUCT_KEYWORDS = {
+    "solar": "Solar panels",
+    "solar panel": "Solar panels",
+    "solar panels": "Solar panels",
+    "solar pv": "Solar panels",
+    "pv panels": "Solar panels",
+    "heat pump": "Heat pump",
+    "heat pumps": "Heat pump",
+    "air source": "Heat pump",
+    "ground source": "Heat pump",
+    "battery": "Battery storage",
+    "batteries": "Battery storage",
+    "battery storage": "Battery storage",
+    "ev charger": "EV charger",
+    "ev charging": "EV charger",
+    "car charger": "EV charger",
+    "boiler": "Boiler",
+    "insulation": "Insulation",
+    "loft insulation": "Insulation",
+    "cavity wall": "Insulation",
+    "double glazing": "Windows",
+    "windows": "Windows",
+}
+
+# Timeframe phrases stored as "ASAP", anything else matched is stored as written
+ASAP_PHRASES = {"asap", "a.s.a.p", "as soon as possible", "immediately", "urgent", "urgently", "right away"}
+
+# Capitalized words that follow "this is" without being a name ("This is Fine")
+NOT_NAMES = {
+    "fine", "ok", "okay", "good", "great", "correct", "right", "wrong", "urgent",
+    "interested", "available", "perfect", "true", "me", "him", "her", "them",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+
+_NUMBER = r"(?:a|an|one|two|three|four|five|six|twelve|\d{1,2})"
+_TIMEFRAME_PATTERN = "|".join([
+    *(re.escape(phrase) for phrase in sorted(ASAP_PHRASES, key=len, reverse=True)),
+    r"(?:this|next)\s+(?:week|month|year)",
+    rf"(?:within|in)\s+(?:the\s+next\s+)?{_NUMBER}(?:\s*(?:-|to)\s*\d{{1,2}})?\s+(?:days?|weeks?|months?|years?)",
+    r"\d{1,2}\s*(?:-|to)\s*\d{1,2}\s+(?:weeks|months)",
+    r"(?:in\s+the\s+)?(?:spring|summer|autumn|winter)",
+    r"no\s+rush",
+])
+
+
+def _keywords(keywords: Iterable[str]) -> str:
+    """Alternation of keywords, longest first, matching any whitespace between words"""
+    return "|".join(
+        re.escape(keyword).replace(r"\ ", r"\s+")
+        for keyword in sorted(keywords, key=len, reverse=True)
+    )
+
+
+# Every alternative starts at a word start, so most positions fail on the first
+# check. Alternatives are tried in order: email before postcode, so the local
+# part of an address is never read as a postcode.
+_REPLY_FIELDS = re.compile(
+    r"(?<![\w.+-])(?:"
+    r"(?P<email>\w[\w.+-]*@[\w-]+(?:\.[\w-]+)+)"
+    rf"|(?P<postcode>{UK_POSTCODE_PATTERN})"
+    rf"|(?P<timeframe>{_TIMEFRAME_PATTERN})\b"
+    rf"|(?P<product_interest>{_keywords(PRODUCT_KEYWORDS)})\b"
+    # Names only after an explicit introduction, and only if capitalized; "I'm"
+    # and "it's" are left out as they introduce far more replies than names
+    r"|(?:my\s+name\s+is|my\s+name's|name\s+is|name\s*:|this\s+is)\s+"
+    rf"(?!(?:{_keywords(NOT_NAMES)})\b)"
+    r"(?P<name>(?-i:[A-Z][a-z'\-]+(?:\s+[A-Z][a-z'\-]+)?))"
+    r")",
+    re.IGNORECASE,
+)
+
+
+def _value(field: str, text: str) -> str:
+    if field == "postcode":
+        return format_uk_postcode(text)
+    if field == "email":
+        return text.lower()
+    phrase = " ".join(text.split())
+    if field == "product_interest":
+        return PRODUCT_KEYWORDS[phrase.lower()]
+    if field == "timeframe":
+        return "ASAP" if phrase.lower() in ASAP_PHRASES else phrase[0].upper() + phrase[1:]
+    return phrase
+
+
+def extract_reply_fields(text: Optional[str], wanted: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Detect lead fields in an SMS reply with a single scan.
+    wanted limits the result to those fields and stops scanning once all
+    are found. Returns {field: value} for fields detected.
+    """
+    if not text:
+        return {}
+    wanted = set(EXTRACTABLE_FIELDS if wanted is None else wanted)
+    found = {}
+    for match in _REPLY_FIELDS.finditer(text):
+        field = match.lastgroup
+        if field in wanted and field not in found:
+            found[field] = _value(field, match.group(field))
+            if len(found) == len(wanted):
+                break
+    return found
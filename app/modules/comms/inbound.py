@@ -0,0 +1,185 @@
+"""
+Fast-ack intake for inbound SMS.
+
+With TWILIO_WEBHOOK_FAST_ACK the Twilio webhook only verifies the signature
+and appends the message to the sms_inbound Redis Stream, then answers.
+Consumers in the sms_inbound group run handle_inbound_sms on each entry:
+
+    python -m app.modules.comms.inbound [--consumer inbound-1]
+
+An entry is acknowledged once handled. Entries left pending by a crashed or
+failing consumer are reclaimed after SMS_INBOUND_CLAIM_IDLE_SECONDS and moved
+to the sms_inbound:dead stream after SMS_INBOUND_MAX_DELIVERIES attempts.
+handle_inbound_sms skips MessageSids it has already claimed, so redelivery
+does not duplicate events.
+"""
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+import argparse
+import signal
+import socket
+import os
+
+from redis import Redis, ResponseError
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.config import settings
+from app.modules.comms.service import handle_inbound_sms
+
+STREAM = "sms_inbound"
+DEAD_LETTER_STREAM = "sms_inbound:dead"
+GROUP = "sms_inbound"
+
+_redis: Optional[AsyncRedis] = None
+
+
+def _stream_redis() -> AsyncRedis:
+    global _redis
+    if _redis is None:
+        _redis = AsyncRedis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def append_inbound_sms(from_number: str, body: str, message_sid: str) -> str:
+    """Append a webhook's message to the stream, returns the entry id"""
+    entry_id = await _stream_redis().xadd(
+        STREAM,
+        {
+            "from": from_number,
+            "body": body,
+            "message_sid": message_sid,
+            "received_at": datetime.utcnow().isoformat(),
+        },
+        maxlen=settings.SMS_INBOUND_STREAM_MAXLEN,
+        approximate=True,
+    )
+    return entry_id.decode()
+
+
+async def close_inbound_stream() -> None:
+    """Close the webhook's stream connection, if opened"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def ensure_consumer_group(r: Redis) -> None:
+    """Create the stream and consumer group, reading from the start, if missing"""
+    try:
+        r.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def process_inbound_entry(db: Session, r: Redis, entry_id: str, fields: dict) -> dict:
+    """
+    Handle one stream entry and acknowledge it. Exceptions leave it pending,
+    to be reclaimed and retried.
+    """
+    try:
+        result = handle_inbound_sms(
+            db,
+            from_number=fields.get("from", ""),
+            body=fields.get("body", ""),
+            message_sid=fields.get("message_sid", ""),
+        )
+    except Exception:
+        db.rollback()
+        raise
+    # Rejected messages (e.g. an invalid number) would fail the same way again
+    r.xack(STREAM, GROUP, entry_id)
+    return result
+
+
+def _dead_letter(r: Redis, entry_id: str, fields: dict, deliveries: int) -> None:
+    pipe = r.pipeline()
+    pipe.xadd(DEAD_LETTER_STREAM, {**fields, "entry_id": entry_id, "deliveries": deliveries})
+    pipe.xack(STREAM, GROUP, entry_id)
+    pipe.execute()
+
+
+def _deliveries(r: Redis, entry_id: str) -> int:
+    pending = r.xpending_range(STREAM, GROUP, min=entry_id, max=entry_id, count=1)
+    return pending[0]["times_delivered"] if pending else 0
+
+
+def consume_inbound_sms(db: Session, consumer: str, batch_size: int = 100, once: bool = False) -> None:
+    """
+    Process stream entries as consumer until SIGTERM/SIGINT, finishing the
+    current entry first. With once, return as soon as the stream is drained.
+    """
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    r = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    ensure_consumer_group(r)
+    idle_ms = settings.SMS_INBOUND_CLAIM_IDLE_SECONDS * 1000
+    try:
+        while not stopping:
+            # Entries another consumer left pending take priority over new ones
+            entries = r.xautoclaim(STREAM, GROUP, consumer, min_idle_time=idle_ms, count=batch_size)[1]
+            reclaimed = bool(entries)
+            if not entries:
+                response = r.xreadgroup(
+                    GROUP, consumer, {STREAM: ">"}, count=batch_size, block=None if once else 5000,
+                )
+                entries = response[0][1] if response else []
+            if not entries and once:
+                break
+    
+            handled = failed = 0
+            for entry_id, fields in entries:
+                if stopping:
+                    break
+                if fields is None:
+                    # Trimmed from the stream while pending
+                    r.xack(STREAM, GROUP, entry_id)
+                    continue
+                if reclaimed:
+                    deliveries = _deliveries(r, entry_id)
+                    if deliveries > settings.SMS_INBOUND_MAX_DELIVERIES:
+                        _dead_letter(r, entry_id, fields, deliveries)
+                        print(f"Moved {entry_id} to {DEAD_LETTER_STREAM} after {deliveries} deliveries", flush=True)
+                        continue
+                try:
+                    process_inbound_entry(db, r, entry_id, fields)
+                    handled += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"Failed to process {entry_id}: {e!r}", flush=True)
+            if entries:
+                print(f"Processed {len(entries)} inbound SMS: {handled} handled, {failed} failed", flush=True)
+    finally:
+        # Deleting a consumer drops its pending entries, so keep it while it has any
+        if not r.xpending_range(STREAM, GROUP, min="-", max="+", count=1, consumername=consumer):
+            r.xgroup_delconsumer(STREAM, GROUP, consumer)
+        r.close()
+
+
+if __name__ == "__main__":
+    from app.core.db import SessionLocal
+    # Register the related models so the mappers can configure
+    from app.modules.customers.models import Customer  # noqa: F401
+    from app.modules.leads.models import Lead  # noqa: F401
+    from app.modules.opportunities.models import Opportunity  # noqa: F401
+    
+    parser = argparse.ArgumentParser(description="Process inbound SMS from the fast-ack stream")
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--once", action="store_true", help="Exit when the stream is drained")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        consume_inbound_sms(db, args.consumer, args.batch_size, once=args.once)
+    finally:
+        db.close()
@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, Text, ForeignKey, Enum as SQLEnum, DateTime, Index
+from sqlalchemy import Column, String, Text, ForeignKey, Enum as SQLEnum, DateTime, Index, Integer, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 import enum
 
-from app.core.db import Base
+from app.core.db import Base, enum_values
 
 
 class ContactChannel(str, enum.Enum):
@@ -23,19 +23,86 @@ class ContactDirection(str, enum.Enum):
     INTERNAL = "internal"
 
 
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+
 class ContactEvent(Base):
     __tablename__ = "contact_events"
-
+    # Monthly partitions, see app/modules/comms/partitions.py
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True, index=True)
-    lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), nullable=True, index=True)
-    channel = Column(SQLEnum(ContactChannel), nullable=False)
-    direction = Column(SQLEnum(ContactDirection), nullable=False)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True)
+    lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), nullable=True)
+    channel = Column(SQLEnum(ContactChannel, values_callable=enum_values), nullable=False)
+    direction = Column(SQLEnum(ContactDirection, values_callable=enum_values), nullable=False)
     subject = Column(String, nullable=True)
     body = Column(Text, nullable=False)
     meta = Column(JSONB, nullable=True)  # Store additional metadata like Twilio SID, status, etc.
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
-
+    # Part of the primary key, as Postgres requires for the partition key
+    created_at = Column(DateTime, default=datetime.utcnow, primary_key=True, index=True)
+    
     # Relationships
     customer = relationship("Customer", back_populates="contact_events")
     lead = relationship("Lead", back_populates="contact_events")
+
+
+# Timeline: one index-ordered scan per side of the customer/lead UNION ALL
+Index(
+    "ix_contact_events_customer_timeline",
+    ContactEvent.customer_id,
+    ContactEvent.created_at.desc(),
+    ContactEvent.id.desc(),
+)
+Index(
+    "ix_contact_events_lead_timeline",
+    ContactEvent.lead_id,
+    ContactEvent.created_at.desc(),
+    ContactEvent.id.desc(),
+)
+
+# Inbound SMS deduplication on Twilio's MessageSid
+Index(
+    "ix_contact_events_twilio_message_sid",
+    ContactEvent.meta["twilio_message_sid"].astext,
+    postgresql_where=ContactEvent.meta.has_key("twilio_message_sid"),
+)
+
+
+class SMSOutbox(Base):
+    """
+    Outbound SMS waiting for the dispatcher (app/modules/comms/outbox.py).
+    Written in the same transaction as its ContactEvent; deleted once sent,
+    kept as failed once out of attempts.
+    """
+    __tablename__ = "sms_outbox"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # No foreign key: contact_events partitions are archived independently
+    contact_event_id = Column(UUID(as_uuid=True), nullable=False)
+    contact_event_created_at = Column(DateTime, nullable=False)
+    lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), nullable=True)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True)
+    to_number = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(
+        SQLEnum(OutboxStatus, name="outboxstatus", values_callable=enum_values),
+        nullable=False,
+        default=OutboxStatus.PENDING,
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    # Bulk send the message belongs to, for its progress counters
+    bulk_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Dispatcher claim order; failed rows stay out of the index
+Index(
+    "ix_sms_outbox_pending",
+    SMSOutbox.available_at,
+    postgresql_where=text("status = 'pending'"),
+)
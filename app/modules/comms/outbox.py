@@ -0,0 +1,238 @@
+"""
+Dispatcher for the outbound SMS outbox.
+
+    python -m app.modules.comms.outbox [--batch-size 50] [--once]
+
+queue_sms() (comms/service.py) writes each message as a ContactEvent plus an
+sms_outbox row in the caller's transaction. A dispatcher pass claims up to
+batch_size due rows with FOR UPDATE SKIP LOCKED, so any number of
+dispatchers can run side by side, and leases them by moving available_at
+SMS_OUTBOX_LEASE_SECONDS ahead in a short transaction. It then sends them
+concurrently within the sender number's rate limit with no transaction
+open, and in a second transaction records the Twilio SID and status on each
+event and deletes the sent rows. Messages of bulk sends (comms/bulk.py) are
+then counted in their progress. Delivery is at least once: rows of a
+dispatcher that dies before settling are sent again once their lease ends.
+
+Between passes a dispatcher waits for NOTIFY sms_outbox, issued by
+queue_sms, or at most SMS_OUTBOX_POLL_SECONDS.
+"""
+from sqlalchemy import select, update, delete, bindparam, cast, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import select as select_fd
+import signal
+import time
+
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.ratelimit import RedisTokenBucket
+from app.modules.comms.models import ContactEvent, SMSOutbox, OutboxStatus
+from app.modules.comms.providers.twilio_sms import TwilioSMSProvider, get_twilio_provider
+from app.modules.leads.cache import invalidate_lead_details
+
+OUTBOX_NOTIFY_CHANNEL = "sms_outbox"
+
+_events = ContactEvent.__table__
+# Merges the dispatch result into each event's meta, addressed by its full
+# primary key so only one partition is touched
+_patch_event_meta = (
+    _events.update()
+    .where(_events.c.id == bindparam("b_id"), _events.c.created_at == bindparam("b_created_at"))
+    .values(meta=func.coalesce(_events.c.meta, cast({}, JSONB)).op("||")(bindparam("b_meta", type_=JSONB)))
+)
+
+
+async def dispatch_outbox_batch(
+    db: Session,
+    provider: TwilioSMSProvider,
+    bucket: RedisTokenBucket,
+    redis_conn: AsyncRedis,
+    batch_size: int,
+) -> dict:
+    """
+    Claim, send and settle one batch of due outbox rows, then count bulk
+    sends' messages in their progress.
+    Returns counts of claimed, sent, retried and failed rows.
+    """
+    # Claim: lease the rows by pushing available_at past the send, and commit
+    # so no transaction or row lock is held while waiting on the rate limit
+    now = datetime.utcnow()
+    due = (
+        select(SMSOutbox.id)
+        .where(SMSOutbox.status == OutboxStatus.PENDING, SMSOutbox.available_at <= now)
+        .order_by(SMSOutbox.available_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(SMSOutbox)
+        .where(SMSOutbox.id.in_(due.scalar_subquery()))
+        .values(
+            available_at=now + timedelta(seconds=settings.SMS_OUTBOX_LEASE_SECONDS),
+            attempts=SMSOutbox.attempts + 1,
+        )
+        .returning(
+            SMSOutbox.id,
+            SMSOutbox.contact_event_id,
+            SMSOutbox.contact_event_created_at,
+            SMSOutbox.lead_id,
+            SMSOutbox.customer_id,
+            SMSOutbox.to_number,
+            SMSOutbox.body,
+            SMSOutbox.attempts,
+            SMSOutbox.bulk_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    stats = {"claimed": len(rows), "sent": 0, "retried": 0, "failed": 0}
+    if not rows:
+        return stats
+    
+    concurrency = asyncio.Semaphore(settings.SMS_OUTBOX_CONCURRENCY)
+    
+    async def send(row) -> dict:
+        async with concurrency:
+            await bucket.acquire()
+            return await provider.asend_sms(to_number=row.to_number, body=row.body)
+    
+    results = await asyncio.gather(*(send(row) for row in rows))
+    
+    # Settle in a second transaction
+    now = datetime.utcnow()
+    sent_ids, retries, failures, patches = [], [], [], []
+    bulk_results = {}
+    for row, result in zip(rows, results):
+        if not result.get("error"):
+            meta = {"twilio_sid": result.get("sid"), "twilio_status": result.get("status")}
+            sent_ids.append(row.id)
+            stats["sent"] += 1
+            if row.bulk_id:
+                bulk_results.setdefault(row.bulk_id, {"sent": 0, "failed": 0, "last_error": None})["sent"] += 1
+        elif result.get("retryable") and row.attempts < settings.SMS_OUTBOX_MAX_ATTEMPTS:
+            retries.append({
+                "id": row.id,
+                "last_error": result["error"],
+                "available_at": now + timedelta(seconds=settings.SMS_OUTBOX_RETRY_SECONDS * 2 ** (row.attempts - 1)),
+            })
+            stats["retried"] += 1
+            continue
+        else:
+            meta = {"twilio_status": "failed", "error": result["error"]}
+            failures.append({"id": row.id, "status": OutboxStatus.FAILED, "last_error": result["error"]})
+            stats["failed"] += 1
+            if row.bulk_id:
+                counts = bulk_results.setdefault(row.bulk_id, {"sent": 0, "failed": 0, "last_error": None})
+                counts["failed"] += 1
+                counts["last_error"] = result["error"]
+        patches.append({"b_id": row.contact_event_id, "b_created_at": row.contact_event_created_at, "b_meta": meta})
+    
+    if sent_ids:
+        db.execute(delete(SMSOutbox).where(SMSOutbox.id.in_(sent_ids)).execution_options(synchronize_session=False))
+    for changes in (retries, failures):
+        if changes:
+            db.execute(update(SMSOutbox), changes)
+    if patches:
+        db.execute(_patch_event_meta, patches)
+    db.commit()
+    invalidate_lead_details(
+        db,
+        lead_ids=[row.lead_id for row in rows],
+        customer_ids=[row.customer_id for row in rows],
+    )
+    if bulk_results:
+        # bulk imports comms.service, which imports this module
+        from app.modules.comms.bulk import count_bulk_results
+        await count_bulk_results(redis_conn, bulk_results)
+    return stats
+
+
+def _listen():
+    """Dedicated autocommit connection listening on the outbox channel"""
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    conn.exec_driver_sql(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+    return conn
+
+
+def _wait_for_notify(conn, timeout: float) -> None:
+    """Block until a notification arrives or timeout passes"""
+    notify_conn = conn.connection.driver_connection
+    if not notify_conn.notifies:
+        select_fd.select([notify_conn], [], [], timeout)
+        notify_conn.poll()
+    notify_conn.notifies.clear()
+
+
+def run_dispatcher(db: Session, batch_size: int, once: bool = False) -> None:
+    """
+    Dispatch outbox rows until SIGTERM/SIGINT, finishing the current batch
+    first. With once, return as soon as nothing is due.
+    """
+    asyncio.run(_run_dispatcher(db, batch_size, once))
+
+
+async def _run_dispatcher(db: Session, batch_size: int, once: bool) -> None:
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    provider = get_twilio_provider()
+    async_redis = AsyncRedis.from_url(settings.REDIS_URL)
+    # Same key as bulk sends, so both share the sender number's limit
+    bucket = RedisTokenBucket(
+        async_redis,
+        key=f"sms_rate:{provider.phone_number}",
+        rate=settings.SMS_SEND_RATE_PER_SECOND,
+        capacity=settings.SMS_SEND_BURST,
+    )
+    listener = None if once else _listen()
+    try:
+        while not stopping:
+            started = time.perf_counter()
+            stats = await dispatch_outbox_batch(db, provider, bucket, async_redis, batch_size)
+            if stats["claimed"]:
+                elapsed = time.perf_counter() - started
+                print(
+                    f"Dispatched {stats['claimed']} in {elapsed:.2f}s: "
+                    f"{stats['sent']} sent, {stats['retried']} retried, {stats['failed']} failed",
+                    flush=True,
+                )
+            if stats["claimed"] < batch_size:
+                if once:
+                    break
+                _wait_for_notify(listener, settings.SMS_OUTBOX_POLL_SECONDS)
+    finally:
+        if listener is not None:
+            listener.close()
+        await provider.aclose()
+        await async_redis.aclose()
+
+
+if __name__ == "__main__":
+    from app.core.db import SessionLocal
+    # Register the related models so the mappers can configure
+    from app.modules.customers.models import Customer  # noqa: F401
+    from app.modules.leads.models import Lead  # noqa: F401
+    from app.modules.opportunities.models import Opportunity  # noqa: F401
+    
+    parser = argparse.ArgumentParser(description="Send queued outbound SMS")
+    parser.add_argument("--batch-size", type=int, default=settings.SMS_OUTBOX_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="Exit when nothing is due")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        run_dispatcher(db, args.batch_size, once=args.once)
+    finally:
+        db.close()
@@ -0,0 +1,247 @@
+"""
+Monthly range partitions of contact_events.
+
+Partitions are named contact_events_YYYY_MM and cover one calendar month of
+created_at. A contact_events_default partition catches rows outside every
+range, so inserts never fail if a future partition was not created in time;
+ensure moves such rows into the month's partition when it creates it.
+Old partitions can be archived to gzipped JSONL files and restored later:
+
+    python -m app.modules.comms.partitions ensure
+    python -m app.modules.comms.partitions archive [--older-than-months N] [--dir DIR]
+    python -m app.modules.comms.partitions restore archive/contact_events/contact_events_2025_01.jsonl.gz
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import List, Optional
+import argparse
+import gzip
+import os
+import re
+import sys
+
+from app.core.config import settings
+
+PARENT_TABLE = "contact_events"
+DEFAULT_PARTITION = "contact_events_default"
+_PARTITION_NAME = re.compile(r"contact_events_(\d{4})_(\d{2})")
+
+# Rows per INSERT when restoring an archive
+RESTORE_BATCH_SIZE = 5000
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding the given month"""
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    match = _PARTITION_NAME.fullmatch(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def list_contact_event_partitions(db: Session) -> List[tuple[str, date]]:
+    """Attached monthly partitions as (name, month), oldest first"""
+    stmt = text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass)"
+    )
+    partitions = []
+    for name in db.execute(stmt, {"parent": PARENT_TABLE}).scalars():
+        month = _partition_month(name)
+        if month:
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_contact_event_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create missing partitions from the current month up to months_ahead
+    months in the future. Returns the names of created partitions.
+    """
+    if months_ahead is None:
+        months_ahead = settings.CONTACT_EVENT_PARTITIONS_AHEAD_MONTHS
+    
+    existing = {name for name, _ in list_contact_event_partitions(db)}
+    current = datetime.utcnow().date().replace(day=1)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        moved = _create_partition(db, name, month)
+        if moved:
+            print(f"Moved {moved} rows from {DEFAULT_PARTITION} into new partition {name}", file=sys.stderr)
+        created.append(name)
+    db.commit()
+    return created
+
+
+def _create_partition(db: Session, name: str, month: date) -> int:
+    """
+    Create and attach the partition for a month. Rows for the month already
+    caught by the default partition (e.g. after a missed run) would make
+    CREATE ... PARTITION OF fail, so they are moved into the new table
+    before it is attached. Returns the number of rows moved.
+    """
+    bounds = {"start": month, "end": _add_months(month, 1)}
+    # Attaching locks the default partition anyway; taking it first stops
+    # rows for the month landing there after they have been moved
+    db.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+    has_rows = db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"),
+        bounds,
+    ).scalar()
+    if not has_rows:
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+        ))
+        return 0
+    
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    moved = db.execute(text(
+        f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+    ), bounds).rowcount
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"), bounds)
+    _attach_partition(db, name, month)
+    return moved
+
+
+def _export_partition(db: Session, name: str, path: str) -> int:
+    """Write a table to a gzipped JSONL file, one row_to_json object per line"""
+    tmp_path = path + ".tmp"
+    count = 0
+    result = db.execute(
+        text(f"SELECT row_to_json(e)::text FROM {name} e ORDER BY created_at, id"),
+        execution_options={"stream_results": True, "max_row_buffer": RESTORE_BATCH_SIZE},
+    )
+    with gzip.open(tmp_path, "wb") as f:
+        for (line,) in result:
+            f.write(line.encode())
+            f.write(b"\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def archive_contact_event_partitions(
+    db: Session,
+    older_than_months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+) -> List[str]:
+    """
+    Detach partitions whose whole month is older than older_than_months,
+    write each to <archive_dir>/contact_events_YYYY_MM.jsonl.gz and drop it.
+    If an export fails the partition is re-attached and the error raised.
+    Returns the paths written.
+    """
+    if older_than_months is None:
+        older_than_months = settings.CONTACT_EVENT_ARCHIVE_AFTER_MONTHS
+    archive_dir = archive_dir or settings.CONTACT_EVENT_ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+    
+    cutoff = _add_months(datetime.utcnow().date().replace(day=1), -older_than_months)
+    paths = []
+    for name, month in list_contact_event_partitions(db):
+        if month >= cutoff:
+            break
+    
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        db.commit()
+    
+        path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+        try:
+            expected = db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            written = _export_partition(db, name, path)
+            if written != expected:
+                raise RuntimeError(f"Archived {written} of {expected} rows from {name}")
+        except Exception:
+            db.rollback()
+            _attach_partition(db, name, month)
+            db.commit()
+            raise
+    
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        paths.append(path)
+    return paths
+
+
+def _attach_partition(db: Session, name: str, month: date) -> None:
+    db.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    ))
+
+
+def restore_contact_event_partition(db: Session, path: str) -> int:
+    """
+    Load an archived partition file back and re-attach it.
+    References to customers or leads deleted since archiving (e.g. merged
+    customers) are set to NULL so the foreign keys still hold.
+    Returns the number of rows restored.
+    """
+    name = os.path.basename(path).split(".", 1)[0]
+    month = _partition_month(name)
+    if month is None:
+        raise ValueError(f"Not a contact_events archive: {path}")
+    
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    insert = text(
+        f"INSERT INTO {name} SELECT * FROM json_populate_recordset(NULL::{PARENT_TABLE}, CAST(:rows AS json))"
+    )
+    count = 0
+    batch = []
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            batch.append(line.rstrip("\n"))
+            if len(batch) >= RESTORE_BATCH_SIZE:
+                db.execute(insert, {"rows": "[" + ",".join(batch) + "]"})
+                count += len(batch)
+                batch = []
+    if batch:
+        db.execute(insert, {"rows": "[" + ",".join(batch) + "]"})
+        count += len(batch)
+    
+    for column, table in (("customer_id", "customers"), ("lead_id", "leads")):
+        db.execute(text(
+            f"UPDATE {name} e SET {column} = NULL WHERE {column} IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = e.{column})"
+        ))
+    _attach_partition(db, name, month)
+    db.commit()
+    return count
+
+
+if __name__ == "__main__":
+    from app.core.db import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Manage contact_events partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure", help="create partitions for upcoming months")
+    archive = commands.add_parser("archive", help="archive and drop old partitions")
+    archive.add_argument("--older-than-months", type=int, default=None)
+    archive.add_argument("--dir", default=None)
+    restore = commands.add_parser("restore", help="re-attach an archived partition")
+    restore.add_argument("path")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        if args.command == "ensure":
+            print(f"Created partitions: {ensure_contact_event_partitions(db) or 'none'}")
+        elif args.command == "archive":
+            for path in archive_contact_event_partitions(db, args.older_than_months, args.dir):
+                print(f"Archived {path}")
+        else:
+            print(f"Restored {restore_contact_event_partition(db, args.path)} rows from {args.path}")
+    finally:
+        db.close()
@@ -0,0 +1,72 @@
+"""
+Local fake of the Twilio Messages API, used as the load-test stub.
+
+    python -m app.modules.comms.providers.fake_twilio [--port 8099] [--latency-ms 150] [--error-rate 0.02]
+
+Then run the app with TWILIO_API_BASE_URL=http://127.0.0.1:8099 (any
+TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN). Accepted messages are listed at
+GET /_fake/messages and cleared with DELETE /_fake/messages. A fraction
+(error_rate) of sends answer 503, which the provider retries.
+"""
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse
+from typing import List
+from uuid import uuid4
+import argparse
+import asyncio
+import random
+
+
+def create_fake_twilio_app(latency_ms: float = 0, error_rate: float = 0) -> FastAPI:
+    """Fake Twilio app with fixed response latency and random 503s"""
+    app = FastAPI(title="Fake Twilio")
+    app.state.messages: List[dict] = []
+    
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(
+        account_sid: str,
+        request: Request,
+        To: str = Form(...),
+        Body: str = Form(...),
+        From: str = Form(None),
+    ):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if not request.headers.get("authorization", "").startswith("Basic "):
+            return JSONResponse({"code": 20003, "message": "Authenticate"}, status_code=401)
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"code": 20503, "message": "Service unavailable"}, status_code=503)
+        message = {
+            "sid": f"SM{uuid4().hex}",
+            "account_sid": account_sid,
+            "to": To,
+            "from": From,
+            "body": Body,
+            "status": "queued",
+        }
+        app.state.messages.append(message)
+        return JSONResponse(message, status_code=201)
+    
+    @app.get("/_fake/messages")
+    async def list_messages():
+        return {"count": len(app.state.messages), "messages": app.state.messages[-100:]}
+    
+    @app.delete("/_fake/messages")
+    async def clear_messages():
+        app.state.messages.clear()
+        return {"count": 0}
+    
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Fake Twilio Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    
+    uvicorn.run(create_fake_twilio_app(args.latency_ms, args.error_rate), host=args.host, port=args.port, log_level="warning")
@@ -1,40 +1,86 @@
 from typing import Optional
-from twilio.rest import Client
+from weakref import WeakKeyDictionary
+import asyncio
+import random
+
+import httpx
 from twilio.request_validator import RequestValidator
 
 from app.core.config import settings
 
+# Responses where Twilio did not accept the message, so resending cannot duplicate it
+RETRY_STATUS_CODES = {429, 503}
+
 
 class TwilioSMSProvider:
+    """
+    Twilio Messages API client on a pooled keep-alive httpx.AsyncClient.
+    Each event loop gets its own client, as httpx connections are bound to
+    the loop that opened them.
+    """
+    
     def __init__(self):
         if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
             raise ValueError("Twilio credentials not configured")
-        
-        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    
         self.phone_number = settings.TWILIO_PHONE_NUMBER
         self.validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+        self.messages_path = f"/2010-04-01/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json"
+        self._clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = WeakKeyDictionary()
     
-    def send_sms(self, to_number: str, body: str) -> dict:
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=settings.TWILIO_API_BASE_URL,
+                auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+                timeout=httpx.Timeout(settings.TWILIO_HTTP_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=settings.TWILIO_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TWILIO_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+    
+    async def asend_sms(self, to_number: str, body: str) -> dict:
         """
-        Send SMS via Twilio.
-        Returns dict with 'sid' and 'status'.
+        Send SMS via Twilio without blocking the event loop.
+        Connection failures and 429/503 responses are retried with jittered
+        exponential backoff. Read timeouts are not retried, as the message may
+        already have been accepted.
+        Returns dict with 'sid' and 'status', plus 'error' on failure and
+        'retryable' when Twilio was unreachable or throttling, so a later
+        resend cannot duplicate the message.
         """
-        try:
-            message = self.client.messages.create(
-                body=body,
-                from_=self.phone_number,
-                to=to_number,
-            )
-            return {
-                "sid": message.sid,
-                "status": message.status,
-            }
-        except Exception as e:
-            return {
-                "sid": None,
-                "status": "failed",
-                "error": str(e),
-            }
+        data = {"From": self.phone_number, "To": to_number, "Body": body}
+        attempt = 0
+        while True:
+            try:
+                response = await self._client().post(self.messages_path, data=data)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error = f"Twilio unreachable: {e!r}"
+            except httpx.HTTPError as e:
+                return {"sid": None, "status": "failed", "error": f"Twilio request failed: {e!r}"}
+            else:
+                if response.status_code < 400:
+                    message = response.json()
+                    return {"sid": message.get("sid"), "status": message.get("status")}
+                error = f"Twilio error {response.status_code}: {_error_message(response)}"
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return {"sid": None, "status": "failed", "error": error}
+    
+            if attempt >= settings.TWILIO_MAX_RETRIES:
+                return {"sid": None, "status": "failed", "error": error, "retryable": True}
+            await asyncio.sleep(settings.TWILIO_RETRY_BACKOFF_SECONDS * 2 ** attempt * (0.5 + random.random()))
+            attempt += 1
+    
+    async def aclose(self) -> None:
+        """Close the current event loop's connection pool"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
     
     def validate_request(self, url: str, params: dict, signature: str) -> bool:
         """
@@ -42,10 +88,17 @@ class TwilioSMSProvider:
         """
         if not settings.TWILIO_WEBHOOK_VALIDATE:
             return True  # Skip validation if disabled
-        
+    
         return self.validator.validate(url, params, signature)
 
 
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return response.json().get("message") or response.text
+    except ValueError:
+        return response.text
+
+
 # Singleton instance
 _twilio_provider: Optional[TwilioSMSProvider] = None
 
@@ -56,3 +109,9 @@ def get_twilio_provider() -> TwilioSMSProvider:
     if _twilio_provider is None:
         _twilio_provider = TwilioSMSProvider()
     return _twilio_provider
+
+
+async def close_twilio_provider() -> None:
+    """Close the provider's connection pool for the running event loop, if created"""
+    if _twilio_provider is not None:
+        await _twilio_provider.aclose()
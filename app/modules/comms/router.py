@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.modules.comms.service import send_sms_to_lead, handle_inbound_sms
-from app.modules.comms.schemas import SendSMSRequest, SendSMSResponse
+from app.modules.comms.inbound import append_inbound_sms
+from app.modules.comms.bulk import create_bulk_sms, record_bulk_sms, get_bulk_sms, cancel_bulk_sms
+from app.modules.comms.schemas import SendSMSRequest, SendSMSResponse, BulkSMSRequest, BulkSMSProgress
+from app.modules.automation.service import enqueue_bulk_sms
 from app.modules.comms.providers.twilio_sms import get_twilio_provider
 from app.core.config import settings
 
@@ -14,29 +18,86 @@ router = APIRouter()
 @router.post("/sms/send", response_model=SendSMSResponse)
 async def send_sms(
     request: SendSMSRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Send SMS to a lead"""
-    result = send_sms_to_lead(db=db, lead_id=request.lead_id, message=request.message)
+    """
+    Queue an SMS to a lead. The outbox dispatcher sends it; the Twilio SID
+    and status appear on the timeline event once sent.
+    """
+    result = await db.run_sync(send_sms_to_lead, lead_id=request.lead_id, message=request.message)
     
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error", "Failed to send SMS"))
     
     return SendSMSResponse(
         success=True,
-        message_sid=result.get("message_sid"),
+        event_id=result.get("event_id"),
         status=result.get("status"),
     )
 
 
+@router.post("/sms/bulk", response_model=BulkSMSProgress, status_code=202)
+async def send_bulk_sms(
+    request: BulkSMSRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Send a templated SMS to leads selected by lead_ids and/or status/source.
+    Sending runs in the background at the configured rate; poll
+    GET /sms/bulk/{bulk_id} for progress.
+    """
+    try:
+        state = await db.run_sync(
+            create_bulk_sms,
+            message=request.message,
+            lead_ids=request.lead_ids,
+            status=request.status,
+            source=request.source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # The Redis and RQ clients are blocking, keep them off the event loop
+    await run_in_threadpool(record_bulk_sms, state)
+    await run_in_threadpool(
+        enqueue_bulk_sms,
+        state["id"],
+        request.message,
+        lead_ids=request.lead_ids,
+        status=request.status.value if request.status else None,
+        source=request.source.value if request.source else None,
+    )
+    return state
+
+
+@router.get("/sms/bulk/{bulk_id}", response_model=BulkSMSProgress)
+async def get_bulk_sms_progress(bulk_id: str):
+    """Progress of a bulk SMS send"""
+    state = await run_in_threadpool(get_bulk_sms, bulk_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Bulk SMS not found")
+    return state
+
+
+@router.post("/sms/bulk/{bulk_id}/cancel", response_model=BulkSMSProgress)
+async def cancel_bulk_sms_send(bulk_id: str):
+    """Stop a bulk SMS send before its next chunk"""
+    state = await run_in_threadpool(cancel_bulk_sms, bulk_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Bulk SMS not found")
+    return state
+
+
 @router.post("/webhooks/twilio/sms", include_in_schema=False)
 async def twilio_sms_webhook(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Twilio SMS inbound webhook.
-    Validates signature if enabled, processes inbound SMS.
+    Validates signature if enabled, then processes the SMS, or with
+    TWILIO_WEBHOOK_FAST_ACK appends it to the inbound stream for the
+    consumers to process.
     """
     # Get form data
     form_data = await request.form()
@@ -58,9 +119,13 @@ async def twilio_sms_webhook(
         except Exception as e:
             raise HTTPException(status_code=403, detail=f"Signature validation failed: {str(e)}")
     
+    if settings.TWILIO_WEBHOOK_FAST_ACK:
+        await append_inbound_sms(from_number, body, message_sid)
+        return {"status": "ok", "message": "SMS queued"}
+    
     # Handle inbound SMS
-    result = handle_inbound_sms(
-        db=db,
+    result = await db.run_sync(
+        handle_inbound_sms,
         from_number=from_number,
         body=body,
         message_sid=message_sid,
@@ -1,9 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from uuid import UUID
 
 from app.modules.comms.models import ContactChannel, ContactDirection
+from app.modules.leads.models import LeadStatus, LeadSource
 
 
 class SendSMSRequest(BaseModel):
@@ -13,11 +14,32 @@ class SendSMSRequest(BaseModel):
 
 class SendSMSResponse(BaseModel):
     success: bool
-    message_sid: Optional[str] = None
+    event_id: Optional[UUID] = None
     status: Optional[str] = None
     error: Optional[str] = None
 
 
+class BulkSMSRequest(BaseModel):
+    message: str  # Template, e.g. "Hi {first_name}, we still need {missing_fields}"
+    lead_ids: Optional[List[UUID]] = None
+    status: Optional[LeadStatus] = None
+    source: Optional[LeadSource] = None
+
+
+class BulkSMSProgress(BaseModel):
+    id: str
+    status: str
+    total: int
+    queued: int = 0
+    sent: int
+    failed: int
+    cancel_requested: bool = False
+    last_error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 class ContactEventCreate(BaseModel):
     customer_id: Optional[UUID] = None
     lead_id: Optional[UUID] = None
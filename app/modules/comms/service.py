@@ -1,61 +1,87 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, text
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
 
-from app.modules.comms.models import ContactEvent, ContactChannel, ContactDirection
+from app.modules.comms.models import ContactEvent, ContactChannel, ContactDirection, SMSOutbox
+from app.modules.comms.outbox import OUTBOX_NOTIFY_CHANNEL
 from app.modules.comms.schemas import ContactEventCreate
+from app.modules.comms.extraction import EXTRACTABLE_FIELDS, extract_reply_fields
+from app.modules.comms.timeline import timeline_events
+from app.modules.leads.cache import invalidate_lead_details
 from app.modules.leads.service import get_lead_detail
 from app.modules.customers.service import find_or_create_customer
-from app.modules.comms.providers.twilio_sms import get_twilio_provider
-from app.core.utils import normalize_phone_to_e164, extract_uk_postcode
+from app.core.idempotency import claim_idempotency_key
+from app.core.phone import normalize_phone_to_e164
 
+# How far back handle_inbound_sms looks for a duplicate MessageSid's event
+DUPLICATE_SMS_WINDOW = timedelta(days=2)
 
-def send_sms_to_lead(db: Session, lead_id: UUID, message: str) -> dict:
+
+def queue_sms(
+    db: Session,
+    to_number: str,
+    message: str,
+    lead_id: Optional[UUID] = None,
+    customer_id: Optional[UUID] = None,
+    bulk_id: Optional[str] = None,
+) -> ContactEvent:
     """
-    Send SMS to a lead.
-    Returns dict with success, message_sid, status, error.
+    Add an outbound SMS to the session without committing: its timeline
+    event (twilio_status "pending") and the outbox row the dispatcher sends
+    it from. It is sent only if the caller's transaction commits.
+    bulk_id ties the message to a bulk send's progress (comms/bulk.py).
     """
-    lead = get_lead_detail(db, lead_id)
+    event = ContactEvent(
+        id=uuid4(),
+        created_at=datetime.utcnow(),
+        customer_id=customer_id,
+        lead_id=lead_id,
+        channel=ContactChannel.SMS,
+        direction=ContactDirection.OUTBOUND,
+        body=message,
+        meta={"twilio_status": "pending", **({"bulk_id": bulk_id} if bulk_id else {})},
+    )
+    db.add(event)
+    db.add(SMSOutbox(
+        contact_event_id=event.id,
+        contact_event_created_at=event.created_at,
+        lead_id=lead_id,
+        customer_id=customer_id,
+        to_number=to_number,
+        body=message,
+        bulk_id=bulk_id,
+    ))
+    # Delivered to listening dispatchers on commit
+    db.execute(text(f"NOTIFY {OUTBOX_NOTIFY_CHANNEL}"))
+    return event
+
+
+def _sms_target(lead) -> Optional[str]:
+    """Error for a lead that cannot be texted, None if it can"""
     if not lead:
-        return {"success": False, "error": "Lead not found"}
-    
+        return "Lead not found"
     if not lead.phone:
-        return {"success": False, "error": "Lead has no phone number"}
-    
-    # Get customer for logging
-    customer_id = lead.customer_id
+        return "Lead has no phone number"
+    return None
+
+
+def send_sms_to_lead(db: Session, lead_id: UUID, message: str) -> dict:
+    """
+    Queue an SMS to a lead and commit. The outbox dispatcher sends it and
+    records the Twilio SID and status on the returned event.
+    Returns dict with success, event_id, status, error.
+    """
+    lead = get_lead_detail(db, lead_id)
+    error = _sms_target(lead)
+    if error:
+        return {"success": False, "error": error}
     
-    # Send SMS
-    try:
-        provider = get_twilio_provider()
-        result = provider.send_sms(to_number=lead.phone, body=message)
-        
-        if result.get("error"):
-            return {"success": False, "error": result["error"]}
-        
-        # Log contact event
-        event = ContactEvent(
-            customer_id=customer_id,
-            lead_id=lead_id,
-            channel=ContactChannel.SMS,
-            direction=ContactDirection.OUTBOUND,
-            body=message,
-            meta={
-                "twilio_sid": result.get("sid"),
-                "twilio_status": result.get("status"),
-            },
-        )
-        db.add(event)
-        db.commit()
-        
-        return {
-            "success": True,
-            "message_sid": result.get("sid"),
-            "status": result.get("status"),
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    event = queue_sms(db, lead.phone, message, lead_id=lead_id, customer_id=lead.customer_id)
+    db.commit()
+    invalidate_lead_details(db, lead_ids=[lead_id], customer_ids=[lead.customer_id])
+    return {"success": True, "event_id": event.id, "status": "pending"}
 
 
 def handle_inbound_sms(
@@ -71,12 +97,36 @@ def handle_inbound_sms(
     - Create lead if needed
     - Log contact event
     - Attempt to capture missing fields
+    Each MessageSid is processed once, as Twilio retries webhooks and stream
+    entries can be redelivered: it is claimed as an idempotency key in the
+    transaction that logs the event, so a concurrent retry waits for that
+    transaction and is then answered as a duplicate.
     """
     # Normalize phone
     normalized_phone = normalize_phone_to_e164(from_number)
     if not normalized_phone:
         return {"success": False, "error": "Invalid phone number"}
     
+    if message_sid:
+        claimed, _ = claim_idempotency_key(db, f"twilio_sms:{message_sid}", None)
+        if not claimed:
+            db.rollback()
+            duplicate = db.execute(
+                select(ContactEvent.lead_id, ContactEvent.customer_id)
+                .where(
+                    ContactEvent.meta.has_key("twilio_message_sid"),
+                    ContactEvent.meta["twilio_message_sid"].astext == message_sid,
+                    ContactEvent.created_at >= datetime.utcnow() - DUPLICATE_SMS_WINDOW,
+                )
+                .limit(1)
+            ).first()
+            return {
+                "success": True,
+                "duplicate": True,
+                "lead_id": str(duplicate.lead_id) if duplicate and duplicate.lead_id else None,
+                "customer_id": str(duplicate.customer_id) if duplicate and duplicate.customer_id else None,
+            }
+    
     # Find or create customer
     customer = find_or_create_customer(db=db, phone=normalized_phone)
     
@@ -107,43 +157,35 @@ def handle_inbound_sms(
         if lead.missing_fields:
             lead.status = LeadStatus.NEEDS_INFO
         db.add(lead)
-        db.commit()
-        db.refresh(lead)
+        db.flush()
     
-    # Attempt to capture missing fields
-    updated_fields = False
-    if lead.raw_payload is None:
-        lead.raw_payload = {}
-    
-    # Check for postcode
-    if lead.missing_fields and "postcode" in lead.missing_fields:
-        postcode = extract_uk_postcode(body)
-        if postcode:
-            if lead.raw_payload is None:
-                lead.raw_payload = {}
-            lead.raw_payload["postcode"] = postcode
-            updated_fields = True
+    # Attempt to capture missing fields, filling only empty lead columns
+    extracted = {}
+    if lead.missing_fields:
+        empty = [field for field in EXTRACTABLE_FIELDS if not (getattr(lead, field) or "").strip()]
+        extracted = extract_reply_fields(body, wanted=empty)
+        for field, value in extracted.items():
+            setattr(lead, field, value)
     
     # Recompute missing fields if we updated
-    if updated_fields:
-        from app.modules.leads.scoring import compute_missing_fields
+    if extracted:
         lead.missing_fields = compute_missing_fields(lead)
         # If no more missing fields, set status to NEW
         if not lead.missing_fields:
             lead.status = LeadStatus.NEW
-        db.commit()
     
-    # Log contact event
+    # Log contact event, committed with the MessageSid claim and lead changes
     event = ContactEvent(
         customer_id=customer.id,
         lead_id=lead.id,
         channel=ContactChannel.SMS,
         direction=ContactDirection.INBOUND,
         body=body,
-        meta={"twilio_message_sid": message_sid},
+        meta={"twilio_message_sid": message_sid, **({"extracted": extracted} if extracted else {})},
     )
     db.add(event)
     db.commit()
+    invalidate_lead_details(db, lead_ids=[lead.id], customer_ids=[customer.id])
     
     return {"success": True, "lead_id": str(lead.id), "customer_id": str(customer.id)}
 
@@ -153,24 +195,14 @@ def get_timeline_events(
     customer_id: Optional[UUID] = None,
     lead_id: Optional[UUID] = None,
     limit: int = 100,
+    cursor: Optional[tuple[datetime, UUID]] = None,
 ) -> list[ContactEvent]:
     """
     Get timeline events for a customer or lead, ordered newest first.
+    Pass cursor (created_at, id) of the last event seen to load older history.
     """
-    stmt = select(ContactEvent)
-    
-    conditions = []
-    if customer_id:
-        conditions.append(ContactEvent.customer_id == customer_id)
-    if lead_id:
-        conditions.append(ContactEvent.lead_id == lead_id)
-    
-    if conditions:
-        from sqlalchemy import or_
-        stmt = stmt.where(or_(*conditions))
-    
-    stmt = stmt.order_by(ContactEvent.created_at.desc()).limit(limit)
-    
+    events = timeline_events(customer_id, lead_id, limit, cursor)
+    stmt = select(events).order_by(events.created_at.desc(), events.id.desc()).limit(limit)
     return list(db.execute(stmt).scalars().all())
 
 
@@ -179,5 +211,6 @@ def create_contact_event(db: Session, event_data: ContactEventCreate) -> Contact
     event = ContactEvent(**event_data.model_dump())
     db.add(event)
     db.commit()
+    invalidate_lead_details(db, lead_ids=[event.lead_id], customer_ids=[event.customer_id])
     db.refresh(event)
     return event
@@ -0,0 +1,47 @@
+from sqlalchemy import select, union_all, func, true, tuple_
+from sqlalchemy.orm import aliased
+from typing import Any, Optional
+from datetime import datetime
+from uuid import UUID
+
+from app.modules.comms.models import ContactEvent
+
+
+def timeline_events(
+    customer_id: Any = None,
+    lead_id: Any = None,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, UUID]] = None,
+):
+    """
+    ContactEvent alias over the newest timeline events of a customer and/or lead.
+    Built as a UNION ALL of two index-ordered scans, each stopping after `limit`
+    rows, instead of an OR filter that sorts every matching event.
+    Callers still order the alias by (created_at, id) and apply the limit.
+    customer_id / lead_id may be values or column expressions (e.g. Lead.customer_id
+    in a correlated subquery). cursor is the (created_at, id) of the last event seen.
+    """
+    def branch(*conditions):
+        stmt = select(ContactEvent).where(*conditions)
+        if cursor:
+            stmt = stmt.where(tuple_(ContactEvent.created_at, ContactEvent.id) < tuple_(*cursor))
+        return (
+            stmt.order_by(ContactEvent.created_at.desc(), ContactEvent.id.desc())
+            .limit(limit)
+            .correlate_except(ContactEvent)
+        )
+    
+    branches = []
+    if customer_id is not None:
+        branches.append(branch(ContactEvent.customer_id == customer_id))
+    if lead_id is not None:
+        conditions = [ContactEvent.lead_id == lead_id]
+        if customer_id is not None:
+            # NULL on either side means the customer branch did not return the event
+            conditions.append(func.coalesce(ContactEvent.customer_id != customer_id, true()))
+        branches.append(branch(*conditions))
+    if not branches:
+        branches.append(branch())
+    
+    events = branches[0] if len(branches) == 1 else union_all(*branches)
+    return aliased(ContactEvent, events.subquery("timeline_events"))
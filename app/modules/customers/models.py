@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, Enum as SQLEnum, DateTime, Index
+from sqlalchemy import Column, String, ForeignKey, Enum as SQLEnum, DateTime, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 import enum
 
-from app.core.db import Base
+from app.core.db import Base, enum_values
 
 
 class CustomerStatus(str, enum.Enum):
@@ -14,6 +14,11 @@ class CustomerStatus(str, enum.Enum):
     INACTIVE = "inactive"
 
 
+class IdentityType(str, enum.Enum):
+    PHONE = "phone"
+    EMAIL = "email"
+
+
 class Customer(Base):
     __tablename__ = "customers"
 
@@ -21,7 +26,7 @@ class Customer(Base):
     name = Column(String, nullable=True)
     primary_email = Column(String, nullable=True, index=True)
     primary_phone = Column(String, nullable=True, index=True)  # E.164 format
-    status = Column(SQLEnum(CustomerStatus), default=CustomerStatus.PROSPECT, nullable=False)
+    status = Column(SQLEnum(CustomerStatus, values_callable=enum_values), default=CustomerStatus.PROSPECT, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -29,3 +34,46 @@ class Customer(Base):
     leads = relationship("Lead", back_populates="customer")
     opportunities = relationship("Opportunity", back_populates="customer")
     contact_events = relationship("ContactEvent", back_populates="customer")
+    identities = relationship("CustomerIdentity", back_populates="customer")
+
+
+# Search: trigram indexes for substring and fuzzy matching (requires pg_trgm)
+Index("ix_customers_name_trgm", Customer.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+Index(
+    "ix_customers_primary_email_trgm",
+    Customer.primary_email,
+    postgresql_using="gin",
+    postgresql_ops={"primary_email": "gin_trgm_ops"},
+)
+Index(
+    "ix_customers_primary_phone_trgm",
+    Customer.primary_phone,
+    postgresql_using="gin",
+    postgresql_ops={"primary_phone": "gin_trgm_ops"},
+)
+
+
+class CustomerIdentity(Base):
+    """Normalized phone/email owned by exactly one customer, used for matching"""
+    __tablename__ = "customer_identities"
+    __table_args__ = (
+        UniqueConstraint("type", "value", name="uq_customer_identities_type_value"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    type = Column(
+        SQLEnum(IdentityType, name="identitytype", values_callable=enum_values),
+        nullable=False,
+    )
+    value = Column(String, nullable=False)  # E.164 phone or lowercased email
+    # Deferred so an identity can be claimed before its new customer row is inserted
+    customer_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("customers.id", deferrable=True, initially="DEFERRED"),
+        nullable=False,
+        index=True,
+    )
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    customer = relationship("Customer", back_populates="identities")
@@ -1,11 +1,95 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, or_
-from typing import Optional
-from uuid import UUID
+from sqlalchemy import select, insert, update, delete, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Optional, List, Dict, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime
 
-from app.modules.customers.models import Customer, CustomerStatus
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.modules.customers.models import Customer, CustomerStatus, CustomerIdentity, IdentityType
 from app.modules.customers.schemas import CustomerCreate, CustomerUpdate
-from app.core.utils import normalize_phone_to_e164
+from app.modules.leads.cache import invalidate_lead_details, note_new_customers
+from app.core.phone import normalize_phone_to_e164
+
+IdentityKey = Tuple[IdentityType, str]
+
+# In-process identity -> customer_id map. Entries are invalidated on merge,
+# and a hit whose customer no longer exists falls back to the database.
+_identity_cache = LRUCache(settings.CUSTOMER_IDENTITY_CACHE_SIZE)
+
+
+def _identity_keys(email: Optional[str], phone: Optional[str]) -> List[IdentityKey]:
+    """Normalized identities for a contact, phone first to keep phone-first matching"""
+    keys = []
+    if phone:
+        keys.append((IdentityType.PHONE, phone))
+    if email and email.strip():
+        keys.append((IdentityType.EMAIL, email.strip().lower()))
+    return keys
+
+
+def _lookup_customers(db: Session, keys: List[IdentityKey]) -> Dict[IdentityKey, Customer]:
+    """Resolve identities to customers with one indexed query"""
+    if not keys:
+        return {}
+    stmt = (
+        select(CustomerIdentity.type, CustomerIdentity.value, Customer)
+        .join(Customer, Customer.id == CustomerIdentity.customer_id)
+        .where(tuple_(CustomerIdentity.type, CustomerIdentity.value).in_(keys))
+    )
+    found = {}
+    for identity_type, value, customer in db.execute(stmt):
+        found[(identity_type, value)] = customer
+        _identity_cache.set((identity_type, value), customer.id)
+    return found
+
+
+def _claim_identities(db: Session, claims: Dict[IdentityKey, UUID]) -> set:
+    """
+    Insert identities with ON CONFLICT DO NOTHING.
+    Returns the identity keys that were claimed, the rest already belong
+    to another customer. Does not commit.
+    """
+    if not claims:
+        return set()
+    now = datetime.utcnow()
+    # Insert in key order so concurrent overlapping claims lock rows in the same order
+    rows = [
+        {"id": uuid4(), "type": key[0], "value": key[1], "customer_id": customer_id, "created_at": now}
+        for key, customer_id in sorted(claims.items(), key=lambda item: (item[0][0].value, item[0][1]))
+    ]
+    stmt = (
+        pg_insert(CustomerIdentity)
+        .on_conflict_do_nothing(index_elements=[CustomerIdentity.type, CustomerIdentity.value])
+        .returning(CustomerIdentity.type, CustomerIdentity.value)
+    )
+    claimed = {(identity_type, value) for identity_type, value in db.execute(stmt, rows)}
+    for key in claimed:
+        _identity_cache.set(key, claims[key])
+    return claimed
+
+
+def _enrich_customer(
+    customer: Customer,
+    email: Optional[str],
+    phone: Optional[str],
+    name: Optional[str],
+) -> Dict[IdentityKey, UUID]:
+    """
+    Fill missing customer fields.
+    Returns the identities gained that still need to be claimed.
+    """
+    gained = {}
+    if not customer.primary_email and email:
+        customer.primary_email = email
+        gained.update({key: customer.id for key in _identity_keys(email, None)})
+    if not customer.primary_phone and phone:
+        customer.primary_phone = phone
+        gained.update({key: customer.id for key in _identity_keys(None, phone)})
+    if not customer.name and name:
+        customer.name = name
+    return gained
 
 
 def find_or_create_customer(
@@ -15,52 +99,133 @@ def find_or_create_customer(
     name: Optional[str] = None,
 ) -> Customer:
     """
-    Find customer by phone first, then email.
+    Find customer by phone first, then email, via customer_identities.
     If not found, create a new customer.
     Enrich customer fields if missing.
+    New customers claim their identities first (INSERT ... ON CONFLICT),
+    so concurrent requests for the same contact resolve to one customer.
+    Does not commit - the caller commits as part of its own transaction.
     """
     # Normalize phone to E.164
     normalized_phone = normalize_phone_to_e164(phone) if phone else None
+    keys = _identity_keys(email, normalized_phone)
+    
+    while True:
+        # Try the in-process cache for the first (phone) identity only, so a
+        # cached email cannot win over a phone match; then one indexed lookup
+        customer = None
+        customer_id = _identity_cache.get(keys[0]) if keys else None
+        if customer_id:
+            customer = db.get(Customer, customer_id)
+            if customer is None:
+                # Merged or deleted elsewhere
+                _identity_cache.invalidate(keys)
+        if customer is None:
+            found = _lookup_customers(db, keys)
+            customer = next((found[key] for key in keys if key in found), None)
     
-    # Try to find by phone first
-    if normalized_phone:
-        stmt = select(Customer).where(Customer.primary_phone == normalized_phone)
-        customer = db.execute(stmt).scalar_one_or_none()
         if customer:
             # Enrich if needed
-            if not customer.primary_email and email:
-                customer.primary_email = email
-            if not customer.name and name:
-                customer.name = name
-            db.commit()
-            db.refresh(customer)
+            _claim_identities(db, _enrich_customer(customer, email, normalized_phone, name))
             return customer
     
-    # Try to find by email
-    if email:
-        stmt = select(Customer).where(Customer.primary_email == email)
-        customer = db.execute(stmt).scalar_one_or_none()
-        if customer:
-            # Enrich if needed
-            if not customer.primary_phone and normalized_phone:
-                customer.primary_phone = normalized_phone
-            if not customer.name and name:
-                customer.name = name
-            db.commit()
-            db.refresh(customer)
+        # Create new customer, claiming its identities first
+        customer_id = uuid4()
+        claimed = _claim_identities(db, {key: customer_id for key in keys})
+        if len(claimed) == len(keys):
+            customer = Customer(
+                id=customer_id,
+                name=name,
+                primary_email=email,
+                primary_phone=normalized_phone,
+                status=CustomerStatus.PROSPECT,
+            )
+            db.add(customer)
+            db.flush()
+            note_new_customers(db, [customer_id])
             return customer
     
-    # Create new customer
-    customer = Customer(
-        name=name,
-        primary_email=email,
-        primary_phone=normalized_phone,
-        status=CustomerStatus.PROSPECT,
-    )
-    db.add(customer)
-    db.commit()
-    db.refresh(customer)
-    return customer
+        # Another request created this contact concurrently - release our claims and use theirs
+        db.execute(delete(CustomerIdentity).where(CustomerIdentity.customer_id == customer_id))
+        _identity_cache.invalidate(keys)
+
+
+def find_or_create_customers_bulk(
+    db: Session,
+    contacts: List[Tuple[Optional[str], Optional[str], Optional[str]]],
+) -> List[UUID]:
+    """
+    Bulk version of find_or_create_customer for batch intake.
+    Takes (email, phone, name) tuples with phone already in E.164 and
+    returns the matching customer id for each, in input order.
+    Existing customers are resolved with one identity query, and new ones
+    claim their identities and are written with multi-row inserts.
+    Does not commit.
+    """
+    contact_keys = [_identity_keys(email, phone) for email, phone, _ in contacts]
+    found = _lookup_customers(db, list({key for keys in contact_keys for key in keys}))
+    
+    # Customers created by this batch, keyed by identity so repeated
+    # contacts within one batch share a single new customer
+    new_by_key: Dict[IdentityKey, dict] = {}
+    new_rows: List[dict] = []
+    gained: Dict[IdentityKey, UUID] = {}
+    customer_ids: List[UUID] = []
+    
+    for (email, phone, name), keys in zip(contacts, contact_keys):
+        # Phone first, then email, matching find_or_create_customer
+        customer = next((found[key] for key in keys if key in found), None)
+        if customer:
+            # Enrich if needed (flushed with the caller's transaction)
+            for key, customer_id in _enrich_customer(customer, email, phone, name).items():
+                gained.setdefault(key, customer_id)
+            customer_ids.append(customer.id)
+            continue
+    
+        row = next((new_by_key[key] for key in keys if key in new_by_key), None)
+        if row:
+            if not row["primary_email"] and email:
+                row["primary_email"] = email
+            if not row["primary_phone"] and phone:
+                row["primary_phone"] = phone
+            if not row["name"] and name:
+                row["name"] = name
+        else:
+            row = {
+                "id": uuid4(),
+                "name": name,
+                "primary_email": email,
+                "primary_phone": phone,
+                "status": CustomerStatus.PROSPECT,
+            }
+            new_rows.append(row)
+        for key in keys:
+            new_by_key.setdefault(key, row)
+        customer_ids.append(row["id"])
+    
+    # Claim identities for new customers and enrichments in one statement
+    claims = dict(gained)
+    claims.update({key: row["id"] for key, row in new_by_key.items()})
+    claimed = _claim_identities(db, claims)
+    
+    # New customers that lost an identity to a concurrent request use the winner instead
+    lost = {row["id"] for key, row in new_by_key.items() if key not in claimed}
+    remap: Dict[UUID, UUID] = {}
+    if lost:
+        winners = _lookup_customers(db, [key for key, row in new_by_key.items() if row["id"] in lost])
+        for key, row in new_by_key.items():
+            if row["id"] in lost and key in winners and row["id"] not in remap:
+                remap[row["id"]] = winners[key].id
+        if remap:
+            db.execute(delete(CustomerIdentity).where(CustomerIdentity.customer_id.in_(remap)))
+            _identity_cache.invalidate(key for key, row in new_by_key.items() if row["id"] in remap)
+    
+    new_rows = [row for row in new_rows if row["id"] not in remap]
+    if new_rows:
+        db.execute(insert(Customer), new_rows)
+        note_new_customers(db, [row["id"] for row in new_rows])
+    db.flush()
+    return [remap.get(customer_id, customer_id) for customer_id in customer_ids]
 
 
 def get_customer(db: Session, customer_id: UUID) -> Optional[Customer]:
@@ -84,6 +249,52 @@ def update_customer(db: Session, customer_id: UUID, customer_update: CustomerUpd
     for field, value in update_data.items():
         setattr(customer, field, value)
     
+    # Register new phone/email as identities (kept only if not owned by another customer)
+    _claim_identities(db, {
+        key: customer.id
+        for key in _identity_keys(update_data.get("primary_email"), update_data.get("primary_phone"))
+    })
+    
     db.commit()
+    invalidate_lead_details(db, customer_ids=[customer.id])
     db.refresh(customer)
     return customer
+
+
+def merge_customers(db: Session, source_id: UUID, target_id: UUID) -> Optional[Customer]:
+    """
+    Merge source customer into target:
+    - Move leads, contact events, opportunities and identities to target
+    - Fill target fields missing from source
+    - Delete source and invalidate its cached identities
+    """
+    from app.modules.leads.models import Lead
+    from app.modules.comms.models import ContactEvent
+    from app.modules.opportunities.models import Opportunity
+    
+    source = get_customer(db, source_id)
+    target = get_customer(db, target_id)
+    if not source or not target or source_id == target_id:
+        return None
+    
+    stmt = select(CustomerIdentity.type, CustomerIdentity.value).where(CustomerIdentity.customer_id == source_id)
+    source_keys = [tuple(row) for row in db.execute(stmt)]
+    
+    for model in (Lead, ContactEvent, Opportunity, CustomerIdentity):
+        db.execute(
+            update(model)
+            .where(model.customer_id == source_id)
+            .values(customer_id=target_id)
+            .execution_options(synchronize_session=False)
+        )
+    
+    # Identities already moved above, so only copy the fields
+    _enrich_customer(target, source.primary_email, source.primary_phone, source.name)
+    db.delete(source)
+    db.commit()
+    
+    _identity_cache.invalidate(source_keys)
+    # Source leads now belong to the target, so this covers both customers
+    invalidate_lead_details(db, customer_ids=[target_id])
+    db.refresh(target)
+    return target
@@ -0,0 +1,109 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+from uuid import UUID
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.cache import RedisCache
+from app.core.config import settings
+from app.modules.leads.models import Lead
+
+_lead_detail_cache: Optional[RedisCache] = None
+
+# Session.info keys: invalidations waiting for the async flush, and
+# customers created in the session's current transaction
+_PENDING_INVALIDATIONS = "lead_detail_invalidations"
+_NEW_CUSTOMERS = "lead_detail_new_customers"
+
+
+def get_lead_detail_cache() -> Optional[RedisCache]:
+    """Get or create the lead detail view cache, None if disabled"""
+    global _lead_detail_cache
+    if not settings.LEAD_DETAIL_CACHE_ENABLED:
+        return None
+    if _lead_detail_cache is None:
+        _lead_detail_cache = RedisCache(
+            redis_conn=Redis.from_url(settings.REDIS_URL),
+            async_redis_conn=AsyncRedis.from_url(settings.REDIS_URL),
+            namespace="lead_detail",
+            ttl_seconds=settings.LEAD_DETAIL_CACHE_TTL_SECONDS,
+            max_entries=settings.LEAD_DETAIL_CACHE_MAX_ENTRIES,
+        )
+    return _lead_detail_cache
+
+
+async def close_lead_detail_cache() -> None:
+    """Close the cache's connections, if opened"""
+    global _lead_detail_cache
+    if _lead_detail_cache is not None:
+        await _lead_detail_cache.async_redis.aclose()
+        _lead_detail_cache.redis.close()
+        _lead_detail_cache = None
+
+
+def note_new_customers(db: Session, customer_ids: Iterable[UUID]) -> None:
+    """
+    Record customers created in the current transaction. Their only leads
+    are the ones the transaction creates, so invalidating them needs no
+    customer -> leads lookup.
+    """
+    db.info.setdefault(_NEW_CUSTOMERS, set()).update(customer_ids)
+
+
+def defer_lead_detail_invalidation(db: Session) -> None:
+    """
+    Collect this session's invalidations for flush_lead_detail_invalidations
+    instead of making sync Redis calls, for sessions used from the event loop.
+    """
+    db.info[_PENDING_INVALIDATIONS] = (set(), set())
+
+
+def invalidate_lead_details(
+    db: Session,
+    lead_ids: Iterable[Optional[UUID]] = (),
+    customer_ids: Iterable[Optional[UUID]] = (),
+) -> None:
+    """
+    Drop cached lead detail views after a committed write.
+    A customer's summary and timeline appear in the views of all its leads,
+    so customer_ids are expanded to their leads with one indexed query,
+    skipped for customers the write created.
+    Call after commit, so a concurrent read cannot re-cache the old state.
+    """
+    new_customers = db.info.pop(_NEW_CUSTOMERS, set())
+    cache = get_lead_detail_cache()
+    if not cache:
+        return
+    lead_ids = {lead_id for lead_id in lead_ids if lead_id}
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id} - new_customers
+    pending = db.info.get(_PENDING_INVALIDATIONS)
+    if pending is not None:
+        pending[0].update(lead_ids)
+        pending[1].update(customer_ids)
+        return
+    
+    keys = {str(lead_id) for lead_id in lead_ids}
+    if customer_ids:
+        stmt = select(Lead.id).where(Lead.customer_id.in_(customer_ids))
+        keys.update(str(lead_id) for lead_id in db.execute(stmt).scalars())
+    cache.invalidate(keys)
+
+
+async def flush_lead_detail_invalidations(db: AsyncSession) -> None:
+    """Apply the invalidations deferred on an async session's writes"""
+    pending = db.sync_session.info.get(_PENDING_INVALIDATIONS)
+    cache = get_lead_detail_cache()
+    if not cache or not pending or not (pending[0] or pending[1]):
+        return
+    lead_ids, customer_ids = pending
+    db.sync_session.info[_PENDING_INVALIDATIONS] = (set(), set())
+    
+    keys = {str(lead_id) for lead_id in lead_ids}
+    if customer_ids:
+        # Only committed writes are deferred, so nothing open here needs keeping
+        await db.rollback()
+        result = await db.execute(select(Lead.id).where(Lead.customer_id.in_(customer_ids)))
+        keys.update(str(lead_id) for lead_id in result.scalars())
+    await cache.ainvalidate(keys)
@@ -1,11 +1,11 @@
 from sqlalchemy import Column, String, Text, ForeignKey, Enum as SQLEnum, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import uuid
 import enum
 
-from app.core.db import Base
+from app.core.db import Base, enum_values
 
 
 class LeadSource(str, enum.Enum):
@@ -27,14 +27,19 @@ class Lead(Base):
     __tablename__ = "leads"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    source = Column(SQLEnum(LeadSource), nullable=False)
-    status = Column(SQLEnum(LeadStatus), default=LeadStatus.NEW, nullable=False)
+    source = Column(SQLEnum(LeadSource, values_callable=enum_values), nullable=False)
+    status = Column(SQLEnum(LeadStatus, values_callable=enum_values), default=LeadStatus.NEW, nullable=False)
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True, index=True)
     owner_user_id = Column(UUID(as_uuid=True), nullable=True)  # Stubbed for future use
     name = Column(String, nullable=True)
     email = Column(String, nullable=True, index=True)
     phone = Column(String, nullable=True, index=True)  # E.164 format
-    raw_payload = Column(JSONB, nullable=True)
+    # Qualification fields, promoted from raw_payload so scoring and filters never parse it
+    postcode = Column(String, nullable=True)
+    product_interest = Column(String, nullable=True)
+    timeframe = Column(String, nullable=True)
+    # Original webhook payload, can be large - only loaded when accessed or undeferred
+    raw_payload = deferred(Column(JSONB, nullable=True))
     missing_fields = Column(JSONB, nullable=True)  # Array of strings
     qualification_notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -46,9 +51,25 @@ class Lead(Base):
     opportunity = relationship("Opportunity", back_populates="lead", uselist=False)
 
 
+# Inbox: open leads newest first, keyset-paginated on (created_at, id)
+Index(
+    "ix_leads_inbox",
+    Lead.created_at.desc(),
+    Lead.id.desc(),
+    postgresql_where=Lead.status.in_([LeadStatus.NEW, LeadStatus.NEEDS_INFO]),
+)
+
+# Search: trigram indexes for substring and fuzzy matching (requires pg_trgm)
+Index("ix_leads_name_trgm", Lead.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+Index("ix_leads_email_trgm", Lead.email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"})
+Index("ix_leads_phone_trgm", Lead.phone, postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"})
+Index("ix_leads_postcode_trgm", Lead.postcode, postgresql_using="gin", postgresql_ops={"postcode": "gin_trgm_ops"})
+
+
 class IdempotencyKey(Base):
     __tablename__ = "idempotency_keys"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     key = Column(String, unique=True, nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    lead_id = Column(UUID(as_uuid=True), nullable=True)  # Lead created under this key, returned to duplicates
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Retention purge
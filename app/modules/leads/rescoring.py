@@ -0,0 +1,161 @@
+"""
+Bulk re-scoring of missing_fields and status for existing leads.
+
+Recomputes what the qualification plan and update_lead would produce, as
+set-based UPDATEs over keyset chunks of leads.id, one short transaction per
+chunk. Only open leads (NEW, NEEDS_INFO) are touched, and only rows whose
+values actually change are written.
+
+    python -m app.modules.leads.rescoring --dry-run
+    python -m app.modules.leads.rescoring [--from-payload] [--chunk-size N]
+
+--from-payload also fills empty promoted columns (postcode, product_interest,
+timeframe) from raw_payload, for leads ingested before they were columns.
+"""
+from sqlalchemy import select, update, case, func, literal, or_
+from sqlalchemy.orm import Session
+from collections import Counter
+from typing import Callable, Dict, Optional
+from uuid import UUID
+import argparse
+
+from app.core.config import settings
+from app.modules.leads.cache import invalidate_lead_details
+from app.modules.leads.models import Lead, LeadStatus
+from app.modules.leads.scoring import PROMOTED_FIELDS, get_qualification_plan
+
+OPEN_STATUSES = [LeadStatus.NEW, LeadStatus.NEEDS_INFO]
+
+# Changed leads kept in the result for inspection
+SAMPLE_SIZE = 20
+
+
+def _rescored_values(from_payload: bool) -> Dict[str, object]:
+    """New column values as SQL expressions over the current row"""
+    plan = get_qualification_plan()
+    columns = {field: getattr(Lead, field) for field in plan.fields}
+    values = {}
+    if from_payload:
+        for field in PROMOTED_FIELDS:
+            # Same normalization as extract_promoted_fields
+            columns[field] = func.coalesce(
+                getattr(Lead, field), func.nullif(func.btrim(Lead.raw_payload[field].astext), "")
+            )
+            values[field] = columns[field]
+    
+    missing = plan.sql(columns, Lead.source)
+    values["missing_fields"] = missing
+    values["status"] = case(
+        (func.jsonb_array_length(missing) > 0, literal(LeadStatus.NEEDS_INFO, Lead.status.type)),
+        (Lead.status == LeadStatus.NEEDS_INFO, literal(LeadStatus.NEW, Lead.status.type)),
+        else_=Lead.status,
+    )
+    return values
+
+
+def _chunk_upper_bound(db: Session, after: Optional[UUID], chunk_size: int) -> Optional[UUID]:
+    """Last open lead id of the next chunk, None if it is the final chunk"""
+    stmt = select(Lead.id).where(Lead.status.in_(OPEN_STATUSES))
+    if after is not None:
+        stmt = stmt.where(Lead.id > after)
+    stmt = stmt.order_by(Lead.id).offset(chunk_size - 1).limit(1)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def rescore_leads(
+    db: Session,
+    dry_run: bool = False,
+    from_payload: bool = False,
+    chunk_size: Optional[int] = None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Recompute missing_fields and status for all open leads.
+    In dry-run mode nothing is written and the result describes what would
+    change. Each chunk is committed on its own and its cached detail views
+    invalidated. progress is called with the running totals after each chunk.
+    Returns {"scanned", "changed", "transitions", "samples", "dry_run"} where
+    transitions counts "old -> new" status changes.
+    """
+    chunk_size = chunk_size or settings.LEAD_RESCORE_CHUNK_SIZE
+    values = _rescored_values(from_payload)
+    changed = or_(*(getattr(Lead, field).is_distinct_from(value) for field, value in values.items()))
+    # Pre-update row, joined on the primary key so RETURNING can report old values
+    old = Lead.__table__.alias("old")
+    
+    totals = {"scanned": 0, "changed": 0, "transitions": Counter(), "samples": [], "dry_run": dry_run}
+    after = None
+    while True:
+        upper = _chunk_upper_bound(db, after, chunk_size)
+        in_chunk = [Lead.status.in_(OPEN_STATUSES)]
+        if after is not None:
+            in_chunk.append(Lead.id > after)
+        if upper is not None:
+            in_chunk.append(Lead.id <= upper)
+    
+        totals["scanned"] += db.execute(select(func.count()).select_from(Lead).where(*in_chunk)).scalar()
+        if dry_run:
+            stmt = select(
+                Lead.id,
+                Lead.status,
+                Lead.missing_fields,
+                values["status"].label("new_status"),
+                values["missing_fields"].label("new_missing_fields"),
+            ).where(*in_chunk, changed)
+            rows = db.execute(stmt).all()
+            db.rollback()
+        else:
+            stmt = (
+                update(Lead)
+                .where(*in_chunk, changed, old.c.id == Lead.id)
+                .values(**values)
+                .returning(Lead.id, old.c.status, old.c.missing_fields, Lead.status, Lead.missing_fields)
+                .execution_options(synchronize_session=False)
+            )
+            rows = db.execute(stmt).all()
+            db.commit()
+            invalidate_lead_details(db, lead_ids=[row[0] for row in rows])
+    
+        totals["changed"] += len(rows)
+        for lead_id, old_status, old_missing, new_status, new_missing in rows:
+            totals["transitions"][f"{old_status.value} -> {new_status.value}"] += 1
+            if len(totals["samples"]) < SAMPLE_SIZE:
+                totals["samples"].append({
+                    "lead_id": str(lead_id),
+                    "status": [old_status.value, new_status.value],
+                    "missing_fields": [old_missing, new_missing],
+                })
+        if progress:
+            progress(totals)
+    
+        if upper is None:
+            break
+        after = upper
+    
+    totals["transitions"] = dict(totals["transitions"])
+    return totals
+
+
+if __name__ == "__main__":
+    import json
+    from app.core.db import SessionLocal
+    # Register the related models so the Lead mapper can configure
+    from app.modules.customers.models import Customer  # noqa: F401
+    from app.modules.comms.models import ContactEvent  # noqa: F401
+    from app.modules.opportunities.models import Opportunity  # noqa: F401
+    
+    parser = argparse.ArgumentParser(description="Recompute missing_fields and status for open leads")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    parser.add_argument("--from-payload", action="store_true", help="fill empty promoted columns from raw_payload")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+    
+    def report(totals: dict) -> None:
+        print(f"scanned {totals['scanned']}, changed {totals['changed']}", flush=True)
+    
+    db = SessionLocal()
+    try:
+        result = rescore_leads(db, args.dry_run, args.from_payload, args.chunk_size, progress=report)
+        print(json.dumps(result, indent=2, default=str))
+    finally:
+        db.close()
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from uuid import UUID
 
-from app.core.db import get_db
+from app.core.config import settings
+from app.core.db import get_async_db
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.responses import FastJSONResponse
+from app.modules.leads.cache import get_lead_detail_cache
 from app.modules.leads.service import (
     create_lead_from_webhook,
+    create_leads_from_webhook_batch,
     create_lead_manual,
     get_lead_inbox,
-    get_lead_detail,
+    get_lead_detail_etag,
+    get_lead_detail_view,
+    get_lead_timeline,
+    LEAD_DETAIL_TIMELINE_LIMIT,
     update_lead,
     qualify_lead,
     request_info_for_lead,
@@ -19,87 +28,109 @@ from app.modules.leads.schemas import (
     Lead,
     LeadDetail,
     LeadInboxItem,
+    ContactEventSummary,
     QualifyResponse,
     RequestInfoResponse,
 )
 from app.modules.leads.models import LeadSource
-from app.modules.comms.service import get_timeline_events
-from app.modules.customers.schemas import CustomerSummary
-from app.modules.customers.service import get_customer
 
 router = APIRouter()
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
 
 @router.post("/webhook/{source}", response_model=dict)
 async def webhook_lead_intake(
     source: LeadSource,
     payload: dict,
     external_id: str = Query(None, alias="external_id"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Webhook endpoint for lead intake.
     Supports idempotency via external_id query parameter or payload hash.
     """
-    lead, is_duplicate = create_lead_from_webhook(
-        db=db,
+    return await db.run_sync(
+        create_lead_from_webhook,
         source=source,
         payload=payload,
         external_id=external_id,
     )
+
+
+@router.post("/webhook/{source}/batch", response_model=dict)
+async def webhook_lead_intake_batch(
+    source: LeadSource,
+    payloads: List[dict] = Body(...),
+    external_id_field: str = Query(None, alias="external_id_field"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Batch webhook endpoint for lead intake (e.g. lead ads backfills).
+    Takes an array of payloads and processes them in one transaction.
+    `external_id_field` names the payload key holding each item's external id;
+    items without one are deduplicated by payload hash.
+    """
+    if len(payloads) > settings.WEBHOOK_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.WEBHOOK_BATCH_MAX_SIZE} payloads)",
+        )
     
-    if is_duplicate:
-        return {"duplicate": True, "message": "Lead already processed"}
+    results = await db.run_sync(
+        create_leads_from_webhook_batch,
+        source=source,
+        payloads=payloads,
+        external_id_field=external_id_field,
+    )
     
+    duplicates = sum(1 for result in results if result["duplicate"])
     return {
-        "duplicate": False,
-        "lead_id": str(lead.id),
-        "status": lead.status.value,
-        "missing_fields": lead.missing_fields or [],
+        "created": len(results) - duplicates,
+        "duplicates": duplicates,
+        "results": results,
     }
 
 
 @router.post("/", response_model=Lead)
 async def create_lead(
     lead_data: LeadCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Create a lead manually"""
-    return create_lead_manual(db=db, lead_data=lead_data)
+    return await db.run_sync(create_lead_manual, lead_data=lead_data)
 
 
 @router.get("/inbox", response_model=List[LeadInboxItem])
 async def get_inbox(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Get lead inbox (status NEW or NEEDS_INFO), ordered newest first"""
+    """
+    Get lead inbox (status NEW or NEEDS_INFO), ordered newest first.
+    Prefer cursor pagination: when a full page is returned, the X-Next-Cursor
+    response header holds the cursor for the next page.
+    Rows are selected as LeadInboxItem columns and serialized directly with
+    orjson, skipping per-row model construction and response_model validation.
+    """
+    try:
+        decoded_cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        leads = get_lead_inbox(db=db, limit=limit, offset=offset)
-        # Convert to schema with explicit error handling
-        result = []
-        for lead in leads:
-            try:
-                item = LeadInboxItem(
-                    id=lead.id,
-                    source=lead.source,
-                    status=lead.status,
-                    name=lead.name,
-                    email=lead.email,
-                    phone=lead.phone,
-                    missing_fields=lead.missing_fields,
-                    created_at=lead.created_at,
-                )
-                result.append(item)
-            except Exception as e:
-                import traceback
-                error_msg = f"Error serializing lead {lead.id}: {str(e)}\n{traceback.format_exc()}"
-                print(error_msg, file=__import__('sys').stderr)
-                raise HTTPException(status_code=500, detail=error_msg)
-        return result
-    except HTTPException:
-        raise
+        items = await db.run_sync(get_lead_inbox, limit=limit, offset=offset, cursor=decoded_cursor)
+        headers = {}
+        if len(items) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        return FastJSONResponse(content=items, headers=headers)
     except Exception as e:
         import traceback
         error_msg = f"Error in get_inbox: {str(e)}\n{traceback.format_exc()}"
@@ -110,46 +141,78 @@ async def get_inbox(
 @router.get("/{lead_id}", response_model=LeadDetail)
 async def get_lead(
     lead_id: UUID,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Get lead detail with customer and timeline"""
-    lead = get_lead_detail(db=db, lead_id=lead_id)
-    if not lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
+    """
+    Get lead detail with customer and timeline.
+    Served from the lead detail cache, or read with one statement on a miss.
+    Supports conditional GET: a matching If-None-Match gets a 304,
+    checked against the cached view or a single small version query.
+    """
+    cache = get_lead_detail_cache()
+    view = generation = None
+    if cache:
+        view, generation = await cache.get(str(lead_id))
     
-    # Get customer summary if linked
-    customer_summary = None
-    if lead.customer_id:
-        customer = get_customer(db=db, customer_id=lead.customer_id)
-        if customer:
-            customer_summary = CustomerSummary.model_validate(customer)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = view["etag"] if view else await db.run_sync(get_lead_detail_etag, lead_id=lead_id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Lead not found")
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
     
-    # Get timeline events
-    timeline_events = get_timeline_events(
-        db=db,
-        customer_id=lead.customer_id,
-        lead_id=lead.id,
+    if view is None:
+        view = await db.run_sync(get_lead_detail_view, lead_id=lead_id)
+        if not view:
+            raise HTTPException(status_code=404, detail="Lead not found")
+        if cache:
+            await cache.set(str(lead_id), view, generation)
+    
+    content = {field: view[field] for field in ("lead", "customer", "timeline", "timeline_next_cursor")}
+    return FastJSONResponse(
+        content=content,
+        headers={"ETag": view["etag"], "Cache-Control": "no-cache"},
     )
+
+
+@router.get("/{lead_id}/timeline", response_model=List[ContactEventSummary])
+async def get_lead_timeline_endpoint(
+    lead_id: UUID,
+    limit: int = Query(LEAD_DETAIL_TIMELINE_LIMIT, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get older timeline events for a lead and its customer, newest first.
+    Start from the lead detail's timeline_next_cursor; when a full page is
+    returned, the X-Next-Cursor response header holds the next cursor.
+    """
+    try:
+        decoded_cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Convert to summary format
-    from app.modules.leads.schemas import ContactEventSummary
-    timeline = [ContactEventSummary.model_validate(event) for event in timeline_events]
+    events = await db.run_sync(get_lead_timeline, lead_id=lead_id, limit=limit, cursor=decoded_cursor)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
     
-    return LeadDetail(
-        lead=lead,
-        customer=customer_summary,
-        timeline=timeline,
-    )
+    headers = {}
+    if len(events) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(events[-1].created_at, events[-1].id)
+    content = [ContactEventSummary.model_validate(event).model_dump(mode="json") for event in events]
+    return FastJSONResponse(content=content, headers=headers)
 
 
 @router.patch("/{lead_id}", response_model=Lead)
 async def update_lead_endpoint(
     lead_id: UUID,
     lead_update: LeadUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update a lead"""
-    lead = update_lead(db=db, lead_id=lead_id, lead_update=lead_update)
+    lead = await db.run_sync(update_lead, lead_id=lead_id, lead_update=lead_update)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     return lead
@@ -158,11 +221,11 @@ async def update_lead_endpoint(
 @router.post("/{lead_id}/qualify", response_model=QualifyResponse)
 async def qualify_lead_endpoint(
     lead_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Qualify a lead (creates opportunity)"""
     try:
-        opportunity = qualify_lead(db=db, lead_id=lead_id)
+        opportunity = await db.run_sync(qualify_lead, lead_id=lead_id)
         if not opportunity:
             raise HTTPException(status_code=404, detail="Lead not found")
         
@@ -178,15 +241,15 @@ async def qualify_lead_endpoint(
 @router.post("/{lead_id}/request-info", response_model=RequestInfoResponse)
 async def request_info(
     lead_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Request info for a lead (triggers automation)"""
     try:
-        lead = request_info_for_lead(db=db, lead_id=lead_id)
+        lead = await db.run_sync(request_info_for_lead, lead_id=lead_id)
         
         # Trigger automation (this will be handled by the automation service)
         from app.modules.automation.service import start_qualification_chase
-        start_qualification_chase(db=db, lead_id=lead_id)
+        await run_in_threadpool(start_qualification_chase, lead_id=lead_id)
         
         return RequestInfoResponse(
             lead_id=lead_id,
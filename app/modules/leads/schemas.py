@@ -12,6 +12,9 @@ class LeadBase(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
     phone: Optional[str] = None
+    postcode: Optional[str] = None
+    product_interest: Optional[str] = None
+    timeframe: Optional[str] = None
     raw_payload: Optional[Dict[str, Any]] = None
 
 
@@ -25,6 +28,9 @@ class LeadUpdate(BaseModel):
     phone: Optional[str] = None
     status: Optional[LeadStatus] = None
     qualification_notes: Optional[str] = None
+    postcode: Optional[str] = None
+    product_interest: Optional[str] = None
+    timeframe: Optional[str] = None
     raw_payload: Optional[Dict[str, Any]] = None
 
 
@@ -46,6 +52,7 @@ class LeadDetail(BaseModel):
     lead: Lead
     customer: Optional[CustomerSummary] = None
     timeline: List["ContactEventSummary"] = []
+    timeline_next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,49 +1,192 @@
-from typing import List, Optional, Dict, Any
-from app.modules.leads.models import Lead
+from typing import List, Optional, Dict, Any, Iterable, Mapping, Tuple
+from sqlalchemy import String, and_, case, cast, func, null, or_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.sql import ColumnElement
+from app.core.config import settings
+from app.modules.leads.models import Lead, LeadSource
 
+# Payload keys stored as Lead columns
+PROMOTED_FIELDS = ("postcode", "product_interest", "timeframe")
 
-def compute_missing_fields(lead: Lead) -> List[str]:
+# Qualification requirements: requirement name -> lead fields, any one of which
+# satisfies it (non-blank). "sources" overrides requirements per lead source: a
+# field list replaces a requirement, null drops it. Override with the
+# QUALIFICATION_RULES setting (JSON), e.g.
+# {"sources": {"manual": {"timeframe": null}}}
+DEFAULT_QUALIFICATION_RULES = {
+    "required": {
+        "name": ["name"],
+        "phone_or_email": ["phone", "email"],
+        "postcode": ["postcode"],
+        "product_interest": ["product_interest"],
+        "timeframe": ["timeframe"],
+    },
+    "sources": {},
+}
+
+# How chase messages ask for each missing requirement
+MISSING_FIELD_PROMPTS = {
+    "name": "Your name",
+    "phone_or_email": "Your phone number or email",
+    "postcode": "Your postcode",
+    "product_interest": "What product/service you're interested in",
+    "timeframe": "When you're looking to proceed",
+}
+
+Checks = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+def extract_promoted_fields(payload: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
     """
-    Compute missing fields required for qualification.
-    Checks for:
-    - name
-    - phone_or_email (at least one)
-    - postcode
-    - product_interest
-    - timeframe
+    Read the promoted qualification fields from a raw payload.
+    Blank values are returned as None.
+    """
+    fields = {}
+    for field in PROMOTED_FIELDS:
+        value = payload.get(field) if isinstance(payload, dict) else None
+        value = str(value).strip() if value is not None else None
+        fields[field] = value or None
+    return fields
+
+
+def _present(value: Any) -> bool:
+    """Python side of `not value or not value.strip()`, negated"""
+    if not value:
+        return False
+    return not value.isspace() if isinstance(value, str) else bool(str(value).strip())
+
+
+def _blank(column: ColumnElement) -> ColumnElement:
+    """SQL for `not value or not value.strip()`"""
+    return or_(column.is_(None), ~column.op("~")(r"\S"))
+
+
+class QualificationPlan:
+    """
+    Qualification rules compiled to flat (requirement, fields) tuples per source.
+    The same plan evaluates ORM leads, row dicts and SQL (for bulk re-scoring).
+    Build with compile_qualification_rules().
     """
-    missing = []
     
-    # Check name
-    if not lead.name or not lead.name.strip():
-        missing.append("name")
+    __slots__ = ("default", "by_source", "fields")
     
-    # Check phone or email (at least one required)
-    if not lead.phone and not lead.email:
-        missing.append("phone_or_email")
+    def __init__(self, default: Checks, by_source: Dict[str, Checks]):
+        self.default = default
+        self.by_source = by_source
+        # Every lead field any rule reads, so writers know when to re-score
+        self.fields = frozenset(
+            field
+            for checks in (default, *by_source.values())
+            for _, fields in checks
+            for field in fields
+        )
     
-    # Check postcode (from raw_payload)
-    postcode = None
-    if lead.raw_payload and isinstance(lead.raw_payload, dict):
-        postcode = lead.raw_payload.get("postcode")
+    def checks_for(self, source: Any) -> Checks:
+        if not self.by_source:
+            return self.default
+        return self.by_source.get(getattr(source, "value", source), self.default)
     
-    if not postcode or not str(postcode).strip():
-        missing.append("postcode")
+    def missing_for_lead(self, lead: Lead) -> List[str]:
+        """Unmet requirements of an ORM lead (or any object with lead attributes)"""
+        missing = []
+        for requirement, fields in self.checks_for(lead.source):
+            for field in fields:
+                if _present(getattr(lead, field)):
+                    break
+            else:
+                missing.append(requirement)
+        return missing
     
-    # Check product_interest (from raw_payload)
-    product_interest = None
-    if lead.raw_payload and isinstance(lead.raw_payload, dict):
-        product_interest = lead.raw_payload.get("product_interest")
+    def missing_for_row(self, row: Mapping[str, Any]) -> List[str]:
+        """Unmet requirements of a row dict keyed by lead column names"""
+        missing = []
+        for requirement, fields in self.checks_for(row.get("source")):
+            for field in fields:
+                if _present(row.get(field)):
+                    break
+            else:
+                missing.append(requirement)
+        return missing
     
-    if not product_interest or not str(product_interest).strip():
-        missing.append("product_interest")
+    def missing_for_rows(self, rows: Iterable[Mapping[str, Any]]) -> List[List[str]]:
+        return [self.missing_for_row(row) for row in rows]
     
-    # Check timeframe (from raw_payload)
-    timeframe = None
-    if lead.raw_payload and isinstance(lead.raw_payload, dict):
-        timeframe = lead.raw_payload.get("timeframe")
+    def _checks_sql(self, checks: Checks, columns: Mapping[str, ColumnElement]) -> ColumnElement:
+        blank = [(requirement, and_(*(_blank(columns[field]) for field in fields))) for requirement, fields in checks]
+        if not blank:
+            return func.jsonb_build_array()
+        return func.to_jsonb(
+            func.array_remove(array([case((check, requirement)) for requirement, check in blank]), cast(null(), String))
+        )
     
-    if not timeframe or not str(timeframe).strip():
-        missing.append("timeframe")
+    def sql(self, columns: Mapping[str, ColumnElement], source: ColumnElement) -> ColumnElement:
+        """
+        Unmet requirements as a SQL JSONB array. columns maps each field in
+        self.fields to an expression, so callers can substitute backfilled values.
+        """
+        default = self._checks_sql(self.default, columns)
+        if not self.by_source:
+            return default
+        return case(
+            *(
+                (source == LeadSource(name), self._checks_sql(checks, columns))
+                for name, checks in self.by_source.items()
+            ),
+            else_=default,
+        )
+
+
+def compile_qualification_rules(rules: Mapping[str, Any]) -> QualificationPlan:
+    """
+    Compile a rule set (see DEFAULT_QUALIFICATION_RULES) into a plan.
+    Raises ValueError for unknown lead fields or sources.
+    """
+    columns = set(Lead.__table__.columns.keys()) - {"raw_payload", "missing_fields"}
     
-    return missing
+    def checks(required: Mapping[str, Optional[List[str]]]) -> Checks:
+        compiled = []
+        for requirement, fields in required.items():
+            if fields is None:
+                continue
+            if isinstance(fields, str) or not fields:
+                raise ValueError(f"Requirement {requirement!r} needs a non-empty list of fields")
+            unknown = set(fields) - columns
+            if unknown:
+                raise ValueError(f"Requirement {requirement!r} uses unknown lead fields: {sorted(unknown)}")
+            compiled.append((requirement, tuple(fields)))
+        return tuple(compiled)
+    
+    required = dict(rules.get("required", DEFAULT_QUALIFICATION_RULES["required"]))
+    by_source = {}
+    for source, overrides in (rules.get("sources") or {}).items():
+        try:
+            source = LeadSource(source).value
+        except ValueError:
+            raise ValueError(f"Unknown lead source in qualification rules: {source!r}")
+        by_source[source] = checks({**required, **overrides})
+    return QualificationPlan(checks(required), by_source)
+
+
+_qualification_plan: Optional[QualificationPlan] = None
+
+
+def get_qualification_plan() -> QualificationPlan:
+    """Plan compiled from the QUALIFICATION_RULES setting, once per process"""
+    global _qualification_plan
+    if _qualification_plan is None:
+        _qualification_plan = compile_qualification_rules(settings.QUALIFICATION_RULES or DEFAULT_QUALIFICATION_RULES)
+    return _qualification_plan
+
+
+def compute_missing_fields(lead: Lead) -> List[str]:
+    """
+    Compute missing fields required for qualification, per the
+    qualification rules for the lead's source. By default:
+    - name
+    - phone_or_email (at least one)
+    - postcode
+    - product_interest
+    - timeframe
+    Only reads columns, never raw_payload.
+    """
+    return get_qualification_plan().missing_for_lead(lead)
@@ -1,19 +1,66 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_, cast, String
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import select, insert, inspect, tuple_, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from typing import Optional, List
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime
 import hashlib
 import json
 
 from app.modules.leads.models import Lead, LeadSource, LeadStatus, IdempotencyKey
-from app.modules.leads.schemas import LeadCreate, LeadUpdate
-from app.modules.leads.scoring import compute_missing_fields
-from app.modules.customers.service import find_or_create_customer
+from app.modules.leads.schemas import LeadCreate, LeadUpdate, Lead as LeadSchema
+from app.modules.leads.cache import invalidate_lead_details
+from app.modules.leads.scoring import (
+    PROMOTED_FIELDS,
+    compute_missing_fields,
+    extract_promoted_fields,
+    get_qualification_plan,
+)
+from app.modules.customers.models import Customer
+from app.modules.customers.service import find_or_create_customer, find_or_create_customers_bulk
 from app.modules.comms.models import ContactEvent, ContactChannel, ContactDirection
+from app.modules.comms.timeline import timeline_events
 from app.modules.opportunities.models import Opportunity, OpportunityStage
-from app.core.idempotency import check_idempotency_key, create_idempotency_key, generate_idempotency_key
-from app.core.utils import normalize_phone_to_e164
+from app.core.idempotency import (
+    claim_idempotency_key,
+    claim_idempotency_keys,
+    generate_idempotency_key,
+    get_idempotency_cache,
+)
+from app.core.pagination import encode_cursor
+from app.core.phone import normalize_phone_to_e164, normalize_many
+
+
+def _refresh_lead(db: Session, lead: Lead) -> None:
+    """Refresh a lead including the deferred raw_payload, for API responses that return it"""
+    db.refresh(lead, [attr.key for attr in inspect(Lead).column_attrs])
+
+
+def _webhook_idempotency_key(source: LeadSource, payload: dict, external_id: Optional[str] = None) -> str:
+    """Build the idempotency key for a webhook payload"""
+    if external_id:
+        return generate_idempotency_key(source.value, external_id=external_id)
+    # Hash payload for deduplication
+    payload_str = json.dumps(payload, sort_keys=True)
+    payload_hash = hashlib.sha256(payload_str.encode()).hexdigest()
+    return generate_idempotency_key(source.value, payload_hash=payload_hash)
+
+
+def _extract_webhook_fields(payload: dict) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """Extract (name, email, phone) from a webhook payload"""
+    name = payload.get("name") or payload.get("full_name")
+    email = payload.get("email")
+    phone = payload.get("phone") or payload.get("phone_number")
+    return name, email, phone
+
+
+def _webhook_duplicate_result(lead_id: Optional[UUID]) -> dict:
+    """Intake result for a payload that was already processed"""
+    return {
+        "duplicate": True,
+        "lead_id": str(lead_id) if lead_id else None,
+        "message": "Lead already processed",
+    }
 
 
 def create_lead_from_webhook(
@@ -21,34 +68,36 @@ def create_lead_from_webhook(
     source: LeadSource,
     payload: dict,
     external_id: Optional[str] = None,
-) -> tuple[Optional[Lead], bool]:
+) -> dict:
     """
     Create lead from webhook with idempotency check.
-    Returns (lead, is_duplicate)
+    Redeliveries still in the idempotency cache are answered from Redis;
+    otherwise the idempotency key, customer, lead and system event are
+    written in a single transaction.
+    Returns a result dict with duplicate, lead_id and, for new leads,
+    status and missing_fields. Duplicates carry the original lead_id
+    (None if the key predates lead tracking).
     """
     # Generate idempotency key
-    if external_id:
-        idempotency_key_str = generate_idempotency_key(source.value, external_id=external_id)
-    else:
-        # Hash payload for deduplication
-        payload_str = json.dumps(payload, sort_keys=True)
-        payload_hash = hashlib.sha256(payload_str.encode()).hexdigest()
-        idempotency_key_str = generate_idempotency_key(source.value, payload_hash=payload_hash)
-    
-    # Check idempotency
-    exists, _ = check_idempotency_key(db, idempotency_key_str)
-    if exists:
-        # For MVP, we return None to indicate duplicate
-        # In production, you might want to store the lead_id in the idempotency key metadata
-        return None, True
-    
-    # Create idempotency key
-    create_idempotency_key(db, idempotency_key_str)
+    idempotency_key_str = _webhook_idempotency_key(source, payload, external_id)
+    
+    # Check the front cache for redeliveries
+    cache = get_idempotency_cache()
+    if cache:
+        cached = cache.get_lead_ids([idempotency_key_str])
+        if idempotency_key_str in cached:
+            return _webhook_duplicate_result(cached[idempotency_key_str])
+    
+    # Claim the key atomically for the lead we are about to create
+    lead_id = uuid4()
+    claimed, original_lead_id = claim_idempotency_key(db, idempotency_key_str, lead_id)
+    if not claimed:
+        if cache:
+            cache.remember({idempotency_key_str: original_lead_id})
+        return _webhook_duplicate_result(original_lead_id)
     
     # Extract fields from payload
-    name = payload.get("name") or payload.get("full_name")
-    email = payload.get("email")
-    phone = payload.get("phone") or payload.get("phone_number")
+    name, email, phone = _extract_webhook_fields(payload)
     
     # Normalize phone
     normalized_phone = normalize_phone_to_e164(phone) if phone else None
@@ -63,6 +112,7 @@ def create_lead_from_webhook(
     
     # Create lead
     lead = Lead(
+        id=lead_id,
         source=source,
         name=name,
         email=email,
@@ -70,6 +120,7 @@ def create_lead_from_webhook(
         customer_id=customer.id,
         raw_payload=payload,
         status=LeadStatus.NEW,
+        **extract_promoted_fields(payload),
     )
     
     # Compute missing fields
@@ -82,8 +133,6 @@ def create_lead_from_webhook(
         lead.status = LeadStatus.NEW
     
     db.add(lead)
-    db.commit()
-    db.refresh(lead)
     
     # Log system event
     event = ContactEvent(
@@ -97,7 +146,124 @@ def create_lead_from_webhook(
     db.add(event)
     db.commit()
     
-    return lead, False
+    # The new lead's event is on the customer's other leads' timelines
+    invalidate_lead_details(db, customer_ids=[customer.id])
+    if cache:
+        cache.remember({idempotency_key_str: lead_id})
+    
+    return {
+        "duplicate": False,
+        "lead_id": str(lead_id),
+        "status": lead.status.value,
+        "missing_fields": lead.missing_fields or [],
+    }
+
+
+def create_leads_from_webhook_batch(
+    db: Session,
+    source: LeadSource,
+    payloads: List[dict],
+    external_id_field: Optional[str] = None,
+) -> List[dict]:
+    """
+    Create leads from a batch of webhook payloads in a single transaction.
+    - Claims idempotency keys for the whole batch in one INSERT ... ON CONFLICT
+    - Resolves customers in bulk
+    - Inserts leads and contact events with multi-row statements
+    Returns one result dict per payload, in input order.
+    """
+    keys = []
+    for payload in payloads:
+        external_id = payload.get(external_id_field) if external_id_field else None
+        keys.append(_webhook_idempotency_key(source, payload, str(external_id) if external_id else None))
+    
+    # Assign a lead id to the first occurrence of each key,
+    # later repeats in the same batch are duplicates of it
+    lead_ids = {}
+    first_indexes = []
+    for index, key in enumerate(keys):
+        if key not in lead_ids:
+            lead_ids[key] = uuid4()
+            first_indexes.append(index)
+    
+    # Redeliveries still in the idempotency cache skip Postgres entirely
+    cache = get_idempotency_cache()
+    existing = {}
+    if cache:
+        existing = cache.get_lead_ids(lead_ids)
+    
+    # Claim the remaining keys with one multi-row insert, conflicts return the original lead_id
+    existing.update(claim_idempotency_keys(
+        db, {key: lead_id for key, lead_id in lead_ids.items() if key not in existing}
+    ))
+    new_indexes = [index for index in first_indexes if keys[index] not in existing]
+    
+    # Extract and normalize contact details
+    fields = [_extract_webhook_fields(payloads[index]) for index in new_indexes]
+    normalized_phones = normalize_many(phone for _, _, phone in fields)
+    contacts = [(email, normalized_phone, name) for (name, email, _), normalized_phone in zip(fields, normalized_phones)]
+    
+    # Resolve customers in bulk
+    customer_ids = find_or_create_customers_bulk(db=db, contacts=contacts)
+    
+    now = datetime.utcnow()
+    lead_rows = []
+    event_rows = []
+    results = [
+        {"index": index, **_webhook_duplicate_result(existing.get(key, lead_ids[key]))}
+        for index, key in enumerate(keys)
+    ]
+    plan = get_qualification_plan()
+    for index, (email, normalized_phone, name), customer_id in zip(new_indexes, contacts, customer_ids):
+        lead_id = lead_ids[keys[index]]
+    
+        row = {
+            "id": lead_id,
+            "source": source,
+            "customer_id": customer_id,
+            "name": name,
+            "email": email,
+            "phone": normalized_phone,
+            "raw_payload": payloads[index],
+            **extract_promoted_fields(payloads[index]),
+            "created_at": now,
+            "updated_at": now,
+        }
+    
+        # Compute missing fields and status
+        missing_fields = plan.missing_for_row(row)
+        status = LeadStatus.NEEDS_INFO if missing_fields else LeadStatus.NEW
+        row["missing_fields"] = missing_fields
+        row["status"] = status
+        lead_rows.append(row)
+        event_rows.append({
+            "id": uuid4(),
+            "customer_id": customer_id,
+            "lead_id": lead_id,
+            "channel": ContactChannel.SYSTEM,
+            "direction": ContactDirection.INTERNAL,
+            "body": f"Lead received from {source.value}",
+            "meta": {"source": source.value, "idempotency_key": keys[index]},
+            "created_at": now,
+        })
+        results[index] = {
+            "index": index,
+            "duplicate": False,
+            "lead_id": str(lead_id),
+            "status": status.value,
+            "missing_fields": missing_fields,
+        }
+    
+    if lead_rows:
+        db.execute(insert(Lead), lead_rows)
+        db.execute(insert(ContactEvent), event_rows)
+    db.commit()
+    
+    invalidate_lead_details(db, customer_ids={row["customer_id"] for row in lead_rows})
+    if cache:
+        cache.remember({key: existing.get(key, lead_ids[key]) for key in lead_ids})
+    
+    return results
 
 
 def create_lead_manual(
@@ -115,6 +281,12 @@ def create_lead_manual(
         name=lead_data.name,
     )
     
+    # Promoted fields come from the payload unless given explicitly
+    promoted = extract_promoted_fields(lead_data.raw_payload)
+    for field in PROMOTED_FIELDS:
+        if getattr(lead_data, field):
+            promoted[field] = getattr(lead_data, field)
+    
     # Create lead
     lead = Lead(
         source=lead_data.source,
@@ -124,6 +296,7 @@ def create_lead_manual(
         customer_id=customer.id,
         raw_payload=lead_data.raw_payload,
         status=LeadStatus.NEW,
+        **promoted,
     )
     
     # Compute missing fields
@@ -137,7 +310,7 @@ def create_lead_manual(
     
     db.add(lead)
     db.commit()
-    db.refresh(lead)
+    _refresh_lead(db, lead)
     
     # Log system event
     event = ContactEvent(
@@ -150,25 +323,47 @@ def create_lead_manual(
     db.add(event)
     db.commit()
     
+    invalidate_lead_details(db, customer_ids=[customer.id])
     return lead
 
 
-def get_lead_inbox(db: Session, limit: int = 100, offset: int = 0) -> List[Lead]:
-    """Get leads for inbox (status NEW or NEEDS_INFO), ordered newest first"""
-    # Cast enum column to string and compare with lowercase values to match database enum
+# Columns of LeadInboxItem - the inbox never loads raw_payload or notes
+INBOX_COLUMNS = (
+    Lead.id,
+    Lead.source,
+    Lead.status,
+    Lead.name,
+    Lead.email,
+    Lead.phone,
+    Lead.missing_fields,
+    Lead.created_at,
+)
+
+
+def get_lead_inbox(
+    db: Session,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[tuple[datetime, UUID]] = None,
+) -> List[dict]:
+    """
+    Get leads for inbox (status NEW or NEEDS_INFO), ordered newest first.
+    Returns plain dicts with the LeadInboxItem fields, ready for serialization.
+    Pass cursor (created_at, id) of the last lead seen for keyset pagination,
+    which is served by the partial ix_leads_inbox index at any depth.
+    offset is kept for existing clients and ignored when a cursor is given.
+    """
     stmt = (
-        select(Lead)
-        .where(
-            or_(
-                cast(Lead.status, String) == "new",
-                cast(Lead.status, String) == "needs_info",
-            )
-        )
-        .order_by(Lead.created_at.desc())
+        select(*INBOX_COLUMNS)
+        .where(Lead.status.in_([LeadStatus.NEW, LeadStatus.NEEDS_INFO]))
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
         .limit(limit)
-        .offset(offset)
     )
-    return list(db.execute(stmt).scalars().all())
+    if cursor:
+        stmt = stmt.where(tuple_(Lead.created_at, Lead.id) < tuple_(*cursor))
+    elif offset:
+        stmt = stmt.offset(offset)
+    return [dict(row) for row in db.execute(stmt).mappings()]
 
 
 def get_lead_detail(db: Session, lead_id: UUID) -> Optional[Lead]:
@@ -177,6 +372,143 @@ def get_lead_detail(db: Session, lead_id: UUID) -> Optional[Lead]:
     return db.execute(stmt).scalar_one_or_none()
 
 
+# Timeline events included in the lead detail view
+LEAD_DETAIL_TIMELINE_LIMIT = 100
+
+
+def _lead_timeline(limit: int):
+    """Newest timeline events of the outer query's lead, for correlated subqueries"""
+    events = timeline_events(Lead.customer_id, Lead.id, limit)
+    return (
+        select(
+            events.id,
+            events.channel,
+            events.direction,
+            events.subject,
+            events.body,
+            events.created_at,
+        )
+        .order_by(events.created_at.desc(), events.id.desc())
+        .limit(limit)
+        .correlate(Lead)
+    )
+
+
+def _lead_detail_etag(
+    lead_updated_at: datetime,
+    customer_updated_at: Optional[datetime],
+    newest_event_id: Optional[UUID],
+) -> str:
+    """Strong ETag for a lead detail view"""
+    version = f"{lead_updated_at.isoformat()}|{customer_updated_at.isoformat() if customer_updated_at else ''}|{newest_event_id or ''}"
+    return '"' + hashlib.blake2b(version.encode(), digest_size=12).hexdigest() + '"'
+
+
+def get_lead_detail_etag(db: Session, lead_id: UUID) -> Optional[str]:
+    """
+    Current ETag of a lead detail view, from one small query.
+    Returns None if the lead does not exist.
+    """
+    newest_event_id = _lead_timeline(1).subquery("events")
+    newest_event_id = select(newest_event_id.c.id).correlate(Lead).scalar_subquery()
+    stmt = (
+        select(Lead.updated_at, Customer.updated_at, newest_event_id)
+        .outerjoin(Customer, Customer.id == Lead.customer_id)
+        .where(Lead.id == lead_id)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return None
+    return _lead_detail_etag(*row)
+
+
+def get_lead_detail_view(db: Session, lead_id: UUID) -> Optional[dict]:
+    """
+    Lead, customer summary and latest timeline, ready for JSON serialization,
+    read with one statement. The timeline is aggregated to JSON by Postgres,
+    newest first.
+    Returns None if the lead does not exist, otherwise a dict with lead,
+    customer, timeline, timeline_next_cursor and etag.
+    """
+    timeline_limit = LEAD_DETAIL_TIMELINE_LIMIT
+    events = _lead_timeline(timeline_limit).subquery("events")
+    event = func.json_build_object(
+        "id", events.c.id,
+        "channel", events.c.channel,
+        "direction", events.c.direction,
+        "subject", events.c.subject,
+        "body", events.c.body,
+        "created_at", events.c.created_at,
+    )
+    timeline = (
+        select(func.coalesce(
+            func.json_agg(aggregate_order_by(event, events.c.created_at.desc(), events.c.id.desc())),
+            literal_column("'[]'::json"),
+        ))
+        .scalar_subquery()
+        .correlate(Lead)
+    )
+    stmt = (
+        select(
+            Lead,
+            Customer.id.label("customer_id"),
+            Customer.name.label("customer_name"),
+            Customer.primary_email,
+            Customer.primary_phone,
+            Customer.status.label("customer_status"),
+            Customer.updated_at.label("customer_updated_at"),
+            timeline.label("timeline"),
+        )
+        .outerjoin(Customer, Customer.id == Lead.customer_id)
+        .where(Lead.id == lead_id)
+        .options(undefer(Lead.raw_payload))
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return None
+    
+    customer = None
+    if row.customer_id:
+        customer = {
+            "id": str(row.customer_id),
+            "name": row.customer_name,
+            "primary_email": row.primary_email,
+            "primary_phone": row.primary_phone,
+            "status": row.customer_status.value,
+        }
+    timeline = row.timeline
+    newest_event_id = UUID(timeline[0]["id"]) if timeline else None
+    timeline_next_cursor = None
+    if len(timeline) == timeline_limit:
+        timeline_next_cursor = encode_cursor(datetime.fromisoformat(timeline[-1]["created_at"]), timeline[-1]["id"])
+    
+    return {
+        "lead": LeadSchema.model_validate(row.Lead).model_dump(mode="json"),
+        "customer": customer,
+        "timeline": timeline,
+        "timeline_next_cursor": timeline_next_cursor,
+        "etag": _lead_detail_etag(row.Lead.updated_at, row.customer_updated_at, newest_event_id),
+    }
+
+
+def get_lead_timeline(
+    db: Session,
+    lead_id: UUID,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, UUID]] = None,
+) -> Optional[List[ContactEvent]]:
+    """
+    Timeline page for a lead and its customer, newest first.
+    Returns None if the lead does not exist.
+    """
+    customer_id = db.execute(select(Lead.customer_id).where(Lead.id == lead_id)).first()
+    if customer_id is None:
+        return None
+    events = timeline_events(customer_id[0], lead_id, limit, cursor)
+    stmt = select(events).order_by(events.created_at.desc(), events.id.desc()).limit(limit)
+    return list(db.execute(stmt).scalars().all())
+
+
 def update_lead(db: Session, lead_id: UUID, lead_update: LeadUpdate) -> Optional[Lead]:
     """Update lead"""
     lead = get_lead_detail(db, lead_id)
@@ -189,11 +521,16 @@ def update_lead(db: Session, lead_id: UUID, lead_update: LeadUpdate) -> Optional
     if "phone" in update_data and update_data["phone"]:
         update_data["phone"] = normalize_phone_to_e164(update_data["phone"])
     
+    # A new payload refreshes promoted fields not given explicitly
+    if "raw_payload" in update_data:
+        for field, value in extract_promoted_fields(update_data["raw_payload"]).items():
+            update_data.setdefault(field, value)
+    
     for field, value in update_data.items():
         setattr(lead, field, value)
     
     # Recompute missing fields if relevant fields changed
-    if any(field in update_data for field in ["name", "email", "phone", "raw_payload"]):
+    if not get_qualification_plan().fields.isdisjoint(update_data):
         lead.missing_fields = compute_missing_fields(lead)
         # Update status based on missing fields
         if lead.missing_fields:
@@ -202,7 +539,8 @@ def update_lead(db: Session, lead_id: UUID, lead_update: LeadUpdate) -> Optional
             lead.status = LeadStatus.NEW
     
     db.commit()
-    db.refresh(lead)
+    invalidate_lead_details(db, lead_ids=[lead.id])
+    _refresh_lead(db, lead)
     return lead
 
 
@@ -258,6 +596,7 @@ def qualify_lead(db: Session, lead_id: UUID) -> Optional[Opportunity]:
     db.add(event)
     
     db.commit()
+    invalidate_lead_details(db, lead_ids=[lead.id], customer_ids=[lead.customer_id])
     db.refresh(opportunity)
     return opportunity
 
@@ -282,5 +621,6 @@ def request_info_for_lead(db: Session, lead_id: UUID) -> Lead:
         lead.status = LeadStatus.NEEDS_INFO
     
     db.commit()
+    invalidate_lead_details(db, lead_ids=[lead.id])
     db.refresh(lead)
     return lead
@@ -5,7 +5,7 @@ from datetime import datetime
 import uuid
 import enum
 
-from app.core.db import Base
+from app.core.db import Base, enum_values
 
 
 class OpportunityStage(str, enum.Enum):
@@ -22,7 +22,7 @@ class Opportunity(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=False, index=True)
     lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), nullable=True)
-    stage = Column(SQLEnum(OpportunityStage), default=OpportunityStage.NEW, nullable=False)
+    stage = Column(SQLEnum(OpportunityStage, values_callable=enum_values), default=OpportunityStage.NEW, nullable=False)
     value_estimate = Column(Numeric(10, 2), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.core.db import get_async_db
+from app.core.responses import FastJSONResponse
+from app.modules.search.schemas import SearchResult
+from app.modules.search.service import search, MIN_QUERY_LENGTH
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[SearchResult])
+async def search_endpoint(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Search leads and customers by partial name, email, phone or postcode.
+    Phone numbers match in local (07700 900123) or E.164 form.
+    Results are ranked best match first.
+    """
+    results = await db.run_sync(search, q=q, limit=limit)
+    return FastJSONResponse(content=results)
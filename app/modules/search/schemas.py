@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+
+
+class SearchResult(BaseModel):
+    """Lead or customer matching a search query"""
+    type: str  # "lead" or "customer"
+    id: UUID
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    postcode: Optional[str] = None
+    status: str
+    created_at: datetime
+    rank: float
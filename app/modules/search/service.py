@@ -0,0 +1,115 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, union_all, or_, func, literal, cast, String, null
+from typing import List, Optional
+import re
+
+from app.modules.leads.models import Lead
+from app.modules.customers.models import Customer
+
+# Shortest term the trigram indexes can serve
+MIN_QUERY_LENGTH = 3
+
+
+def _like_pattern(value: str) -> str:
+    """Substring ILIKE pattern with LIKE wildcards in the value escaped"""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _phone_digits(q: str) -> Optional[str]:
+    """
+    Digits to match against E.164 phones, if the query looks like a phone number.
+    A leading trunk 0 is dropped so "07700 900" matches "+447700900...".
+    """
+    if not re.fullmatch(r"[\d\s+()\-]+", q):
+        return None
+    digits = re.sub(r"\D", "", q)
+    if digits.startswith("0"):
+        digits = digits[1:]
+    return digits if len(digits) >= MIN_QUERY_LENGTH else None
+
+
+def _search_branch(
+    kind: str,
+    q: str,
+    digits: Optional[str],
+    *,
+    id_col,
+    name_col,
+    email_col,
+    phone_col,
+    postcode_col,
+    status_col,
+    created_at_col,
+):
+    """Matching rows of one table, ranked by trigram similarity"""
+    pattern = _like_pattern(q)
+    conditions = [
+        name_col.ilike(pattern, escape="\\"),
+        # Fuzzy word match, e.g. a misspelt surname
+        literal(q).op("<%")(name_col),
+        email_col.ilike(pattern, escape="\\"),
+    ]
+    ranks = [
+        func.word_similarity(q, name_col),
+        func.similarity(email_col, q),
+    ]
+    if postcode_col is not None:
+        conditions.append(postcode_col.ilike(pattern, escape="\\"))
+        ranks.append(func.similarity(postcode_col, q))
+    if digits:
+        conditions.append(phone_col.like(_like_pattern(digits), escape="\\"))
+        ranks.append(func.similarity(phone_col, digits))
+    
+    return select(
+        literal(kind).label("type"),
+        id_col.label("id"),
+        name_col.label("name"),
+        email_col.label("email"),
+        phone_col.label("phone"),
+        (postcode_col if postcode_col is not None else cast(null(), String)).label("postcode"),
+        cast(status_col, String).label("status"),
+        created_at_col.label("created_at"),
+        func.greatest(*ranks).label("rank"),
+    ).where(or_(*conditions))
+
+
+def search(db: Session, q: str, limit: int = 20) -> List[dict]:
+    """
+    Search leads and customers by name, email, phone and postcode.
+    Matches are served by pg_trgm GIN indexes and ranked by trigram
+    similarity, best first, in one statement.
+    Returns plain dicts with the SearchResult fields.
+    """
+    q = q.strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        return []
+    digits = _phone_digits(q)
+    
+    leads = _search_branch(
+        "lead", q, digits,
+        id_col=Lead.id,
+        name_col=Lead.name,
+        email_col=Lead.email,
+        phone_col=Lead.phone,
+        postcode_col=Lead.postcode,
+        status_col=Lead.status,
+        created_at_col=Lead.created_at,
+    )
+    customers = _search_branch(
+        "customer", q, digits,
+        id_col=Customer.id,
+        name_col=Customer.name,
+        email_col=Customer.primary_email,
+        phone_col=Customer.primary_phone,
+        postcode_col=None,
+        status_col=Customer.status,
+        created_at_col=Customer.created_at,
+    )
+    results = union_all(leads, customers).subquery("results")
+    stmt = (
+        select(results)
+        .order_by(results.c.rank.desc(), results.c.created_at.desc())
+        .limit(limit)
+    )
+    return [dict(row) for row in db.execute(stmt).mappings()]
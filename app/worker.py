@@ -2,9 +2,23 @@
 RQ Worker for background jobs.
 Run with: python -m app.worker
 Or: rq worker default
+
+    python -m app.worker --processes 4
+
+runs a supervised pool of long-lived workers instead. App modules are
+imported once before forking, and each worker runs jobs in its own process
+(SimpleWorker) rather than forking per job, so its database connection pool
+is reused across jobs. Crashed workers are restarted.
+SIGTERM/SIGINT asks every worker to finish its current job and exit.
 """
+from multiprocessing.connection import wait
+import argparse
+import multiprocessing
 import os
+import signal
+import socket
 import sys
+import time
 
 # Ensure we can import app modules
 project_root = os.path.dirname(os.path.dirname(__file__))
@@ -12,7 +26,7 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from redis import Redis
-from rq import Worker, Queue, Connection
+from rq import Worker, SimpleWorker, Queue, Connection
 from app.core.config import settings
 
 # Listen on the default queue
@@ -20,7 +34,146 @@ listen = ['default']
 
 redis_conn = Redis.from_url(settings.REDIS_URL)
 
+# A worker exiting sooner than this after starting counts as a crash loop
+MIN_UPTIME_SECONDS = 10
+MAX_RESTART_DELAY_SECONDS = 60
+
+
+def _preload() -> None:
+    """Import and configure everything jobs use, so forked workers share it"""
+    from sqlalchemy.orm import configure_mappers
+    import app.modules.automation.jobs  # noqa: F401
+    from app.modules.customers.models import Customer  # noqa: F401
+    from app.modules.opportunities.models import Opportunity  # noqa: F401
+    
+    configure_mappers()
+
+
+def _pool_worker(name: str) -> None:
+    """Entry point of a pool process"""
+    from app.core.db import engine
+    
+    # Keep terminal Ctrl+C to the supervisor, which stops workers with one SIGTERM
+    os.setpgrp()
+    # Connections inherited from the supervisor belong to it
+    engine.dispose(close=False)
+    connection = Redis.from_url(settings.REDIS_URL)
+    worker = SimpleWorker(
+        [Queue(queue, connection=connection) for queue in listen],
+        connection=connection,
+        name=name,
+    )
+    worker.work()
+
+
+class WorkerPool:
+    """
+    Supervises a fixed number of SimpleWorker processes, restarting any that
+    exit, and logs each one's job throughput every stats_interval seconds.
+    """
+    
+    def __init__(self, processes: int, stats_interval: float, shutdown_timeout: float):
+        self.processes = processes
+        self.stats_interval = stats_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.prefix = f"{socket.gethostname()}.{os.getpid()}"
+        self.workers = {}  # slot -> (Process, name, started)
+        self.failures = {}  # slot -> consecutive early exits
+        self.restart_at = {}  # slot -> time of delayed restart
+        self.last_stats = {}  # name -> (successful, failed, working_time)
+        self.stopping = False
+    
+    def start(self, slot: int, generation: int = 0) -> None:
+        name = f"{self.prefix}.{slot}.{generation}"
+        process = multiprocessing.get_context("fork").Process(target=_pool_worker, args=(name,), name=name)
+        process.start()
+        self.workers[slot] = (process, name, time.monotonic())
+    
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+    
+    def supervise(self) -> None:
+        """Restart exited workers, with backoff when they exit right after starting"""
+        now = time.monotonic()
+        for slot, (process, name, started) in list(self.workers.items()):
+            if process.is_alive() or slot in self.restart_at:
+                continue
+            process.join()
+            self.failures[slot] = self.failures.get(slot, 0) + 1 if now - started < MIN_UPTIME_SECONDS else 0
+            delay = min(2 ** self.failures[slot] - 1, MAX_RESTART_DELAY_SECONDS)
+            print(f"Worker {name} exited with code {process.exitcode}, restarting in {delay}s", flush=True)
+            self.restart_at[slot] = now + delay
+        for slot, restart_at in list(self.restart_at.items()):
+            if now >= restart_at:
+                del self.restart_at[slot]
+                generation = int(self.workers[slot][1].rsplit(".", 1)[1]) + 1
+                self.start(slot, generation)
+    
+    def report(self, elapsed: float) -> None:
+        """Print jobs done per worker since the last report"""
+        for slot, (process, name, _) in sorted(self.workers.items()):
+            worker = Worker.find_by_key(Worker.redis_worker_namespace_prefix + name, connection=redis_conn)
+            if worker is None:
+                continue
+            current = (worker.successful_job_count, worker.failed_job_count, worker.total_working_time)
+            previous = self.last_stats.get(name, (0, 0, 0))
+            successful, failed, working_time = (value - before for value, before in zip(current, previous))
+            self.last_stats[name] = current
+            print(
+                f"Worker {slot} (pid {process.pid}): {successful} ok, {failed} failed, "
+                f"{successful / elapsed:.1f} jobs/s, busy {working_time / elapsed:.0%}",
+                flush=True,
+            )
+    
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+    
+        _preload()
+        for slot in range(self.processes):
+            self.start(slot)
+        print(f"Started {self.processes} workers on {listen}", flush=True)
+    
+        last_report = time.monotonic()
+        while not self.stopping:
+            alive = [process.sentinel for process, _, _ in self.workers.values() if process.is_alive()]
+            if alive:
+                wait(alive, timeout=1)
+            else:
+                time.sleep(1)
+            if self.stopping:
+                break
+            self.supervise()
+            if time.monotonic() - last_report >= self.stats_interval:
+                self.report(time.monotonic() - last_report)
+                last_report = time.monotonic()
+        self.shutdown()
+    
+    def shutdown(self) -> None:
+        """Warm-stop every worker, killing those still busy after shutdown_timeout"""
+        print("Stopping workers", flush=True)
+        processes = [process for process, _, _ in self.workers.values() if process.is_alive()]
+        for process in processes:
+            os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"Killing worker pid {process.pid} after {self.shutdown_timeout}s", flush=True)
+                process.kill()
+                process.join()
+
+
 if __name__ == '__main__':
-    with Connection(redis_conn):
-        worker = Worker(listen)
-        worker.work()
+    parser = argparse.ArgumentParser(description="RQ worker")
+    parser.add_argument("--processes", type=int, default=0, help="run a supervised pool of N in-process workers")
+    parser.add_argument("--stats-interval", type=float, default=60, help="seconds between pool throughput reports")
+    parser.add_argument("--shutdown-timeout", type=float, default=25, help="seconds to let jobs finish on stop")
+    args = parser.parse_args()
+    
+    if args.processes:
+        WorkerPool(args.processes, args.stats_interval, args.shutdown_timeout).run()
+    else:
+        with Connection(redis_conn):
+            worker = Worker(listen)
+            worker.work()
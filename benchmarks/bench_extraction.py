@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: SMS reply field extraction.
+
+    python -m benchmarks.bench_extraction [--number N]
+
+Runs the single-pass extractor over benchmarks/data/sms_replies.txt and
+compares it with one regex search per field, as a per-field pipeline would.
+"""
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import re
+import timeit
+
+from app.core.utils import UK_POSTCODE_PATTERN, format_uk_postcode
+from app.modules.comms.extraction import PRODUCT_KEYWORDS, _TIMEFRAME_PATTERN, _keywords, extract_reply_fields
+
+CORPUS = Path(__file__).parent / "data" / "sms_replies.txt"
+
+_SEPARATE = {
+    "email": re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    "postcode": re.compile(UK_POSTCODE_PATTERN, re.IGNORECASE),
+    "timeframe": re.compile(rf"\b(?:{_TIMEFRAME_PATTERN})\b", re.IGNORECASE),
+    "product_interest": re.compile(rf"\b(?:{_keywords(PRODUCT_KEYWORDS)})\b", re.IGNORECASE),
+    "name": re.compile(
+        r"\b(?:my\s+name\s+is|my\s+name's|name\s+is|name\s*:|this\s+is|it'?s|i'?m|i\s+am)\s+"
+        r"((?-i:[A-Z][a-z'\-]+(?:\s+[A-Z][a-z'\-]+)?))",
+        re.IGNORECASE,
+    ),
+}
+
+
+def separate_passes(text: str) -> Dict[str, str]:
+    """Baseline: one search per field (values left raw except postcode)"""
+    found = {}
+    for field, pattern in _SEPARATE.items():
+        match = pattern.search(text)
+        if match:
+            found[field] = format_uk_postcode(match.group(0)) if field == "postcode" else match.group(0)
+    return found
+
+
+def load_corpus() -> List[str]:
+    return [line for line in CORPUS.read_text().splitlines() if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    
+    replies = load_corpus()
+    detected = [extract_reply_fields(reply) for reply in replies]
+    with_fields = sum(1 for fields in detected if fields)
+    print(f"{len(replies)} replies, fields found in {with_fields}, {sum(map(len, detected))} fields total")
+    
+    cases = {
+        "single pass": lambda: [extract_reply_fields(reply) for reply in replies],
+        "single pass, postcode only": lambda: [extract_reply_fields(reply, wanted=["postcode"]) for reply in replies],
+        "one search per field": lambda: [separate_passes(reply) for reply in replies],
+    }
+    calls = args.number * len(replies)
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=args.number, repeat=5))
+        print(f"{name:<28} {best / calls * 1e6:6.2f} us/reply  {calls / best / 1000:7.0f}k replies/s")
+
+
+if __name__ == "__main__":
+    main()
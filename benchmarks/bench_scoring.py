@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: compiled qualification plan vs the previous hard-coded
+compute_missing_fields.
+
+    python -m benchmarks.bench_scoring [--number N]
+
+Runs without a database; leads are transient ORM objects and plain dicts.
+"""
+from typing import List
+import argparse
+import timeit
+
+from app.modules.leads.models import Lead, LeadSource
+from app.modules.leads.scoring import PROMOTED_FIELDS, compute_missing_fields, get_qualification_plan
+# Register the related models so the Lead mapper can configure
+from app.modules.customers.models import Customer  # noqa: F401
+from app.modules.comms.models import ContactEvent  # noqa: F401
+from app.modules.opportunities.models import Opportunity  # noqa: F401
+
+
+def legacy_compute_missing_fields(lead: Lead) -> List[str]:
+    """compute_missing_fields before qualification rules, kept as the baseline"""
+    missing = []
+    if not lead.name or not lead.name.strip():
+        missing.append("name")
+    if not lead.phone and not lead.email:
+        missing.append("phone_or_email")
+    for field in PROMOTED_FIELDS:
+        value = getattr(lead, field)
+        if not value or not str(value).strip():
+            missing.append(field)
+    return missing
+
+
+def sample_rows() -> List[dict]:
+    """A mix of complete, partial and empty leads"""
+    return [
+        {"source": LeadSource.WEBSITE, "name": "Jo Bloggs", "email": "jo@example.com", "phone": "+447700900123",
+         "postcode": "SW1A 1AA", "product_interest": "Solar", "timeframe": "3 months"},
+        {"source": LeadSource.FACEBOOK, "name": "Sam", "email": None, "phone": "+447700900124",
+         "postcode": None, "product_interest": "Heat pump", "timeframe": None},
+        {"source": LeadSource.OTHER, "name": None, "email": None, "phone": "+447700900125",
+         "postcode": None, "product_interest": None, "timeframe": None},
+        {"source": LeadSource.MANUAL, "name": "  ", "email": "x@example.com", "phone": None,
+         "postcode": " ", "product_interest": "Boiler", "timeframe": "ASAP"},
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+    
+    rows = sample_rows()
+    leads = [Lead(**row) for row in rows]
+    plan = get_qualification_plan()
+    for lead, row in zip(leads, rows):
+        assert legacy_compute_missing_fields(lead) == compute_missing_fields(lead) == plan.missing_for_row(row)
+    
+    cases = {
+        "legacy (ORM lead)": lambda: [legacy_compute_missing_fields(lead) for lead in leads],
+        "plan (ORM lead)": lambda: [plan.missing_for_lead(lead) for lead in leads],
+        "plan (row dict)": lambda: [plan.missing_for_row(row) for row in rows],
+        "plan (batch of rows)": lambda: plan.missing_for_rows(rows),
+    }
+    calls = args.number * len(rows)
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=args.number, repeat=5))
+        print(f"{name:<22} {best / calls * 1e9:8.0f} ns/lead")
+
+
+if __name__ == "__main__":
+    main()
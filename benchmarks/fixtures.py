@@ -0,0 +1,82 @@
+"""
+Realistic generated inputs shared by the benchmarks and the load test: messy
+UK phone numbers, lead ads payloads and SMS replies. Pass a seeded
+random.Random for repeatable data.
+"""
+from pathlib import Path
+from typing import List, Optional
+import random
+import string
+
+DATA_DIR = Path(__file__).parent / "data"
+
+FIRST_NAMES = ["Oliver", "Amelia", "Jack", "Isla", "Harry", "Ava", "George", "Mia", "Noah", "Grace", "Mohammed", "Priya"]
+LAST_NAMES = ["Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Evans", "Patel", "O'Neill", "Walker-Hughes"]
+POSTCODES = ["SW1A 1AA", "M1 1AE", "B33 8TH", "CR2 6XH", "DN55 1PT", "EC1A 1BB", "W1A 0AX", "LS1 4AP", "G2 3BZ", "BS1 5TR"]
+PRODUCTS = ["Solar panels", "Heat pump", "Battery storage", "EV charger", "Insulation"]
+TIMEFRAMES = ["ASAP", "Within 3 months", "Within 6 months", "Next year", "Just researching"]
+SOURCES = ["facebook", "instagram", "website"]
+
+
+def uk_mobile(rng: random.Random) -> str:
+    """A random UK mobile number in national form, 07xxxxxxxxx"""
+    return "07" + "".join(rng.choices(string.digits, k=9))
+
+
+def messy_uk_phone(rng: random.Random, number: Optional[str] = None) -> str:
+    """A UK mobile written the ways people type them into forms"""
+    national = number or uk_mobile(rng)
+    rest = national[1:]
+    return rng.choice([
+        national,
+        f"{national[:5]} {national[5:]}",
+        f"{national[:5]} {national[5:8]} {national[8:]}",
+        f"+44{rest}",
+        f"+44 {rest[:4]} {rest[4:]}",
+        f"+44 (0){rest[:4]} {rest[4:]}",
+        f"0044{rest}",
+        f"44{rest}",
+        f"({national[:5]}) {national[5:]}",
+        f"{national[:5]}-{national[5:]}",
+        f" {national} ",
+        rest,
+    ])
+
+
+def lead_payload(rng: random.Random, phone: Optional[str] = None, padding_fields: int = 0) -> dict:
+    """
+    A lead ads webhook payload. Fields are left out at random, as real
+    forms do, so some leads need chasing. padding_fields adds ad metadata
+    and custom answers, ~100 bytes each, for multi-KB payloads.
+    """
+    payload = {
+        "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "phone_number": messy_uk_phone(rng, phone),
+        "email": f"{rng.choice(FIRST_NAMES).lower()}.{rng.randrange(10**6)}@example.com" if rng.random() < 0.7 else "",
+        "postcode": rng.choice(POSTCODES) if rng.random() < 0.8 else None,
+        "product_interest": rng.choice(PRODUCTS) if rng.random() < 0.85 else None,
+        "timeframe": rng.choice(TIMEFRAMES) if rng.random() < 0.6 else None,
+        "ad_id": str(rng.randrange(10**15, 10**16)),
+        "form_id": str(rng.randrange(10**14, 10**15)),
+        "campaign_name": f"Spring {rng.choice(PRODUCTS)} {rng.randrange(2024, 2027)}",
+        "created_time": f"2026-0{rng.randrange(1, 10)}-1{rng.randrange(10)}T12:{rng.randrange(10, 60)}:00+0000",
+    }
+    if padding_fields:
+        payload["custom_questions"] = [
+            {
+                "question": f"Question {i}: " + " ".join(rng.choices(["how", "many", "rooms", "does", "your", "home", "have"], k=6)),
+                "answer": "".join(rng.choices(string.ascii_letters + " ", k=40)),
+            }
+            for i in range(padding_fields)
+        ]
+    return payload
+
+
+def sms_replies() -> List[str]:
+    """Sample inbound SMS replies, one per line of data/sms_replies.txt"""
+    return [line.rstrip("\n") for line in (DATA_DIR / "sms_replies.txt").read_text().splitlines() if line.strip()]
+
+
+def long_sms_reply(rng: random.Random, replies: List[str], parts: int = 4) -> str:
+    """A multi-part reply stitched from sample replies"""
+    return " ".join(rng.choice(replies) for _ in range(parts))
@@ -0,0 +1,265 @@
+"""
+End-to-end load test through the app's HTTP entry points.
+
+    python -m benchmarks.loadtest --start [--duration 60] [--concurrency 50]
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 [...]
+
+Virtual users loop over a weighted mix of operations (--mix):
+
+    webhook       POST /api/leads/webhook/{source} with a lead ads payload
+    sms_reply     POST /api/comms/webhooks/twilio/sms, signed as Twilio does,
+                  from the phone of a lead created earlier in the run
+    request_info  POST /api/leads/{id}/request-info for such a lead
+    inbox         GET /api/leads/inbox?limit=50
+
+With --start the harness runs the whole stack on this box against the local
+DATABASE_URL and REDIS_URL (migrated): the fake Twilio server with
+--twilio-latency-ms / --twilio-error-rate, the app under uvicorn with
+--app-workers processes, the outbox dispatcher, the chase sweeper and, with
+--fast-ack, the inbound SMS consumer. Without it, the app at --base-url must
+share TWILIO_AUTH_TOKEN with this process for signatures to validate.
+
+Reports requests, errors, req/s and latency percentiles per operation after
+--warmup seconds, plus lead intake per minute.
+"""
+from collections import defaultdict
+from statistics import quantiles
+from typing import Dict, List, Optional
+from uuid import uuid4
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+from benchmarks.fixtures import SOURCES, lead_payload, sms_replies, uk_mobile
+
+DEFAULT_MIX = "webhook=6,sms_reply=2,request_info=1,inbox=1"
+FAKE_TWILIO_PORT = 8099
+
+
+class LoadTest:
+    """Closed-loop load: each virtual user sends its next request when the last one returns"""
+    
+    def __init__(self, base_url: str, auth_token: str, mix: Dict[str, int], seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.validator = RequestValidator(auth_token)
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.replies = sms_replies()
+        self.leads: List[tuple] = []  # (lead_id, national phone) created during the run
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+        self.leads_created = 0
+        self.recording = False
+    
+    async def webhook(self, client: httpx.AsyncClient) -> httpx.Response:
+        phone = uk_mobile(self.rng)
+        response = await client.post(
+            f"/api/leads/webhook/{self.rng.choice(SOURCES)}",
+            params={"external_id": f"loadtest-{uuid4().hex}"},
+            json=lead_payload(self.rng, phone=phone, padding_fields=self.rng.choice([0, 0, 5, 20])),
+        )
+        if response.status_code == 200:
+            lead_id = response.json().get("lead_id")
+            if lead_id:
+                self.leads.append((lead_id, phone))
+                if self.recording:
+                    self.leads_created += 1
+        return response
+    
+    async def sms_reply(self, client: httpx.AsyncClient) -> httpx.Response:
+        phone = self.rng.choice(self.leads)[1] if self.leads else uk_mobile(self.rng)
+        params = {
+            "From": "+44" + phone[1:],
+            "To": "+447700900000",
+            "Body": self.rng.choice(self.replies),
+            "MessageSid": f"SM{uuid4().hex}",
+            "AccountSid": "ACloadtest",
+        }
+        url = f"{self.base_url}/api/comms/webhooks/twilio/sms"
+        signature = self.validator.compute_signature(url, params)
+        return await client.post(url, data=params, headers={"X-Twilio-Signature": signature})
+    
+    async def request_info(self, client: httpx.AsyncClient) -> Optional[httpx.Response]:
+        if not self.leads:
+            return None
+        lead_id = self.rng.choice(self.leads)[0]
+        return await client.post(f"/api/leads/{lead_id}/request-info")
+    
+    async def inbox(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/api/leads/inbox", params={"limit": 50})
+    
+    async def user(self, client: httpx.AsyncClient, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(self, operation)(client)
+            except httpx.HTTPError as e:
+                if self.recording:
+                    self.errors[operation] += 1
+                    self.status_codes[operation][type(e).__name__] += 1
+                continue
+            if response is None:
+                continue
+            elapsed = time.perf_counter() - started
+            if self.recording:
+                self.latencies[operation].append(elapsed)
+                self.status_codes[operation][response.status_code] += 1
+                if response.status_code >= 400:
+                    self.errors[operation] += 1
+    
+    async def run(self, concurrency: int, duration: float, warmup: float) -> float:
+        """Run warmup, then duration seconds recorded; returns the recorded seconds"""
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30) as client:
+            start = time.monotonic()
+            deadline = start + warmup + duration
+            users = [asyncio.create_task(self.user(client, deadline)) for _ in range(concurrency)]
+            await asyncio.sleep(warmup)
+            self.recording = True
+            recorded_from = time.monotonic()
+            await asyncio.gather(*users)
+            return time.monotonic() - recorded_from
+    
+    def report(self, elapsed: float) -> dict:
+        results = {"seconds": round(elapsed, 1), "operations": {}}
+        print(f"\n{'operation':<14}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for operation in self.operations:
+            latencies = sorted(self.latencies[operation])
+            if len(latencies) < 2:
+                continue
+            cuts = quantiles(latencies, n=100)
+            row = {
+                "requests": len(latencies),
+                "errors": self.errors[operation],
+                "rps": len(latencies) / elapsed,
+                "p50_ms": cuts[49] * 1000,
+                "p90_ms": cuts[89] * 1000,
+                "p99_ms": cuts[98] * 1000,
+                "max_ms": latencies[-1] * 1000,
+                "status_codes": {str(code): count for code, count in self.status_codes[operation].items()},
+            }
+            results["operations"][operation] = row
+            print(
+                f"{operation:<14}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+        results["leads_per_minute"] = self.leads_created / elapsed * 60
+        print(f"\nLead intake: {self.leads_created} leads in {elapsed:.0f}s = {results['leads_per_minute']:.0f} leads/minute")
+        return results
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        operation, _, weight = part.partition("=")
+        if operation not in ("webhook", "sms_reply", "request_info", "inbox"):
+            raise SystemExit(f"Unknown operation in --mix: {operation}")
+        weights[operation] = int(weight or 1)
+    return weights
+
+
+def start_stack(args) -> List[subprocess.Popen]:
+    """Start fake Twilio, the app and its background processes; returns them for stop_stack"""
+    # The load test signs SMS webhooks with the same token
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "loadtest")
+    env = dict(os.environ)
+    env.update({
+        "TWILIO_API_BASE_URL": f"http://127.0.0.1:{FAKE_TWILIO_PORT}",
+        "TWILIO_WEBHOOK_VALIDATE": "true",
+        "TWILIO_WEBHOOK_FAST_ACK": "true" if args.fast_ack else "false",
+    })
+    env.setdefault("TWILIO_ACCOUNT_SID", "ACloadtest")
+    env.setdefault("TWILIO_PHONE_NUMBER", "+447700900000")
+    # Let the fake provider set the pace rather than a real number's limit
+    env.setdefault("SMS_SEND_RATE_PER_SECOND", "1000")
+    env.setdefault("SMS_SEND_BURST", "100")
+    
+    python = sys.executable
+    commands = [
+        [python, "-m", "app.modules.comms.providers.fake_twilio", "--port", str(FAKE_TWILIO_PORT),
+         "--latency-ms", str(args.twilio_latency_ms), "--error-rate", str(args.twilio_error_rate)],
+        [python, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(httpx.URL(args.base_url).port),
+         "--workers", str(args.app_workers), "--log-level", "warning", "--no-access-log"],
+        [python, "-m", "app.modules.comms.outbox"],
+        [python, "-m", "app.modules.automation.chase"],
+    ]
+    if args.fast_ack:
+        commands.append([python, "-m", "app.modules.comms.inbound"])
+    log = open(args.stack_log, "a")
+    processes = [subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT) for command in commands]
+    
+    for url in (f"http://127.0.0.1:{FAKE_TWILIO_PORT}/_fake/messages", f"{args.base_url}/health"):
+        for _ in range(100):
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        else:
+            stop_stack(processes)
+            raise SystemExit(f"{url} did not come up, see {args.stack_log}")
+    httpx.delete(f"http://127.0.0.1:{FAKE_TWILIO_PORT}/_fake/messages")
+    return processes
+
+
+def stop_stack(processes: List[subprocess.Popen]) -> None:
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start", action="store_true", help="start fake Twilio, the app and workers locally")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--fast-ack", action="store_true", help="run the Twilio webhook in fast-ack mode")
+    parser.add_argument("--twilio-latency-ms", type=float, default=150)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.01)
+    parser.add_argument("--stack-log", default="loadtest-stack.log")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    
+    processes = start_stack(args) if args.start else []
+    try:
+        test = LoadTest(args.base_url, os.environ.get("TWILIO_AUTH_TOKEN", "loadtest"), parse_mix(args.mix), args.seed)
+        elapsed = asyncio.run(test.run(args.concurrency, args.duration, args.warmup))
+        results = test.report(elapsed)
+        if args.start:
+            # Give the dispatcher a moment to drain before counting what reached Twilio
+            time.sleep(2)
+            sent = httpx.get(f"http://127.0.0.1:{FAKE_TWILIO_PORT}/_fake/messages").json()["count"]
+            results["sms_sent"] = sent
+            print(f"Outbound SMS accepted by fake Twilio: {sent}")
+    finally:
+        stop_stack(processes)
+    
+    results["config"] = {key: value for key, value in vars(args).items() if key != "json"}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Micro-benchmark suite for the pure-Python hot paths, with a stored baseline.
+
+    python -m benchmarks.suite [-k phone] [--repeat 7]
+    python -m benchmarks.suite --save-baseline --runs 5
+    python -m benchmarks.suite --compare [--threshold 25]
+
+Each benchmark times one operation over a batch of generated inputs (see
+benchmarks/fixtures.py): messy UK phone numbers, multi-KB lead ads payloads
+and long SMS replies. Results are the best of --repeat runs, in ns per
+operation, and the median of --runs such passes.
+
+Every timed run is paired with a run of an app-independent pure-Python
+control, and each benchmark is also reported relative to the control. A
+CPU that is throttled or shared slows both alike, so --compare judges the
+relative timings: it exits with status 1 if any benchmark is more than
+--threshold percent slower than the baseline, after re-running slower ones
+--confirm times and keeping their best result. --save-baseline writes the
+results to benchmarks/baseline.json (or --baseline). Baselines are only
+comparable on the machine and Python they were saved with.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+from uuid import uuid4
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+
+from app.core.idempotency import generate_idempotency_key
+from app.core.phone import _normalize, normalize_phone_to_e164
+from app.core.utils import extract_uk_postcode
+from app.modules.leads.models import Lead, LeadSource, LeadStatus
+from app.modules.leads.schemas import Lead as LeadSchema, LeadCreate, LeadInboxItem
+from app.modules.leads.scoring import compute_missing_fields, extract_promoted_fields, get_qualification_plan
+from app.modules.leads.service import _extract_webhook_fields, _webhook_idempotency_key
+# Register the related models so the Lead mapper can configure
+from app.modules.customers.models import Customer  # noqa: F401
+from app.modules.comms.models import ContactEvent  # noqa: F401
+from app.modules.opportunities.models import Opportunity  # noqa: F401
+
+from benchmarks.fixtures import lead_payload, long_sms_reply, messy_uk_phone, sms_replies
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+BATCH = 1000
+# Run alongside every benchmark, never gated itself
+CONTROL = "control.pure_python"
+
+# name -> setup(rng) returning (run over the batch, operations per run)
+BENCHMARKS: Dict[str, Callable[[random.Random], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _leads(rng: random.Random, payloads: List[dict]) -> List[Lead]:
+    """Transient ORM leads built from payloads the way webhook intake does"""
+    leads = []
+    for payload in payloads:
+        name, email, phone = _extract_webhook_fields(payload)
+        leads.append(Lead(
+            id=uuid4(),
+            source=rng.choice([LeadSource.FACEBOOK, LeadSource.INSTAGRAM, LeadSource.WEBSITE]),
+            status=LeadStatus.NEW,
+            name=name,
+            email=email or None,
+            phone=normalize_phone_to_e164(phone),
+            raw_payload=payload,
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+            **extract_promoted_fields(payload),
+        ))
+    return leads
+
+
+@benchmark(CONTROL)
+def _(rng):
+    # No app code: dict, string and list work, as in the hot paths
+    rows = [{f"field_{i}": str(rng.randrange(10**6)) for i in range(8)} for _ in range(BATCH)]
+    return lambda: [",".join(sorted(key + "=" + value for key, value in row.items())) for row in rows], len(rows)
+
+
+@benchmark("phone.normalize.uncached")
+def _(rng):
+    phones = [messy_uk_phone(rng) for _ in range(BATCH)]
+    normalize = _normalize.__wrapped__
+    return lambda: [normalize(phone) for phone in phones], len(phones)
+
+
+@benchmark("phone.normalize.cached")
+def _(rng):
+    # Intake sees the same numbers again (duplicate webhooks, replies)
+    distinct = [messy_uk_phone(rng) for _ in range(BATCH // 10)]
+    phones = [rng.choice(distinct) for _ in range(BATCH)]
+    return lambda: [normalize_phone_to_e164(phone) for phone in phones], len(phones)
+
+
+@benchmark("postcode.extract.sms_reply")
+def _(rng):
+    replies = sms_replies()
+    texts = [long_sms_reply(rng, replies) for _ in range(BATCH)]
+    return lambda: [extract_uk_postcode(text) for text in texts], len(texts)
+
+
+@benchmark("postcode.extract.payload_field")
+def _(rng):
+    texts = [lead_payload(rng)["postcode"] or "" for _ in range(BATCH)]
+    return lambda: [extract_uk_postcode(text) for text in texts], len(texts)
+
+
+@benchmark("scoring.compute_missing_fields")
+def _(rng):
+    leads = _leads(rng, [lead_payload(rng) for _ in range(BATCH)])
+    return lambda: [compute_missing_fields(lead) for lead in leads], len(leads)
+
+
+@benchmark("scoring.missing_for_rows")
+def _(rng):
+    plan = get_qualification_plan()
+    rows = []
+    for payload in (lead_payload(rng) for _ in range(BATCH)):
+        name, email, phone = _extract_webhook_fields(payload)
+        rows.append({"source": LeadSource.FACEBOOK, "name": name, "email": email, "phone": phone,
+                     **extract_promoted_fields(payload)})
+    return lambda: plan.missing_for_rows(rows), len(rows)
+
+
+@benchmark("idempotency.generate_key")
+def _(rng):
+    ids = [str(rng.randrange(10**15, 10**16)) for _ in range(BATCH)]
+    return lambda: [generate_idempotency_key("facebook", external_id=external_id) for external_id in ids], len(ids)
+
+
+@benchmark("idempotency.payload_hash.small")
+def _(rng):
+    payloads = [lead_payload(rng) for _ in range(BATCH)]
+    return lambda: [_webhook_idempotency_key(LeadSource.FACEBOOK, payload) for payload in payloads], len(payloads)
+
+
+@benchmark("idempotency.payload_hash.4kb")
+def _(rng):
+    payloads = [lead_payload(rng, padding_fields=40) for _ in range(BATCH // 10)]
+    return lambda: [_webhook_idempotency_key(LeadSource.FACEBOOK, payload) for payload in payloads], len(payloads)
+
+
+@benchmark("schemas.LeadCreate.validate")
+def _(rng):
+    items = []
+    for payload in (lead_payload(rng, padding_fields=rng.choice([0, 5, 20])) for _ in range(BATCH)):
+        name, email, phone = _extract_webhook_fields(payload)
+        items.append({"source": "facebook", "name": name, "email": email or None, "phone": phone,
+                      "external_id": payload["ad_id"], "raw_payload": payload})
+    return lambda: [LeadCreate.model_validate(item) for item in items], len(items)
+
+
+@benchmark("schemas.LeadInboxItem.from_orm")
+def _(rng):
+    leads = _leads(rng, [lead_payload(rng) for _ in range(BATCH)])
+    for lead in leads:
+        lead.missing_fields = compute_missing_fields(lead)
+    return lambda: [LeadInboxItem.model_validate(lead) for lead in leads], len(leads)
+
+
+@benchmark("schemas.Lead.dump_json")
+def _(rng):
+    leads = _leads(rng, [lead_payload(rng, padding_fields=5) for _ in range(BATCH // 10)])
+    for lead in leads:
+        lead.missing_fields = compute_missing_fields(lead)
+    models = [LeadSchema.model_validate(lead) for lead in leads]
+    return lambda: [model.model_dump_json() for model in models], len(models)
+
+
+def _timer(name: str, seed: int) -> Tuple[timeit.Timer, int, int]:
+    run, operations = BENCHMARKS[name](random.Random(seed))
+    timer = timeit.Timer(run)
+    # At least ~0.2s per timed run, to keep timer noise down
+    number, _ = timer.autorange()
+    return timer, number, operations
+
+
+def run_benchmark(name: str, repeat: int, seed: int, runs: int = 1) -> dict:
+    """
+    Best of repeat timed runs, each right after a run of the control so both
+    see the same CPU speed; the median of runs such passes.
+    """
+    timer, number, operations = _timer(name, seed)
+    control, control_number, control_operations = _timer(CONTROL, seed)
+    passes = []
+    for _ in range(runs):
+        per_op, control_per_op = [], []
+        for _ in range(repeat):
+            control_per_op.append(control.timeit(control_number) / control_number / control_operations * 1e9)
+            per_op.append(timer.timeit(number) / number / operations * 1e9)
+        passes.append({
+            "ns_per_op": min(per_op),
+            "median_ns_per_op": median(per_op),
+            "relative": min(per_op) / min(control_per_op),
+        })
+    return {
+        "ns_per_op": median(p["ns_per_op"] for p in passes),
+        "median_ns_per_op": median(p["median_ns_per_op"] for p in passes),
+        "relative": median(p["relative"] for p in passes),
+        "operations": number * operations * repeat * runs,
+    }
+
+
+def machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+    }
+
+
+def _change(result: dict, before: dict) -> float:
+    """Percent slower than before, relative to the control when the baseline has it"""
+    if "relative" in before:
+        return (result["relative"] / before["relative"] - 1) * 100
+    return (result["ns_per_op"] / before["ns_per_op"] - 1) * 100
+
+
+def regressed(results: Dict[str, dict], baseline: dict, threshold: float) -> List[str]:
+    """Benchmarks more than threshold percent slower than the baseline"""
+    return [
+        name for name, result in results.items()
+        if name in baseline["results"] and _change(result, baseline["results"][name]) > threshold
+    ]
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> List[str]:
+    """Print the change against the baseline; returns the regressed benchmarks"""
+    if baseline.get("machine") != machine():
+        print(f"Warning: baseline was saved on {baseline.get('machine')}, timings may not be comparable")
+    regressions = []
+    print(f"\n{'benchmark':<36}{'baseline ns':>13}{'now ns':>11}{'change':>9}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<36}{'-':>13}{result['ns_per_op']:>11.0f}{'new':>9}")
+            continue
+        change = _change(result, before)
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36}{before['ns_per_op']:>13.0f}{result['ns_per_op']:>11.0f}{change:>+8.1f}%{flag}")
+    print("(change is relative to the control, not the raw ns)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="select", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--runs", type=int, default=1, help="passes to take the median of, e.g. 5 for a baseline")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=25, help="allowed slowdown in percent")
+    parser.add_argument("--confirm", type=int, default=2, help="re-runs of slower benchmarks before failing")
+    args = parser.parse_args()
+    
+    names = [name for name in BENCHMARKS if name != CONTROL and (not args.select or args.select in name)]
+    if not names:
+        raise SystemExit(f"No benchmarks match {args.select!r}")
+    
+    results = {}
+    print(f"{'benchmark':<36}{'best ns/op':>12}{'median':>10}{'ops/s':>12}{'x control':>11}")
+    for name in names:
+        result = run_benchmark(name, args.repeat, args.seed, args.runs)
+        results[name] = result
+        print(
+            f"{name:<36}{result['ns_per_op']:>12.0f}{result['median_ns_per_op']:>10.0f}"
+            f"{1e9 / result['ns_per_op']:>12,.0f}{result['relative']:>11.2f}"
+        )
+    
+    if args.save_baseline:
+        saved = {"results": {}}
+        if args.baseline.exists():
+            saved = json.loads(args.baseline.read_text())
+        # Keep entries for benchmarks not run this time (-k), unless saved elsewhere
+        if saved.get("machine") != machine():
+            saved = {"results": {}}
+        saved["machine"] = machine()
+        saved["saved_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        saved["results"].update({
+            name: {"ns_per_op": round(result["ns_per_op"], 1), "relative": round(result["relative"], 4)}
+            for name, result in results.items()
+        })
+        args.baseline.write_text(json.dumps(saved, indent=2, sort_keys=True) + "\n")
+        print(f"\nSaved baseline to {args.baseline}")
+    
+    if args.compare:
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}, run with --save-baseline first")
+        baseline = json.loads(args.baseline.read_text())
+        # A busy or throttled CPU slows whole runs; only fail on slowdowns that repeat
+        for _ in range(args.confirm):
+            suspects = regressed(results, baseline, args.threshold)
+            if not suspects:
+                break
+            print(f"\nRe-running {len(suspects)} slower benchmark(s) to confirm")
+            for name in suspects:
+                rerun = run_benchmark(name, args.repeat, args.seed, args.runs)
+                if rerun["relative"] < results[name]["relative"]:
+                    results[name] = rerun
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:g}% slower than baseline: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
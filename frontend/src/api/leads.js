@@ -12,6 +12,16 @@ export const getLeadDetail = async (leadId) => {
   return response.data
 }
 
+export const getLeadTimeline = async (leadId, cursor, limit = 100) => {
+  const response = await client.get(`/api/leads/${leadId}/timeline`, {
+    params: { cursor, limit },
+  })
+  return {
+    events: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+  }
+}
+
 export const createLead = async (leadData) => {
   const response = await client.post('/api/leads/', leadData)
   return response.data
@@ -0,0 +1,8 @@
+import client from './client'
+
+export const search = async (q, limit = 20) => {
+  const response = await client.get('/api/search', {
+    params: { q, limit },
+  })
+  return response.data
+}
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
-import { getLeadDetail, qualifyLead, requestInfo, sendSMS } from '../api/leads'
+import { getLeadDetail, getLeadTimeline, qualifyLead, requestInfo, sendSMS } from '../api/leads'
 import Button from '../components/Button'
 import './LeadDetail.css'
 
@@ -13,6 +13,7 @@ function LeadDetail() {
   const [actionLoading, setActionLoading] = useState(false)
   const [smsMessage, setSmsMessage] = useState('')
   const [showSmsForm, setShowSmsForm] = useState(false)
+  const [olderLoading, setOlderLoading] = useState(false)
 
   useEffect(() => {
     loadLead()
@@ -32,6 +33,22 @@ function LeadDetail() {
     }
   }
 
+  const handleLoadOlder = async () => {
+    try {
+      setOlderLoading(true)
+      const { events, nextCursor } = await getLeadTimeline(id, leadData.timeline_next_cursor)
+      setLeadData({
+        ...leadData,
+        timeline: [...leadData.timeline, ...events],
+        timeline_next_cursor: nextCursor,
+      })
+    } catch (err) {
+      alert(err.response?.data?.detail || 'Failed to load older events')
+    } finally {
+      setOlderLoading(false)
+    }
+  }
+
   const handleQualify = async () => {
     if (!confirm('Are you sure you want to qualify this lead? This will create an opportunity.')) {
       return
@@ -267,6 +284,11 @@ function LeadDetail() {
           ) : (
             <p className="text-light">No timeline events yet</p>
           )}
+          {leadData.timeline_next_cursor && (
+            <Button variant="outline" onClick={handleLoadOlder} disabled={olderLoading}>
+              {olderLoading ? 'Loading...' : 'Load older'}
+            </Button>
+          )}
         </div>
       </div>
     </div>
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { getLeadInbox } from '../api/leads'
+import { search } from '../api/search'
 import Button from '../components/Button'
 import './LeadInbox.css'
 
@@ -8,11 +9,30 @@ function LeadInbox() {
   const [leads, setLeads] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  const [query, setQuery] = useState('')
+  const [results, setResults] = useState(null)
 
   useEffect(() => {
     loadLeads()
   }, [])
 
+  useEffect(() => {
+    const q = query.trim()
+    if (q.length < 3) {
+      setResults(null)
+      return
+    }
+    // Debounce so typing does not send a request per keystroke
+    const timer = setTimeout(async () => {
+      try {
+        setResults(await search(q))
+      } catch (err) {
+        console.error('Error searching:', err)
+      }
+    }, 250)
+    return () => clearTimeout(timer)
+  }, [query])
+
   const loadLeads = async () => {
     try {
       setLoading(true)
@@ -64,12 +84,62 @@ function LeadInbox() {
     <div className="lead-inbox">
       <div className="page-header">
         <h2>Lead Inbox</h2>
+        <input
+          type="search"
+          className="search-input"
+          placeholder="Search name, email, phone or postcode"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+        />
         <Button onClick={loadLeads} variant="outline">
           Refresh
         </Button>
       </div>
 
-      {leads.length === 0 ? (
+      {results ? (
+        <div className="leads-table">
+          <table>
+            <thead>
+              <tr>
+                <th>Name</th>
+                <th>Contact</th>
+                <th>Postcode</th>
+                <th>Type</th>
+                <th>Status</th>
+              </tr>
+            </thead>
+            <tbody>
+              {results.length === 0 && (
+                <tr>
+                  <td colSpan="5" className="text-light">No matches</td>
+                </tr>
+              )}
+              {results.map((result) => (
+                <tr key={`${result.type}-${result.id}`}>
+                  <td>
+                    {result.type === 'lead' ? (
+                      <Link to={`/leads/${result.id}`} className="lead-link">
+                        {result.name || 'N/A'}
+                      </Link>
+                    ) : (
+                      result.name || 'N/A'
+                    )}
+                  </td>
+                  <td>
+                    <div className="contact-info">
+                      {result.email && <div>{result.email}</div>}
+                      {result.phone && <div className="text-light">{result.phone}</div>}
+                    </div>
+                  </td>
+                  <td className="text-light">{result.postcode}</td>
+                  <td><span className="badge badge-secondary">{result.type}</span></td>
+                  <td>{result.type === 'lead' ? getStatusBadge(result.status) : result.status}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      ) : leads.length === 0 ? (
         <div className="empty-state">
           <p>No leads in inbox</p>
           <Link to="/leads/new">